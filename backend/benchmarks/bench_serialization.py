@@ -0,0 +1,85 @@
+"""Compare the default response path with the trusted/raw-JSON fast path.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serialization --articles 1000 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from core.serialization import dumps, trusted
+from models.blog_models import Article
+
+
+def make_documents(count: int) -> List[dict]:
+    """Documents shaped like the ones Motor hands back for the articles collection"""
+    now = datetime(2025, 8, 15, 12, 30, 15, 123000)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Training guide number {i}",
+            "excerpt": "Discover the science-backed strategies for maximizing muscle growth. " * 2,
+            "content": "Building muscle mass requires proper training, nutrition, and recovery. " * 30,
+            "category": ["Strength Training", "Cardio", "Nutrition", "Training Tips"][i % 4],
+            "author": "Sarah Johnson",
+            "publishDate": now - timedelta(days=i),
+            "readTime": "8 min read",
+            "image": "https://images.unsplash.com/photo-1583454110551-21f2fa2afe61",
+            "featured": i % 10 == 0,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        for i in range(count)
+    ]
+
+
+async def default_path(documents: List[dict], field) -> bytes:
+    """What a handler returning [Article(**doc)] with response_model=List[Article] costs"""
+    content = [Article(**doc) for doc in documents]
+    serialized = await serialize_response(field=field, response_content=content)
+    return JSONResponse(serialized).body
+
+
+async def fast_path(documents: List[dict], field) -> bytes:
+    return dumps([trusted(Article, doc) for doc in documents])
+
+
+async def measure(func, documents: List[dict], field, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await func(documents, field)
+    return (time.perf_counter() - started) / rounds
+
+
+async def main(count: int, rounds: int) -> None:
+    documents = make_documents(count)
+    field = create_response_field(name="response", type_=List[Article])
+
+    # Both paths must produce the same JSON document
+    expected = json.loads(await default_path(documents, field))
+    actual = json.loads(await fast_path(documents, field))
+    assert expected == actual, "fast path output differs from the default response path"
+
+    default_time = await measure(default_path, documents, field, rounds)
+    fast_time = await measure(fast_path, documents, field, rounds)
+    print(f"{count} articles, {rounds} rounds")
+    print(f"  default path: {default_time * 1000:8.2f} ms/response")
+    print(f"  fast path:    {fast_time * 1000:8.2f} ms/response")
+    print(f"  speedup:      {default_time / fast_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.articles, args.rounds))
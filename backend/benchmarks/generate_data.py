@@ -0,0 +1,319 @@
+"""Generate realistic articles and subscribers at production scale.
+
+Extends seed_data.py for capacity planning: the sample articles provide the
+categories, authors, images and vocabulary; this script produces as many
+articles and subscribers as asked for and inserts them with batched
+insert_many calls from several processes. Run from the backend directory:
+
+    python -m benchmarks.generate_data --articles 1000000 --subscribers 500000 --workers 8
+
+    # Skewed categories, longer bodies, more featured articles
+    python -m benchmarks.generate_data --articles 200000 \\
+        --categories "Strength Training=5,Cardio=3,Nutrition=2,Recovery=1" \\
+        --content-words 900 --content-spread 0.6 --featured-ratio 0.05
+
+    # Write NDJSON for POST /api/articles/bulk instead of inserting
+    python -m benchmarks.generate_data --articles 10000 --ndjson articles.ndjson
+
+Output depends only on --seed and the distribution options, never on
+--workers or --batch-size: record i is generated from its own chunk's random
+stream, so a run can be repeated or extended exactly. Ids are deterministic
+too, and re-running without --drop skips records that already exist.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+
+from core import category_stats
+from core.database import create_client, load_settings
+from core.indexes import ensure_indexes
+from seed_data import articles as SAMPLE_ARTICLES
+
+# Records generated from one random stream; also the unit of work handed to a process
+CHUNK_SIZE = 10_000
+
+DUPLICATE_KEY = 11000
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z'-]+")
+
+# Topic words per category, mixed with the sample articles' own vocabulary
+TOPICS = {
+    "Strength Training": ["squat", "deadlift", "bench press", "hypertrophy", "progressive overload",
+                          "compound lifts", "muscle mass", "powerlifting", "kettlebells", "grip strength"],
+    "Cardio": ["HIIT", "running", "cycling", "rowing", "endurance", "heart rate zones", "VO2 max",
+               "interval training", "marathon prep", "fat burning"],
+    "Nutrition": ["protein", "macros", "meal prep", "hydration", "carbohydrates", "healthy fats",
+                  "supplements", "micronutrients", "meal timing", "calorie balance"],
+    "Recovery": ["sleep", "mobility", "foam rolling", "rest days", "stretching", "active recovery",
+                 "injury prevention", "massage", "deload weeks", "stress management"],
+    "Training Tips": ["form", "consistency", "motivation", "home workouts", "warm-ups", "programming",
+                      "goal setting", "habit building", "tracking progress", "mind-muscle connection"],
+}
+
+TITLE_TEMPLATES = [
+    "The Ultimate Guide to {topic}", "{topic}: What the Science Says", "{n} Mistakes to Avoid with {topic}",
+    "Mastering {topic} for Beginners", "Why {topic} Matters More Than You Think",
+    "A Practical Approach to {topic}", "{topic} Myths, Debunked", "How to Build a Plan Around {topic}",
+]
+
+
+def _sample_vocabulary() -> List[str]:
+    """Words of the sample articles and topics, most frequent first"""
+    counts: Counter = Counter()
+    for article in SAMPLE_ARTICLES:
+        for field in ("title", "excerpt", "content"):
+            counts.update(word.lower() for word in _WORD_RE.findall(article[field]))
+    for topics in TOPICS.values():
+        for topic in topics:
+            counts.update(topic.lower().split())
+    return [word for word, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def parse_weights(spec: Optional[str]) -> Dict[str, float]:
+    """"A=3,B=1" -> normalised weights; defaults to every sample category, equally"""
+    if not spec:
+        names = sorted({article["category"] for article in SAMPLE_ARTICLES})
+        return {name: 1 / len(names) for name in names}
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Category weights must add up to more than zero")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+class ArticleGenerator:
+    """Deterministic article documents; chunk k always yields the same records"""
+
+    def __init__(self, seed: int, categories: Dict[str, float], content_words: int, content_spread: float,
+                 featured_ratio: float, end: datetime, days: int):
+        self.seed = seed
+        self.categories = list(categories)
+        self.category_weights = np.array(list(categories.values()))
+        self.content_words = content_words
+        self.content_spread = content_spread
+        self.featured_ratio = featured_ratio
+        self.end = end
+        self.days = days
+        self.vocabulary = np.array(_sample_vocabulary())
+        # Zipf-like word frequencies, so text search sees common and rare terms
+        weights = 1 / np.arange(1, len(self.vocabulary) + 1)
+        self.word_cdf = np.cumsum(weights / weights.sum())
+        self.authors = sorted({article["author"] for article in SAMPLE_ARTICLES})
+        self.images = sorted({article["image"] for article in SAMPLE_ARTICLES})
+
+    def _words(self, rng: np.random.Generator, count: int) -> List[str]:
+        picks = np.searchsorted(self.word_cdf, rng.random(count), side="right")
+        return self.vocabulary[np.minimum(picks, len(self.vocabulary) - 1)].tolist()
+
+    def _sentences(self, rng: np.random.Generator, count: int, topic: str) -> str:
+        words = self._words(rng, count)
+        # Sentences of 8-19 words, about a third of them naming the article's topic
+        ends = np.cumsum(rng.integers(8, 20, size=count // 8 + 1))
+        ends = ends[ends < count].tolist() + [count]
+        mentions = (rng.random(len(ends)) < 0.3).tolist()
+        sentences, begin = [], 0
+        for end, mention in zip(ends, mentions):
+            sentence = words[begin:end]
+            if mention:
+                sentence[-1] += " " + topic.lower()
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            begin = end
+        return " ".join(sentences)
+
+    def chunk(self, index: int, start: int, stop: int) -> Iterator[Dict[str, Any]]:
+        rng = np.random.default_rng([self.seed, 1, index])
+        categories = rng.choice(len(self.categories), size=stop - start, p=self.category_weights)
+        # Lognormal body lengths: most articles near the median, a long tail of long reads
+        lengths = rng.lognormal(np.log(self.content_words), self.content_spread, size=stop - start)
+        for offset in range(stop - start):
+            category = self.categories[categories[offset]]
+            topic = str(rng.choice(TOPICS.get(category, [category])))
+            words = max(20, int(lengths[offset]))
+            published = self.end - timedelta(seconds=int(rng.integers(0, self.days * 86400)))
+            updated = published + timedelta(seconds=int(rng.integers(0, 30 * 86400)))
+            title = str(rng.choice(TITLE_TEMPLATES)).format(topic=topic.title(), n=int(rng.integers(3, 11)))
+            yield {
+                "id": str(uuid.UUID(bytes=rng.bytes(16), version=4)),
+                "title": title,
+                "excerpt": self._sentences(rng, int(rng.integers(18, 35)), topic),
+                "content": self._sentences(rng, words, topic),
+                "category": category,
+                "author": str(rng.choice(self.authors)),
+                "publishDate": published,
+                "readTime": f"{max(1, round(words / 200))} min read",
+                "image": str(rng.choice(self.images)),
+                "featured": bool(rng.random() < self.featured_ratio),
+                "createdAt": published,
+                "updatedAt": min(updated, self.end),
+            }
+
+
+class SubscriberGenerator:
+    def __init__(self, seed: int, end: datetime, days: int):
+        self.seed = seed
+        self.end = end
+        self.days = days
+
+    def chunk(self, index: int, start: int, stop: int) -> Iterator[Dict[str, Any]]:
+        rng = np.random.default_rng([self.seed, 2, index])
+        # Signups accelerate towards the end of the window, as a growing list does
+        ages = (rng.power(3, size=stop - start) * self.days * 86400).astype(np.int64)
+        for offset, number in enumerate(range(start, stop)):
+            yield {
+                "id": str(uuid.UUID(bytes=rng.bytes(16), version=4)),
+                # The record number keeps emails unique under the unique email index
+                "email": f"reader{number}@example.com",
+                "subscribedAt": self.end - timedelta(seconds=int(self.days * 86400 - ages[offset])),
+            }
+
+
+def chunks(total: int, size: int = CHUNK_SIZE) -> List[Tuple[int, int, int]]:
+    return [(index, start, min(start + size, total)) for index, start in enumerate(range(0, total, size))]
+
+
+# Per-process state set by _init_worker; worker processes use the synchronous driver
+_client: Optional[MongoClient] = None
+_generators: Dict[str, Any] = {}
+_batch_size = 1000
+
+
+def _init_worker(generators: Dict[str, Any], batch_size: int) -> None:
+    global _client, _generators, _batch_size
+    settings = load_settings()
+    _client = MongoClient(settings.url, **settings.client_options())[settings.db_name]
+    _generators = generators
+    _batch_size = batch_size
+
+
+def _insert_chunk(task: Tuple[str, int, int, int]) -> Tuple[str, int, int]:
+    """Generate one chunk and insert it batch by batch; returns (collection, inserted, skipped)"""
+    collection, index, start, stop = task
+    inserted = skipped = 0
+    batch = []
+    for document in _generators[collection].chunk(index, start, stop):
+        batch.append(document)
+        if len(batch) == _batch_size:
+            done, existing = _insert_batch(collection, batch)
+            inserted, skipped, batch = inserted + done, skipped + existing, []
+    if batch:
+        done, existing = _insert_batch(collection, batch)
+        inserted, skipped = inserted + done, skipped + existing
+    return collection, inserted, skipped
+
+
+def _insert_batch(collection: str, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+    try:
+        _client[collection].insert_many(batch, ordered=False)
+        return len(batch), 0
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error["code"] != DUPLICATE_KEY for error in errors):
+            raise
+        # Records from an earlier run with the same seed
+        return e.details.get("nInserted", 0), len(errors)
+
+
+async def _prepare(drop: bool) -> None:
+    settings = load_settings()
+    client = create_client(settings)
+    db = client[settings.db_name]
+    try:
+        if drop:
+            await db.articles.drop()
+            await db.newsletter_subscribers.drop()
+            print("Dropped articles and newsletter_subscribers")
+        # Unique indexes first, so re-runs skip existing ids and emails instead of duplicating them
+        await ensure_indexes(db)
+    finally:
+        client.close()
+
+
+async def _finish() -> None:
+    settings = load_settings()
+    client = create_client(settings)
+    try:
+        await category_stats.rebuild(client[settings.db_name])
+        print("Rebuilt category stats")
+    finally:
+        client.close()
+
+
+def write_ndjson(generator: ArticleGenerator, total: int, path: str) -> None:
+    """Stream articles as NDJSON in the shape POST /api/articles/bulk accepts"""
+    output = sys.stdout if path == "-" else open(path, "w")
+    try:
+        for index, start, stop in chunks(total):
+            for article in generator.chunk(index, start, stop):
+                record = {key: value for key, value in article.items() if key not in ("createdAt", "updatedAt")}
+                record["publishDate"] = record["publishDate"].isoformat()
+                output.write(json.dumps(record) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def main(args: argparse.Namespace) -> int:
+    end = datetime.fromisoformat(args.end_date)
+    generators = {
+        "articles": ArticleGenerator(args.seed, parse_weights(args.categories), args.content_words,
+                                     args.content_spread, args.featured_ratio, end, args.days),
+        "newsletter_subscribers": SubscriberGenerator(args.seed, end, args.days),
+    }
+    if args.ndjson:
+        write_ndjson(generators["articles"], args.articles, args.ndjson)
+        return 0
+
+    asyncio.run(_prepare(args.drop))
+    tasks = [("articles", *chunk) for chunk in chunks(args.articles)]
+    tasks += [("newsletter_subscribers", *chunk) for chunk in chunks(args.subscribers)]
+    totals = {"articles": [0, 0], "newsletter_subscribers": [0, 0]}
+    started = time.perf_counter()
+    with multiprocessing.Pool(args.workers, _init_worker, (generators, args.batch_size)) as pool:
+        for done, (collection, inserted, skipped) in enumerate(pool.imap_unordered(_insert_chunk, tasks), 1):
+            totals[collection][0] += inserted
+            totals[collection][1] += skipped
+            elapsed = time.perf_counter() - started
+            written = sum(inserted for inserted, _ in totals.values())
+            print(f"\r{done}/{len(tasks)} chunks, {written:,} documents, {written / elapsed:,.0f}/s",
+                  end="", flush=True)
+    print()
+    for collection, (inserted, skipped) in totals.items():
+        print(f"{collection}: {inserted:,} inserted, {skipped:,} already present")
+    if totals["articles"][0]:
+        asyncio.run(_finish())
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--subscribers", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=1, help="same seed and options, same documents")
+    parser.add_argument("--categories", help='relative weights, e.g. "Strength Training=5,Cardio=3"; '
+                                             'default: the seed_data.py categories equally')
+    parser.add_argument("--content-words", type=int, default=600, help="median article length in words")
+    parser.add_argument("--content-spread", type=float, default=0.5,
+                        help="sigma of the lognormal length distribution; 0 makes every article the median")
+    parser.add_argument("--featured-ratio", type=float, default=0.02)
+    parser.add_argument("--end-date", default="2025-09-01", help="newest publish and signup date")
+    parser.add_argument("--days", type=int, default=5 * 365, help="days of history before --end-date")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per insert_many")
+    parser.add_argument("--drop", action="store_true", help="drop both collections first")
+    parser.add_argument("--ndjson", metavar="PATH", help="write articles to PATH ('-' for stdout) instead of MongoDB")
+    sys.exit(main(parser.parse_args()))
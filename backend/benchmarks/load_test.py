@@ -0,0 +1,430 @@
+"""Concurrent load test and latency report for the blog API.
+
+Runs a weighted mix of requests covering every blog route from many
+concurrent workers and reports throughput plus p50/p95/p99 latency per
+operation. Run from the backend directory:
+
+    # Against a running server
+    python -m benchmarks.load_test --base-url http://localhost:8001
+
+    # In this process, against the MongoDB in MONGO_URL
+    python -m benchmarks.load_test --in-process --seed 500
+
+    # In this process, against the in-memory storage backend
+    python -m benchmarks.load_test --memory --seed 500 --check benchmarks/baseline.json
+
+Comparing --memory with --in-process separates the application's own
+overhead from time spent waiting on MongoDB. In-process runs switch the
+related-articles table on unless RELATED_TOP_K is set.
+
+The run writes articles and newsletter subscribers. Articles it creates are
+deleted at the end; subscribers use loadtest-*@example.com addresses and stay.
+Never point it at a production database.
+
+`--save-baseline FILE` records the results. `--check FILE` exits non-zero
+when throughput drops, or p95/p99 latency or the error rate rises, by more
+than `--tolerance` compared with FILE.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+CATEGORIES = ["Strength Training", "Cardio", "Nutrition", "Training Tips", "Recovery"]
+SEARCH_TERMS = ["muscle", "cardio", "protein", "recovery", "strength", "training"]
+
+# Relative weight of each operation; reads dominate like real traffic
+DEFAULT_MIX = {
+    "list_articles": 20,
+    "list_category": 10,
+    "list_next_page": 8,
+    "list_fields": 4,
+    "featured": 10,
+    "search": 8,
+    "get_article": 20,
+    "related": 6,
+    "get_many": 4,
+    "get_batch": 2,
+    "categories": 8,
+    "create_article": 2,
+    "update_article": 2,
+    "delete_article": 1,
+    "bulk_import": 1,
+    "subscribe": 3,
+    "subscribe_batch": 1,
+    "subscribers": 1,
+    "export_subscribers": 1,
+}
+
+# Statuses that are not failures: a created article may be deleted by
+# another worker between being picked and being updated, and the
+# related-articles table is off unless RELATED_TOP_K is set
+EXPECTED_STATUSES = {"update_article": (404,), "related": (404, 503)}
+
+# Ids per ?ids= and /articles/batch request
+GET_MANY_IDS = 20
+BATCH_IDS = 100
+
+# Operations with fewer samples than this are too noisy to compare percentiles
+MIN_SAMPLES = 30
+
+
+def make_article(index: int) -> Dict[str, Any]:
+    published = datetime(2025, 1, 1) + timedelta(hours=index)
+    return {
+        "title": f"Load test article {index}",
+        "excerpt": "Science-backed strategies for muscle growth, cardio and recovery.",
+        "content": "Building strength requires proper training, protein and recovery. " * 20,
+        "category": CATEGORIES[index % len(CATEGORIES)],
+        "author": "Load Test",
+        "publishDate": published.isoformat(),
+        "readTime": "5 min read",
+        "image": "https://images.unsplash.com/photo-1583454110551-21f2fa2afe61",
+        "featured": index % 10 == 0,
+    }
+
+
+@dataclass
+class State:
+    """What workers learn from responses and share with each other"""
+    rng: random.Random
+    article_ids: List[str] = field(default_factory=list)
+    created_ids: List[str] = field(default_factory=list)
+    cursors: List[str] = field(default_factory=list)
+    counter: int = 0
+
+    def next_index(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+# Operations: each sends one request and returns the response
+
+async def list_articles(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    response = await client.get("/api/articles")
+    if response.status_code == 200:
+        page = response.json()
+        if page["next_cursor"] and len(state.cursors) < 100:
+            state.cursors.append(page["next_cursor"])
+        if len(state.article_ids) < 1000:
+            state.article_ids.extend(item["id"] for item in page["items"])
+    return response
+
+async def list_category(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    category = state.rng.choice(CATEGORIES).lower().replace(" ", "-")
+    return await client.get("/api/articles", params={"category": category})
+
+async def list_next_page(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    if not state.cursors:
+        return await list_articles(client, state)
+    return await client.get("/api/articles", params={"after": state.rng.choice(state.cursors)})
+
+async def list_fields(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.get("/api/articles", params={"fields": "title,image", "limit": 50})
+
+async def featured(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.get("/api/articles/featured")
+
+async def search(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.get("/api/articles/search", params={"q": state.rng.choice(SEARCH_TERMS)})
+
+async def get_article(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    if not state.article_ids:
+        return await list_articles(client, state)
+    return await client.get(f"/api/articles/{state.rng.choice(state.article_ids)}")
+
+async def related(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    if not state.article_ids:
+        return await list_articles(client, state)
+    return await client.get(f"/api/articles/{state.rng.choice(state.article_ids)}/related")
+
+async def get_many(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    if not state.article_ids:
+        return await list_articles(client, state)
+    ids = state.rng.sample(state.article_ids, min(GET_MANY_IDS, len(state.article_ids)))
+    return await client.get("/api/articles", params={"ids": ",".join(ids)})
+
+async def get_batch(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    if not state.article_ids:
+        return await list_articles(client, state)
+    ids = state.rng.sample(state.article_ids, min(BATCH_IDS, len(state.article_ids)))
+    return await client.post("/api/articles/batch", json={"ids": ids})
+
+async def categories(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.get("/api/categories")
+
+async def create_article(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    response = await client.post("/api/articles", json=make_article(state.next_index()))
+    if response.status_code == 200:
+        state.created_ids.append(response.json()["id"])
+    return response
+
+async def update_article(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    if not state.created_ids:
+        return await create_article(client, state)
+    article_id = state.rng.choice(state.created_ids)
+    update = {"title": f"Updated load test article {state.next_index()}", "featured": state.rng.random() < 0.1}
+    return await client.put(f"/api/articles/{article_id}", json=update)
+
+async def delete_article(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    if not state.created_ids:
+        return await create_article(client, state)
+    article_id = state.created_ids.pop(state.rng.randrange(len(state.created_ids)))
+    return await client.delete(f"/api/articles/{article_id}")
+
+async def bulk_import(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    records = []
+    for _ in range(50):
+        record = make_article(state.next_index())
+        record["id"] = f"loadtest-{uuid.uuid4()}"
+        records.append(record)
+    body = "\n".join(json.dumps(record) for record in records).encode()
+    response = await client.post("/api/articles/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    if response.status_code == 200:
+        state.created_ids.extend(record["id"] for record in records)
+    return response
+
+async def subscribe(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.post("/api/newsletter/subscribe", json={"email": f"loadtest-{uuid.uuid4().hex}@example.com"})
+
+async def subscribe_batch(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    emails = [f"loadtest-{uuid.uuid4().hex}@example.com" for _ in range(100)]
+    return await client.post("/api/newsletter/subscribe/batch", json={"emails": emails})
+
+async def subscribers(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.get("/api/newsletter/subscribers")
+
+async def export_subscribers(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.get("/api/newsletter/subscribers/export", params={"format": state.rng.choice(["ndjson", "csv"])})
+
+
+Operation = Callable[[httpx.AsyncClient, State], Awaitable[httpx.Response]]
+
+OPERATIONS: Dict[str, Operation] = {
+    "list_articles": list_articles,
+    "list_category": list_category,
+    "list_next_page": list_next_page,
+    "list_fields": list_fields,
+    "featured": featured,
+    "search": search,
+    "get_article": get_article,
+    "related": related,
+    "get_many": get_many,
+    "get_batch": get_batch,
+    "categories": categories,
+    "create_article": create_article,
+    "update_article": update_article,
+    "delete_article": delete_article,
+    "bulk_import": bulk_import,
+    "subscribe": subscribe,
+    "subscribe_batch": subscribe_batch,
+    "subscribers": subscribers,
+    "export_subscribers": export_subscribers,
+}
+
+
+def parse_mix(spec: Optional[str], base: Dict[str, int]) -> Dict[str, int]:
+    """Apply "name=weight,name=weight" overrides to a mix"""
+    mix = dict(base)
+    if spec:
+        for part in spec.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in OPERATIONS:
+                raise SystemExit(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+            mix[name] = int(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+async def run_load(client: httpx.AsyncClient, mix: Dict[str, int], concurrency: int, duration: float,
+                   warmup: float, seed: int) -> Dict[str, Any]:
+    state = State(rng=random.Random(seed))
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    error_samples: List[str] = []
+
+    # Prime the id and cursor pools so reads have something to hit
+    await list_articles(client, state)
+
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def worker() -> None:
+        while True:
+            name = state.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            try:
+                response = await OPERATIONS[name](client, state)
+                await response.aread()
+                failed = response.status_code >= 400 and response.status_code not in EXPECTED_STATUSES.get(name, ())
+                detail = f"{name}: HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                failed, detail = True, f"{name}: {e!r}"
+            if started < measure_from:
+                continue
+            latencies[name].append(time.perf_counter() - started)
+            if failed:
+                errors[name] += 1
+                if len(error_samples) < 10:
+                    error_samples.append(detail)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+
+    # Remove the articles this run created so repeated runs stay comparable
+    for article_id in state.created_ids:
+        await client.delete(f"/api/articles/{article_id}")
+
+    every = [latency for values in latencies.values() for latency in values]
+    return {
+        "config": {"concurrency": concurrency, "duration": duration, "mix": mix},
+        "total": summarize(every, sum(errors.values()), elapsed),
+        "operations": {name: summarize(latencies[name], errors[name], elapsed) for name in names if latencies[name]},
+        "error_samples": error_samples,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of results against a saved baseline, as readable lines"""
+    regressions = []
+    rows = [("total", results["total"], baseline.get("total"))]
+    rows += [(name, stats, baseline.get("operations", {}).get(name)) for name, stats in results["operations"].items()]
+    for name, current, previous in rows:
+        if not previous or min(current["requests"], previous["requests"]) < MIN_SAMPLES:
+            continue
+        # p99 of a single operation swings too much between runs to gate on
+        for metric in ("p95_ms", "p99_ms") if name == "total" else ("p95_ms",):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {current[metric]} > baseline {previous[metric]}")
+        if name == "total" and current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {current['rps']} < baseline {previous['rps']}")
+        if current["error_rate"] > previous["error_rate"] + 0.01:
+            regressions.append(f"{name}: error_rate {current['error_rate']} > baseline {previous['error_rate']}")
+    return regressions
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    config = results["config"]
+    print(f"concurrency {config['concurrency']}, {config['duration']:g}s")
+    print(f"{'operation':<20} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = sorted(results["operations"].items()) + [("TOTAL", results["total"])]
+    for name, stats in rows:
+        print(f"{name:<20} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9.1f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    for sample in results["error_samples"]:
+        print(f"  error: {sample}")
+
+
+@asynccontextmanager
+async def in_process_client(memory: bool) -> AsyncIterator[httpx.AsyncClient]:
+    """Serve the app from this process, with its lifespan, over an ASGI transport"""
+    if memory:
+        os.environ["STORAGE_BACKEND"] = "memory"
+    # The related route is only worth measuring with its table; RELATED_TOP_K=0 measures without it
+    os.environ.setdefault("RELATED_TOP_K", "6")
+    from server import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            yield client
+
+
+async def seed_articles(client: httpx.AsyncClient, count: int) -> None:
+    records = [{**make_article(i), "id": f"loadtest-seed-{i}"} for i in range(count)]
+    body = "\n".join(json.dumps(record) for record in records).encode()
+    response = await client.post("/api/articles/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    response.raise_for_status()
+
+
+async def main(args: argparse.Namespace) -> int:
+    base_mix = dict(DEFAULT_MIX)
+    mix = parse_mix(args.mix, base_mix)
+
+    if args.in_process or args.memory:
+        client_context = in_process_client(args.memory)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client_context = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout)
+
+    async with client_context as client:
+        if args.seed:
+            await seed_articles(client, args.seed)
+        results = await run_load(client, mix, args.concurrency, args.duration, args.warmup, args.random_seed)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.check:
+        with open(args.check) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"REGRESSION against {args.check}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"no regressions against {args.check}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://localhost:8001")
+    target.add_argument("--in-process", action="store_true", help="serve the app in this process against MONGO_URL")
+    target.add_argument("--memory", action="store_true", help="serve the app in this process on in-memory storage")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before measuring")
+    parser.add_argument("--mix", help="weight overrides, e.g. search=0,get_article=40")
+    parser.add_argument("--seed", type=int, default=0, help="bulk-import this many articles first")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", help="write the full results to this file")
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--check", metavar="FILE", help="fail when results regress against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fractional regression")
+    sys.exit(asyncio.run(main(parser.parse_args())))
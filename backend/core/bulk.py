@@ -0,0 +1,161 @@
+import codecs
+import json
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from core.storage import ArticleStore
+
+# Records are validated and written this many at a time
+BULK_CHUNK_SIZE = 1000
+
+Record = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+
+async def iter_json_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Parse a streamed NDJSON or JSON array body into (record, error) pairs.
+
+    The format is sniffed from the first non-blank byte, and only one
+    chunk of the body is held in memory at a time.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    chunks = chunks.__aiter__()
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        if buffer.strip():
+            break
+    buffer = buffer.lstrip()
+
+    if buffer.startswith("["):
+        async for record in _iter_array(buffer[1:], chunks, decoder):
+            yield record
+    else:
+        async for record in _iter_lines(buffer, chunks, decoder):
+            yield record
+
+
+def _parse_object(text: str) -> Record:
+    try:
+        value = json.loads(text)
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+    if not isinstance(value, dict):
+        return None, "Record must be a JSON object"
+    return value, None
+
+
+async def _iter_lines(buffer: str, chunks, decoder) -> AsyncIterator[Record]:
+    while True:
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_object(line)
+        try:
+            buffer += decoder.decode(await chunks.__anext__())
+        except StopAsyncIteration:
+            break
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield _parse_object(buffer)
+
+
+def _element_end(text: str) -> Optional[int]:
+    """Index of the ',' or ']' ending the array element text starts with, or None if it is not all there yet.
+
+    Brackets inside strings do not count, so a malformed element can be
+    skipped without losing the elements after it.
+    """
+    depth = 0
+    in_string = escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            if depth == 0:
+                return index
+            depth -= 1
+        elif char == "," and depth == 0:
+            return index
+    return None
+
+
+async def _iter_array(buffer: str, chunks, decoder) -> AsyncIterator[Record]:
+    parser = json.JSONDecoder()
+    exhausted = False
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+        if buffer:
+            try:
+                value, end = parser.raw_decode(buffer)
+            except ValueError as e:
+                # Either the element is cut off at the end of the buffer, or it is malformed;
+                # a malformed one is reported on its own and parsing resumes after it
+                end = _element_end(buffer)
+                if end is not None:
+                    yield None, f"Invalid JSON: {e}"
+                    buffer = buffer[end:]
+                    continue
+                if exhausted:
+                    yield None, f"Invalid JSON array: {e}"
+                    return
+            else:
+                buffer = buffer[end:]
+                yield (value, None) if isinstance(value, dict) else (None, "Record must be a JSON object")
+                continue
+        elif exhausted:
+            yield None, "Invalid JSON array: missing closing bracket"
+            return
+        # Need more of the body to finish the current element
+        try:
+            buffer += decoder.decode(await chunks.__anext__())
+        except StopAsyncIteration:
+            buffer += decoder.decode(b"", final=True)
+            exhausted = True
+
+
+async def upsert_chunk(
+    articles: ArticleStore,
+    model: type,
+    records: List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]],
+) -> List[Dict[str, Any]]:
+    """Validate one chunk of article records and upsert the valid ones keyed on id"""
+    results: Dict[int, Dict[str, Any]] = {}
+    items = []
+    positions = []
+    for index, record, error in records:
+        if error is None:
+            try:
+                article: BaseModel = model(**record)
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        if error is not None:
+            results[index] = {"index": index, "id": (record or {}).get("id"), "status": "invalid", "error": error}
+            continue
+
+        fields = article.model_dump()
+        article_id = fields.pop("id", None) or str(uuid.uuid4())
+        items.append((article_id, fields))
+        positions.append((index, article_id))
+
+    if items:
+        outcomes = await articles.upsert_many(items, datetime.utcnow())
+        for (index, article_id), (status, error) in zip(positions, outcomes):
+            results[index] = {"index": index, "id": article_id, "status": status}
+            if error is not None:
+                results[index]["error"] = error
+
+    return [results[index] for index, _, _ in records]
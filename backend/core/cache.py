@@ -0,0 +1,159 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request
+
+
+# Tags whose invalidations are remembered, as a multiple of max_entries, before the record starts over
+GENERATION_LIMIT = 4
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a TTL and can be dropped by tag.
+
+    A read that fills the cache takes generation(tags) before querying and
+    passes it to set(); if any of those tags was invalidated in between, the
+    result predates a write and is not cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (expires_at, value, tags), oldest first
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+        # Last invalidation of each tag, numbered from _sequence; a clear starts a new _epoch
+        self._generations: Dict[str, int] = {}
+        self._sequence = 0
+        self._epoch = 0
+        # Called with the invalidated tags, or None when the cache is cleared
+        self._listeners: List[Callable[[Optional[Tuple[str, ...]]], None]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        """Token for a read about to fill entries with these tags; pass it to set()"""
+        return (self._epoch, *(self._generations.get(tag, 0) for tag in tags))
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = (),
+            generation: Optional[Tuple[int, ...]] = None) -> None:
+        if not self.enabled:
+            return
+        tags = tuple(tags)
+        if generation is not None and generation != self.generation(tags):
+            # A write invalidated these tags while the value was being read
+            self.stale_fills += 1
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (self._clock() + self.ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, *tags: str, notify: bool = True) -> int:
+        """Drop every entry carrying any of the given tags.
+
+        notify=False skips the listeners, for invalidations that came from them.
+        """
+        removed = 0
+        self._sequence += 1
+        if len(self._generations) + len(tags) > GENERATION_LIMIT * max(self.max_entries, 1):
+            # Forget old generations; tokens taken before this no longer match, so those reads just skip caching
+            self._generations.clear()
+            self._epoch += 1
+        for tag in tags:
+            self._generations[tag] = self._sequence
+            for key in self._tags.pop(tag, set()):
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+        self.invalidations += removed
+        if notify:
+            for listener in self._listeners:
+                listener(tags)
+        return removed
+
+    def clear(self, notify: bool = True) -> None:
+        self._entries.clear()
+        self._tags.clear()
+        self._generations.clear()
+        self._epoch += 1
+        if notify:
+            for listener in self._listeners:
+                listener(None)
+
+    def add_listener(self, listener: Callable[[Optional[Tuple[str, ...]]], None]) -> None:
+        """Also tell listener about writes, e.g. to update copies kept outside this cache"""
+        self._listeners.append(listener)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_fills": self.stale_fills,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+def create_cache() -> TTLCache:
+    """Build the read cache from CACHE_MAX_ENTRIES / CACHE_TTL_SECONDS"""
+    return TTLCache(
+        max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 1024)),
+        ttl=float(os.environ.get('CACHE_TTL_SECONDS', 60)),
+    )
+
+
+def get_cache(request: Request) -> TTLCache:
+    """Dependency returning the read cache created by the app lifespan"""
+    return request.app.state.cache
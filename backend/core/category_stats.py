@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteOne, ReplaceOne
+
+from core.database import create_client, load_settings
+
+# One document per category: {"_id": <category name>, "count": n, "featured": m}.
+# Article writes keep it current with $inc so reading counts never scans articles.
+COLLECTION = "category_stats"
+
+
+async def _inc(db: AsyncIOMotorDatabase, category: str, count: int, featured: int) -> None:
+    if count == 0 and featured == 0:
+        return
+    await db[COLLECTION].update_one(
+        {"_id": category},
+        {"$inc": {"count": count, "featured": featured}},
+        upsert=True,
+    )
+
+
+async def record_insert(db: AsyncIOMotorDatabase, article: Dict[str, Any]) -> None:
+    await _inc(db, article["category"], 1, int(bool(article.get("featured"))))
+
+
+async def record_delete(db: AsyncIOMotorDatabase, article: Dict[str, Any]) -> None:
+    await _inc(db, article["category"], -1, -int(bool(article.get("featured"))))
+
+
+async def record_update(db: AsyncIOMotorDatabase, previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Move an article between categories and/or flip its featured flag"""
+    was_featured = int(bool(previous.get("featured")))
+    is_featured = int(bool(current.get("featured")))
+    if previous["category"] != current["category"]:
+        await _inc(db, previous["category"], -1, -was_featured)
+        await _inc(db, current["category"], 1, is_featured)
+    else:
+        await _inc(db, current["category"], 0, is_featured - was_featured)
+
+
+async def list_stats(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """Non-empty categories in name order"""
+    return await db[COLLECTION].find({"count": {"$gt": 0}}).sort("_id", 1).to_list(100)
+
+
+async def _actual_counts(db: AsyncIOMotorDatabase) -> Dict[str, Dict[str, int]]:
+    pipeline = [
+        {"$group": {
+            "_id": "$category",
+            "count": {"$sum": 1},
+            "featured": {"$sum": {"$cond": ["$featured", 1, 0]}},
+        }},
+    ]
+    rows = await db.articles.aggregate(pipeline).to_list(None)
+    return {row["_id"]: {"count": row["count"], "featured": row["featured"]} for row in rows}
+
+
+async def verify(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """Compare the rollup with a full aggregation and return every category that drifted"""
+    actual = await _actual_counts(db)
+    stored = {
+        row["_id"]: {"count": row.get("count", 0), "featured": row.get("featured", 0)}
+        for row in await db[COLLECTION].find().to_list(None)
+    }
+    empty = {"count": 0, "featured": 0}
+    drift = []
+    for category in sorted(set(actual) | set(stored)):
+        expected = actual.get(category, empty)
+        found = stored.get(category, empty)
+        if expected != found:
+            drift.append({"category": category, "expected": expected, "stored": found})
+    return drift
+
+
+async def rebuild(db: AsyncIOMotorDatabase) -> int:
+    """Recompute the rollup from the articles collection; returns the number of categories"""
+    actual = await _actual_counts(db)
+    stored = await db[COLLECTION].distinct("_id")
+    requests = [ReplaceOne({"_id": name}, {"_id": name, **counts}, upsert=True) for name, counts in actual.items()]
+    requests += [DeleteOne({"_id": name}) for name in stored if name not in actual]
+    if requests:
+        await db[COLLECTION].bulk_write(requests, ordered=False)
+    return len(actual)
+
+
+async def ensure_stats(db: AsyncIOMotorDatabase) -> Optional[int]:
+    """Build the rollup on first start against a database that predates it"""
+    if await db[COLLECTION].estimated_document_count() == 0 and await db.articles.estimated_document_count() > 0:
+        return await rebuild(db)
+    return None
+
+
+async def _main(command: str) -> int:
+    settings = load_settings()
+    client = create_client(settings)
+    db = client[settings.db_name]
+    try:
+        if command == "rebuild":
+            print(f"Rebuilt counts for {await rebuild(db)} categories")
+            return 0
+
+        drift = await verify(db)
+        for entry in drift:
+            print(f"{entry['category']}: stored {entry['stored']}, expected {entry['expected']}")
+        print("Category stats are consistent" if not drift else f"{len(drift)} categories drifted")
+        return 1 if drift else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or rebuild the category_stats rollup")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.command)))
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "cache_versions"
+STAMP_ID = "articles"
+
+# Invalidations kept on the stamp; a worker further behind than this clears its whole cache
+DEFAULT_KEEP = 256
+
+# Called with remote tags, or None when another worker cleared its cache
+RemoteListener = Callable[[Optional[Tuple[str, ...]]], Awaitable[None]]
+
+
+class CacheCoherence:
+    """Keeps the read caches of every worker and replica in step through MongoDB.
+
+    Each write's invalidation is appended to one version-stamp document in a
+    single atomic update: version is incremented and {tags, origin} pushed
+    onto a capped list, so the entry for version v sits v - version places
+    from the end. Every worker remembers the last version it applied and
+    either watches the document through a change stream (replica sets) or
+    polls it every interval seconds with a query that only returns a
+    document when the version has moved. It then drops the entries tagged by
+    other workers' writes, or everything if it fell more than keep versions
+    behind, so caches are stale for at most one interval plus a round trip.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, cache: TTLCache, interval: float = 1.0,
+                 mode: str = "auto", keep: int = DEFAULT_KEEP):
+        self._collection = db[COLLECTION]
+        self._cache = cache
+        self.interval = interval
+        self.mode = mode
+        self.keep = keep
+        self.origin = uuid.uuid4().hex
+        self.version = 0
+        self.following = "stopped"
+        self._listeners: List[RemoteListener] = []
+        # Local invalidations not yet written to the stamp; None means a full clear
+        self._pending: Optional[Set[str]] = set()
+        self._dirty = False
+        self._publisher: Optional[asyncio.Task] = None
+        self._follower: Optional[asyncio.Task] = None
+        self.published = 0
+        self.publish_failures = 0
+        self.received = 0
+        self.full_clears = 0
+        self.last_sync_at: Optional[float] = None
+
+    def add_listener(self, listener: RemoteListener) -> None:
+        """Also tell listener about other workers' invalidations once the cache has dropped them"""
+        self._listeners.append(listener)
+
+    async def start(self) -> None:
+        stamp = await self._collection.find_one({"_id": STAMP_ID}, {"version": 1})
+        self.version = stamp["version"] if stamp else 0
+        self._cache.add_listener(self.invalidated)
+        self._follower = asyncio.ensure_future(self._follow())
+
+    async def close(self) -> None:
+        if self._publisher is not None:
+            await asyncio.gather(self._publisher, return_exceptions=True)
+        if self._follower is not None:
+            self._follower.cancel()
+            await asyncio.gather(self._follower, return_exceptions=True)
+
+    # -- publishing local writes ----------------------------------------------
+
+    def invalidated(self, tags: Optional[Tuple[str, ...]]) -> None:
+        """Cache listener: queue this worker's invalidation for the other workers"""
+        if tags is None or self._pending is None:
+            self._pending = None
+        else:
+            self._pending.update(tags)
+        self._dirty = True
+        if self._publisher is None or self._publisher.done():
+            self._publisher = asyncio.ensure_future(self._publish())
+
+    async def _publish(self) -> None:
+        # Invalidations arriving during a round trip go out together in the next one
+        while self._dirty:
+            tags, self._pending, self._dirty = self._pending, set(), False
+            entry = {"tags": sorted(tags) if tags is not None else None, "origin": self.origin}
+            try:
+                await self._collection.update_one(
+                    {"_id": STAMP_ID},
+                    {"$inc": {"version": 1}, "$push": {"recent": {"$each": [entry], "$slice": -self.keep}}},
+                    upsert=True,
+                )
+                self.published += 1
+            except PyMongoError:
+                self.publish_failures += 1
+                logger.exception("Could not publish cache invalidation; other workers stay stale until their TTL")
+
+    # -- following other workers -------------------------------------------------
+
+    async def _follow(self) -> None:
+        watch = self.mode in ("auto", "watch")
+        while True:
+            try:
+                if watch:
+                    await self._watch()
+                else:
+                    self.following = "poll"
+                    await self._poll()
+                    await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if watch and self.mode == "auto":
+                    # Standalone servers have no change streams; polling works everywhere
+                    logger.info("Change streams unavailable (%s); polling the cache version every %.1fs",
+                                e, self.interval)
+                    watch = False
+                else:
+                    logger.warning("Cache version sync failed: %s", e)
+                    await asyncio.sleep(self.interval)
+            except PyMongoError as e:
+                logger.warning("Cache version sync failed: %s", e)
+                await asyncio.sleep(self.interval)
+
+    async def _watch(self) -> None:
+        pipeline = [{"$match": {"documentKey._id": STAMP_ID}}]
+        async with self._collection.watch(pipeline, full_document="updateLookup") as stream:
+            self.following = "watch"
+            # Anything written before the stream opened
+            await self._poll()
+            async for change in stream:
+                self.last_sync_at = time.time()
+                if change.get("fullDocument") is not None:
+                    await self._apply(change["fullDocument"], from_stream=True)
+
+    async def _poll(self) -> None:
+        # Returns nothing unless the version moved, so an idle poll is one tiny round trip
+        stamp = await self._collection.find_one(
+            {"_id": STAMP_ID, "version": {"$ne": self.version}},
+            {"version": 1, "recent": {"$slice": -self.keep}},
+        )
+        self.last_sync_at = time.time()
+        if stamp is not None:
+            await self._apply(stamp)
+
+    async def _apply(self, stamp: Dict[str, Any], from_stream: bool = False) -> None:
+        version = stamp.get("version", 0)
+        recent = stamp.get("recent", [])
+        # A stream event can trail the poll made when the stream opened
+        if version == self.version or (from_stream and version < self.version):
+            return
+        behind = version - self.version
+        if behind < 0 or behind > len(recent):
+            # Missed entries (or the stamp was reset), so nothing cached here can be trusted
+            entries = [{"tags": None, "origin": None}]
+        else:
+            entries = recent[len(recent) - behind:]
+        self.version = version
+
+        tags: Optional[Set[str]] = set()
+        for entry in entries:
+            if entry.get("origin") == self.origin:
+                continue
+            self.received += 1
+            if entry.get("tags") is None:
+                tags = None
+                break
+            tags.update(entry["tags"])
+        if tags is None:
+            self.full_clears += 1
+            self._cache.clear(notify=False)
+        elif tags:
+            self._cache.invalidate(*tags, notify=False)
+        else:
+            return
+        for listener in self._listeners:
+            try:
+                await listener(tuple(sorted(tags)) if tags is not None else None)
+            except Exception:
+                logger.exception("Remote invalidation listener failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "following": self.following,
+            "interval_seconds": self.interval,
+            "version": self.version,
+            "published": self.published,
+            "publish_failures": self.publish_failures,
+            "received": self.received,
+            "full_clears": self.full_clears,
+            "seconds_since_sync": round(time.time() - self.last_sync_at, 3) if self.last_sync_at else None,
+        }
+
+
+def create_cache_coherence(db: AsyncIOMotorDatabase, cache: TTLCache) -> Optional[CacheCoherence]:
+    """Sync cache invalidations between processes unless CACHE_SYNC=off.
+
+    CACHE_SYNC=auto (default) watches a change stream when the server has
+    one and polls otherwise; poll and watch force either.
+    """
+    mode = os.environ.get('CACHE_SYNC', 'auto').lower()
+    if mode in ('off', 'false', '0', 'no'):
+        return None
+    if mode not in ('auto', 'poll', 'watch'):
+        raise ValueError(f"Unknown CACHE_SYNC {mode!r}; use auto, poll, watch or off")
+    return CacheCoherence(
+        db, cache,
+        interval=float(os.environ.get('CACHE_SYNC_INTERVAL', 1.0)),
+        mode=mode,
+        keep=int(os.environ.get('CACHE_SYNC_KEEP', DEFAULT_KEEP)),
+    )
@@ -0,0 +1,224 @@
+import gzip
+import os
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is listed in requirements.txt
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+class Compressor:
+    """Negotiates and performs response compression, and counts what it costs and saves"""
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # Preferred first when the client accepts several equally
+        self.encodings: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+        self._stats: Dict[str, Dict[str, Any]] = {
+            encoding: {"responses": 0, "cached_responses": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0}
+            for encoding in self.encodings
+        }
+
+    @classmethod
+    def from_env(cls) -> "Compressor":
+        return cls(
+            min_size=int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)),
+            gzip_level=int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6)),
+            brotli_quality=int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5)),
+        )
+
+    def choose(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Pick the best coding the client accepts, or None for identity"""
+        if not accept_encoding:
+            return None
+        codings = parse_accept_encoding(accept_encoding)
+        wildcard = codings.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = codings.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        started = time.perf_counter()
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        self.record(encoding, len(body), len(compressed), time.perf_counter() - started)
+        return compressed
+
+    def streaming(self, encoding: str) -> "StreamingCompressor":
+        return StreamingCompressor(self, encoding)
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, seconds: float, responses: int = 1) -> None:
+        stats = self._stats[encoding]
+        stats["responses"] += responses
+        stats["bytes_in"] += bytes_in
+        stats["bytes_out"] += bytes_out
+        stats["seconds"] += seconds
+
+    def record_cached(self, encoding: str) -> None:
+        self._stats[encoding]["cached_responses"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        report = {"min_size": self.min_size, "encodings": {}}
+        for encoding, stats in self._stats.items():
+            saved = stats["bytes_in"] - stats["bytes_out"]
+            report["encodings"][encoding] = {
+                **stats,
+                "seconds": round(stats["seconds"], 6),
+                "bytes_saved": saved,
+                "ratio": round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else 0.0,
+                "ms_per_response": round(stats["seconds"] / stats["responses"] * 1000, 3) if stats["responses"] else 0.0,
+            }
+        return report
+
+
+class StreamingCompressor:
+    """Incremental gzip/brotli encoder for bodies sent in several chunks"""
+
+    def __init__(self, compressor: Compressor, encoding: str):
+        self._compressor = compressor
+        self._encoding = encoding
+        if encoding == "br":
+            self._encoder = brotli.Compressor(quality=compressor.brotli_quality)
+        else:
+            self._encoder = zlib.compressobj(compressor.gzip_level, zlib.DEFLATED, 31)
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._seconds = 0.0
+
+    def feed(self, chunk: bytes, final: bool = False) -> bytes:
+        started = time.perf_counter()
+        if self._encoding == "br":
+            out = self._encoder.process(chunk) + (self._encoder.finish() if final else b"")
+        else:
+            out = self._encoder.compress(chunk) + (self._encoder.flush() if final else b"")
+        self._seconds += time.perf_counter() - started
+        self._bytes_in += len(chunk)
+        self._bytes_out += len(out)
+        if final:
+            self._compressor.record(self._encoding, self._bytes_in, self._bytes_out, self._seconds)
+        return out
+
+
+class EncodedBody:
+    """A response body plus its compressed variants, each produced at most once.
+
+    Stored in the read cache so hot responses are compressed once per
+    encoding rather than once per request.
+    """
+    __slots__ = ("raw", "_variants")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._variants: Dict[str, bytes] = {}
+
+    def negotiate(self, compressor: Compressor, encoding: Optional[str]) -> Optional[str]:
+        """Encoding to apply for the client's choice; small bodies are sent as-is"""
+        if encoding is None or len(self.raw) < compressor.min_size:
+            return None
+        return encoding
+
+    def variant(self, compressor: Compressor, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.raw
+        variant = self._variants.get(encoding)
+        if variant is None:
+            variant = self._variants[encoding] = compressor.compress(self.raw, encoding)
+        else:
+            compressor.record_cached(encoding)
+        return variant
+
+
+class CompressionMiddleware:
+    """Compresses responses that routes did not already encode themselves"""
+
+    def __init__(self, app: ASGIApp, compressor: Compressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.compressor.choose(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, self.compressor, encoding))
+
+
+class _CompressingSend:
+    def __init__(self, send: Send, compressor: Compressor, encoding: str):
+        self._send = send
+        self._compressor = compressor
+        self._encoding = encoding
+        self._start: Optional[Message] = None
+        self._stream: Optional[StreamingCompressor] = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._start is not None:
+            start, self._start = self._start, None
+            headers = MutableHeaders(raw=start["headers"])
+            passthrough = (
+                "content-encoding" in headers
+                or start["status"] in (204, 304)
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                or (not more_body and len(body) < self._compressor.min_size)
+            )
+            if not passthrough:
+                headers["Content-Encoding"] = self._encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                    self._stream = self._compressor.streaming(self._encoding)
+                else:
+                    body = self._compressor.compress(body, self._encoding)
+                    headers["Content-Length"] = str(len(body))
+            await self._send(start)
+
+        if self._stream is not None:
+            body = self._stream.feed(body, final=not more_body)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
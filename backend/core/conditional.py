@@ -0,0 +1,83 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from fastapi import Request, Response
+
+
+def _utc(value: datetime) -> datetime:
+    """Mongo hands back naive UTC datetimes; make them aware for comparisons"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@dataclass(frozen=True)
+class Validators:
+    """ETag / Last-Modified pair describing one representation"""
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    def etag_for(self, encoding: Optional[str] = None) -> str:
+        """Each content-coding is a different representation, so it gets its own ETag"""
+        if encoding is None:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def headers(self, encoding: Optional[str] = None) -> Dict[str, str]:
+        headers = {"ETag": self.etag_for(encoding)}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(_utc(self.last_modified), usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """True when the client's cached copy is still current"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+            tags = [_strip_encoding(tag.strip().removeprefix("W/")) for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or self.last_modified is None:
+            return False
+        try:
+            since = _utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return _utc(self.last_modified).replace(microsecond=0) <= since
+
+    def not_modified(self, encoding: Optional[str] = None) -> Response:
+        return Response(status_code=304, headers={**self.headers(encoding), "Vary": "Accept-Encoding"})
+
+
+def _strip_encoding(tag: str) -> str:
+    for suffix in ('-br"', '-gzip"'):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def make_etag(*parts: object) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def article_validators(article: Mapping[str, Any]) -> Validators:
+    """Validators for a single article document, derived from its id and updatedAt"""
+    return Validators(make_etag(article["id"], article["updatedAt"].isoformat()), article["updatedAt"])
+
+
+def collection_validators(articles: Iterable[Mapping[str, Any]], *extra: object) -> Validators:
+    """Validators for a list of article documents; any edit, insert or removal changes the ETag.
+
+    No Last-Modified is sent: removing an article does not move the newest
+    updatedAt, so a date alone could not tell the client the list changed.
+    """
+    parts = [f"{article['id']}@{article.get('updatedAt')}" for article in articles]
+    return Validators(make_etag(*parts, *extra))
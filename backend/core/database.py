@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+ROOT_DIR = Path(__file__).parent.parent
+
+# The one place backend/.env is read: on first import, which the server and
+# every command-line tool reach before reading any setting. Variables
+# already set in the environment take precedence over the file.
+load_dotenv(ROOT_DIR / '.env')
+
+
+@dataclass(frozen=True)
+class MongoSettings:
+    url: str
+    db_name: str
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = None
+    connect_timeout_ms: int = 20000
+    server_selection_timeout_ms: int = 30000
+    wait_queue_timeout_ms: Optional[int] = None
+    compressors: Optional[str] = None
+    read_preference: str = "primary"
+
+    def client_options(self) -> Dict[str, Any]:
+        """Keyword arguments for AsyncIOMotorClient"""
+        options: Dict[str, Any] = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "readPreference": self.read_preference,
+        }
+        if self.max_idle_time_ms is not None:
+            options["maxIdleTimeMS"] = self.max_idle_time_ms
+        if self.wait_queue_timeout_ms is not None:
+            options["waitQueueTimeoutMS"] = self.wait_queue_timeout_ms
+        if self.compressors:
+            options["compressors"] = self.compressors
+        return options
+
+
+def _int_env(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def load_settings() -> MongoSettings:
+    """Read MongoDB settings from the environment (and backend/.env)"""
+    return MongoSettings(
+        url=os.environ['MONGO_URL'],
+        db_name=os.environ['DB_NAME'],
+        max_pool_size=_int_env('MONGO_MAX_POOL_SIZE', 100),
+        min_pool_size=_int_env('MONGO_MIN_POOL_SIZE', 0),
+        max_idle_time_ms=_int_env('MONGO_MAX_IDLE_TIME_MS', None),
+        connect_timeout_ms=_int_env('MONGO_CONNECT_TIMEOUT_MS', 20000),
+        server_selection_timeout_ms=_int_env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000),
+        wait_queue_timeout_ms=_int_env('MONGO_WAIT_QUEUE_TIMEOUT_MS', None),
+        compressors=os.environ.get('MONGO_COMPRESSORS') or None,
+        read_preference=os.environ.get('MONGO_READ_PREFERENCE', 'primary'),
+    )
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool listener tracking checkout wait times and socket counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Checkout start and finish are emitted on the same driver thread
+        self._local = threading.local()
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checked_out = 0
+        self.connections_open = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checked_out": self.checked_out,
+                "connections_open": self.connections_open,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+def create_client(settings: MongoSettings, listeners: Optional[List[Any]] = None) -> AsyncIOMotorClient:
+    """Build the one Motor client a process should hold"""
+    return AsyncIOMotorClient(settings.url, event_listeners=listeners or [], **settings.client_options())
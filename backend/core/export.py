@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Sequence
+
+# Documents pulled from the Motor cursor per network round trip and per
+# chunk written to the client
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _row(document: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: _encode(document.get(field)) for field in fields}
+
+
+class _CsvLines:
+    """Formats rows as CSV lines through one reusable writer"""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def __call__(self, values) -> str:
+        self._writer.writerow(values)
+        line = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return line
+
+
+async def stream_documents(cursor, fields: Sequence[str], fmt: str) -> AsyncIterator[str]:
+    """Serialize a Motor cursor as a JSON array, NDJSON or CSV, one batch at a time"""
+    csv_line = _CsvLines()
+    if fmt == "csv":
+        yield csv_line(fields)
+    elif fmt == "json":
+        yield "["
+
+    batch = []
+    separator = ""
+    async for document in cursor:
+        row = _row(document, fields)
+        if fmt == "csv":
+            batch.append(csv_line(row.values()))
+        elif fmt == "json":
+            batch.append(separator + json.dumps(row))
+            separator = ","
+        else:
+            batch.append(json.dumps(row) + "\n")
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield "".join(batch)
+            batch.clear()
+
+    if batch:
+        yield "".join(batch)
+    if fmt == "json":
+        yield "]"
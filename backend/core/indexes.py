@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+from core.database import create_client, load_settings
+from core.pagination import ARTICLE_SORT, DEFAULT_PAGE_SIZE
+from core.storage import (
+    EXPORT_SORT, FEATURED_QUERY, UNEXPORTED_QUERY, export_query, page_query, search_pipeline,
+    subscriber_query, subscriber_sort
+)
+
+logger = logging.getLogger(__name__)
+
+# Relevance weights for article search; a title match outranks a body match
+SEARCH_WEIGHTS = {"title": 10, "excerpt": 5, "category": 3, "author": 3, "content": 1}
+
+# Every index the application relies on, per collection. Key patterns are
+# left unnamed so existing deployments that created the same keys by hand
+# (e.g. through seed_data.py) are recognised instead of conflicting.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "articles": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("publishDate", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("category", ASCENDING), ("publishDate", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("featured", ASCENDING), ("publishDate", DESCENDING), ("id", DESCENDING)]),
+        IndexModel(
+            [("title", TEXT), ("excerpt", TEXT), ("content", TEXT), ("author", TEXT), ("category", TEXT)],
+            weights=SEARCH_WEIGHTS,
+            name="article_search",
+        ),
+    ],
+    "newsletter_subscribers": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("subscribedAt", ASCENDING), ("id", ASCENDING)]),
+        # Serves both the search for subscribers not yet in a batch (null) and batch ranges
+        IndexModel([("exportBatch", ASCENDING), ("subscribedAt", ASCENDING), ("id", ASCENDING)]),
+    ],
+}
+
+_SAMPLE_DATE = datetime(2025, 1, 1)
+_PAGE_LIMIT = DEFAULT_PAGE_SIZE + 1
+
+
+def _find(name: str, collection: str, query: Dict[str, Any], sort=None, limit: Optional[int] = None) -> Dict[str, Any]:
+    shape: Dict[str, Any] = {"name": name, "find": collection, "filter": query}
+    if sort is not None:
+        shape["sort"] = dict(sort)
+    if limit is not None:
+        shape["limit"] = limit
+    return shape
+
+
+# The query shapes issued by the MongoDB stores, used by the audit. They are
+# built by the same functions and sort orders the stores use, so they cannot
+# drift from what the routes actually send
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    _find("articles.page", "articles", page_query(None, None), ARTICLE_SORT, _PAGE_LIMIT),
+    _find("articles.page_after", "articles", page_query(None, (_SAMPLE_DATE, "audit")), ARTICLE_SORT, _PAGE_LIMIT),
+    _find("articles.by_category", "articles", page_query("Cardio", (_SAMPLE_DATE, "audit")), ARTICLE_SORT, _PAGE_LIMIT),
+    _find("articles.featured", "articles", FEATURED_QUERY, ARTICLE_SORT, 100),
+    # Search is an aggregation: $text match, textScore added as a field, the
+    # keyset $match on it for later pages, then sort, limit and project
+    {"name": "articles.search", "aggregate": "articles",
+     "pipeline": search_pipeline("audit", None, None, _PAGE_LIMIT, ["id"])},
+    {"name": "articles.search_after", "aggregate": "articles",
+     "pipeline": search_pipeline("audit", "Cardio", (1.0, "audit"), _PAGE_LIMIT, ["id"])},
+    _find("articles.by_id", "articles", {"id": "audit"}, limit=1),
+    _find("articles.by_ids", "articles", {"id": {"$in": ["audit", "audit-2"]}}),
+    _find("category_stats.list", "category_stats", {"count": {"$gt": 0}}, [("_id", 1)], 100),
+    _find("subscribers.by_email", "newsletter_subscribers", {"email": "audit@example.com"}, limit=1),
+    _find("subscribers.list", "newsletter_subscribers", subscriber_query(None, descending=True),
+          subscriber_sort(descending=True)),
+    _find("subscribers.export_batch", "newsletter_subscribers", UNEXPORTED_QUERY),
+    _find("subscribers.export", "newsletter_subscribers", export_query(1, 2), EXPORT_SORT),
+]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """Create any missing indexes from the registry"""
+    for collection, models in INDEXES.items():
+        names = await db[collection].create_indexes(models)
+        logger.info("Ensured indexes on %s: %s", collection, ", ".join(names))
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Flatten a winning plan tree into its list of stage names"""
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def _winning_plans(explain: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Collect winning plans from find and aggregate explain output"""
+    if "queryPlanner" in explain:
+        return [explain["queryPlanner"]["winningPlan"]]
+    plans = []
+    for stage in explain.get("stages", []):
+        cursor = stage.get("$cursor", {})
+        if "queryPlanner" in cursor:
+            plans.append(cursor["queryPlanner"]["winningPlan"])
+    return plans
+
+
+def explain_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Winning plan stages of an explain result and whether it scans the collection"""
+    stages = [s for plan in _winning_plans(explain) for s in _plan_stages(plan)]
+    return {"stages": stages, "collscan": "COLLSCAN" in stages}
+
+
+async def audit_indexes(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """Explain every registered query shape and report which ones scan the collection"""
+    report = []
+    for shape in QUERY_SHAPES:
+        if "aggregate" in shape:
+            command = {"aggregate": shape["aggregate"], "pipeline": shape["pipeline"], "cursor": {}}
+        else:
+            command = {key: shape[key] for key in ("find", "filter", "sort", "limit") if key in shape}
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        report.append({"name": shape["name"], **explain_summary(explain)})
+    return report
+
+
+async def _main(command: str) -> int:
+    settings = load_settings()
+    client = create_client(settings)
+    db = client[settings.db_name]
+    try:
+        if command == "ensure":
+            await ensure_indexes(db)
+            print("Indexes ensured")
+            return 0
+
+        report = await audit_indexes(db)
+        for entry in report:
+            flag = "COLLSCAN" if entry["collscan"] else "ok"
+            print(f"{entry['name']:<28} {flag:<9} {' > '.join(entry['stages'])}")
+        return 1 if any(entry["collscan"] for entry in report) else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ensure or audit MongoDB indexes")
+    parser.add_argument("command", choices=["ensure", "audit"])
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.command)))
@@ -0,0 +1,277 @@
+import re
+import uuid
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from core.indexes import SEARCH_WEIGHTS
+from core.storage import ArticleStore, Position, Storage, SubscriberStore
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _naive_utc(value: Any) -> Any:
+    """Datetimes as MongoDB hands them back: naive, in UTC, to the millisecond"""
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def _stored(document: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of document with its datetimes converted as the Mongo backend's storage would"""
+    return {name: _naive_utc(value) for name, value in document.items()}
+
+
+def _position(position: Optional[Position]) -> Optional[Tuple[Any, str]]:
+    return (_naive_utc(position[0]), position[1]) if position is not None else None
+
+
+def _project(document: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {name: document[name] for name in fields if name in document}
+
+
+class _SortedKeys:
+    """Ascending list of (sort value, id) keys, walked in either direction from a position"""
+
+    def __init__(self):
+        self._keys: List[Tuple[Any, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Tuple[Any, str]) -> None:
+        insort(self._keys, key)
+
+    def remove(self, key: Tuple[Any, str]) -> None:
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def descending(self, before: Optional[Tuple[Any, str]] = None) -> Iterator[Tuple[Any, str]]:
+        """Keys from the largest down, strictly below before when given"""
+        index = len(self._keys) if before is None else bisect_left(self._keys, before)
+        for i in range(index - 1, -1, -1):
+            yield self._keys[i]
+
+    def ascending(self, after: Optional[Tuple[Any, str]] = None) -> Iterator[Tuple[Any, str]]:
+        """Keys from the smallest up, strictly above after when given"""
+        index = 0
+        if after is not None:
+            index = bisect_left(self._keys, after)
+            if index < len(self._keys) and self._keys[index] == after:
+                index += 1
+        for i in range(index, len(self._keys)):
+            yield self._keys[i]
+
+
+class MemoryArticleStore(ArticleStore):
+    """Articles held in process with the secondary indexes the routes query by.
+
+    - id: hash map to the document
+    - publishDate: sorted (publishDate, id) keys, overall, per category and for
+      featured articles, so keyset pages are a bisect plus a short walk
+    - category: hash map to that category's sorted keys, whose sizes are the counts
+    - text: inverted index of weighted term frequencies over SEARCH_WEIGHTS fields
+
+    Search scores are weighted term counts, not MongoDB's textScore, so the
+    order of hits can differ slightly from the Mongo backend.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_date = _SortedKeys()
+        self._by_category: Dict[str, _SortedKeys] = defaultdict(_SortedKeys)
+        self._featured = _SortedKeys()
+        self._terms: Dict[str, Dict[str, float]] = defaultdict(dict)
+
+    @staticmethod
+    def _key(article: Dict[str, Any]) -> Tuple[Any, str]:
+        return (article["publishDate"], article["id"])
+
+    def _prepare(self, article: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Everything _index needs, worked out before any index is touched so a bad document changes nothing"""
+        document = _stored(article)
+        if not isinstance(document.get("publishDate"), datetime):
+            raise ValueError(f"Article {document.get('id')} has no publishDate")
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in SEARCH_WEIGHTS.items():
+            for term in _tokens(str(document.get(field) or "")):
+                weights[term] += weight
+        return document, weights
+
+    def _index(self, prepared: Tuple[Dict[str, Any], Dict[str, float]]) -> None:
+        article, weights = prepared
+        key = self._key(article)
+        self._by_id[article["id"]] = article
+        self._by_date.add(key)
+        self._by_category[article["category"]].add(key)
+        if article.get("featured"):
+            self._featured.add(key)
+        for term, weight in weights.items():
+            self._terms[term][article["id"]] = weight
+
+    def _unindex(self, article: Dict[str, Any]) -> None:
+        key = self._key(article)
+        del self._by_id[article["id"]]
+        self._by_date.remove(key)
+        category = self._by_category[article["category"]]
+        category.remove(key)
+        if not category:
+            del self._by_category[article["category"]]
+        self._featured.remove(key)
+        for field in SEARCH_WEIGHTS:
+            for term in _tokens(str(article.get(field) or "")):
+                postings = self._terms.get(term)
+                if postings is not None:
+                    postings.pop(article["id"], None)
+                    if not postings:
+                        del self._terms[term]
+
+    def _walk(self, keys: _SortedKeys, after: Optional[Position], limit: int, fields: Sequence[str]) -> List[Dict[str, Any]]:
+        page = []
+        for _, article_id in keys.descending(_position(after)):
+            page.append(_project(self._by_id[article_id], fields))
+            if len(page) == limit:
+                break
+        return page
+
+    async def page(self, category, after, limit, fields):
+        if category:
+            keys = self._by_category.get(category)
+            if keys is None:
+                return []
+        else:
+            keys = self._by_date
+        return self._walk(keys, after, limit, fields)
+
+    async def featured(self, fields, limit):
+        return self._walk(self._featured, None, limit, fields)
+
+    async def search(self, text, category, after, limit, fields):
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(_tokens(text)):
+            for article_id, weight in self._terms.get(term, {}).items():
+                scores[article_id] += weight
+        hits = [
+            (score, article_id) for article_id, score in scores.items()
+            if not category or self._by_id[article_id]["category"] == category
+        ]
+        hits.sort(reverse=True)
+        if after is not None:
+            hits = [hit for hit in hits if hit < tuple(after)]
+        return [{**_project(self._by_id[article_id], fields), "score": score} for score, article_id in hits[:limit]]
+
+    async def get(self, article_id):
+        article = self._by_id.get(article_id)
+        return dict(article) if article is not None else None
+
+    async def get_many(self, article_ids):
+        return [dict(self._by_id[article_id]) for article_id in article_ids if article_id in self._by_id]
+
+    async def insert(self, article):
+        if article["id"] in self._by_id:
+            raise ValueError(f"Duplicate article id {article['id']}")
+        self._index(self._prepare(article))
+
+    async def update(self, article_id, changes):
+        previous = self._by_id.get(article_id)
+        if previous is None:
+            return None
+        prepared = self._prepare({**previous, **changes})
+        self._unindex(previous)
+        self._index(prepared)
+        # Same contract as the Mongo store, which only reads the old image when it is needed
+        if "category" in changes or "featured" in changes:
+            return dict(previous), dict(prepared[0])
+        return None, dict(prepared[0])
+
+    async def delete(self, article_id):
+        article = self._by_id.get(article_id)
+        if article is None:
+            return None
+        self._unindex(article)
+        return {name: article[name] for name in ("id", "category", "featured") if name in article}
+
+    async def upsert_many(self, items, now):
+        # Each item succeeds or fails on its own, like an unordered bulk_write
+        results = []
+        for article_id, fields in items:
+            previous = self._by_id.get(article_id)
+            try:
+                if previous is None:
+                    prepared = self._prepare({**fields, "id": article_id, "createdAt": now, "updatedAt": now})
+                else:
+                    prepared = self._prepare({**previous, **fields, "updatedAt": now})
+            except (TypeError, ValueError) as e:
+                results.append(("failed", str(e)))
+                continue
+            if previous is not None:
+                self._unindex(previous)
+            self._index(prepared)
+            results.append(("inserted" if previous is None else "updated", None))
+        return results
+
+    async def category_counts(self):
+        return [(name, len(keys)) for name, keys in sorted(self._by_category.items())]
+
+
+class MemorySubscriberStore(SubscriberStore):
+    """Subscribers held in process: a hash map on email, a sorted (subscribedAt, id)
+    index, and the (exportBatch, subscribedAt, id) keys of every exported batch"""
+
+    def __init__(self):
+        self._by_email: Dict[str, Dict[str, Any]] = {}
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_date = _SortedKeys()
+        # Batches are closed in increasing order, so appending keeps this sorted
+        self._exported: List[Tuple[int, Any, str]] = []
+        self._unexported: List[Tuple[Any, str]] = []
+        self._batch = 0
+
+    def _add(self, email: str, now: datetime) -> Dict[str, Any]:
+        subscriber = self._by_email.get(email)
+        if subscriber is None:
+            subscriber = {"id": str(uuid.uuid4()), "email": email, "subscribedAt": now}
+            self._by_email[email] = self._by_id[subscriber["id"]] = subscriber
+            self._by_date.add((now, subscriber["id"]))
+            self._unexported.append((now, subscriber["id"]))
+        return subscriber
+
+    async def subscribe(self, email):
+        return dict(self._add(email, _naive_utc(datetime.utcnow())))
+
+    async def subscribe_many(self, emails):
+        now = _naive_utc(datetime.utcnow())
+        return {email: dict(self._add(email, now)) for email in dict.fromkeys(emails)}
+
+    async def iterate(self, after=None, descending=False):
+        after = _position(after)
+        keys = self._by_date.descending(after) if descending else self._by_date.ascending(after)
+        # Materialized first so signups arriving mid-stream cannot disturb the walk
+        for key in list(keys):
+            yield dict(self._by_id[key[1]])
+
+    async def close_export_batch(self):
+        self._batch += 1
+        for key in sorted(self._unexported):
+            self._by_id[key[1]]["exportBatch"] = self._batch
+            self._exported.append((self._batch, *key))
+        self._unexported = []
+        return self._batch
+
+    async def iterate_exported(self, after, through):
+        start = bisect_left(self._exported, (after + 1,))
+        stop = bisect_left(self._exported, (through + 1,))
+        for _, _, subscriber_id in self._exported[start:stop]:
+            yield dict(self._by_id[subscriber_id])
+
+
+def memory_storage() -> Storage:
+    return Storage(articles=MemoryArticleStore(), subscribers=MemorySubscriberStore())
@@ -0,0 +1,230 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; spans cached reads (sub-millisecond) to slow exports
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, +Inf last), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total[0]) for labels, (counts, total) in self._series.items())
+        lines = []
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """The process's metrics, rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.requests = Counter(
+            "http_requests_total", "HTTP requests by route template and status",
+            ("method", "route", "status"))
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "HTTP request latency by route template and status",
+            ("method", "route", "status"))
+        self.in_flight = Gauge(
+            "http_requests_in_flight", "HTTP requests currently being served",
+            ("method", "route"))
+        self.mongo_duration = Histogram(
+            "mongodb_command_duration_seconds", "MongoDB command round trip time by collection",
+            ("collection", "command"))
+        self.mongo_failures = Counter(
+            "mongodb_command_failures_total", "MongoDB commands that returned an error",
+            ("collection", "command"))
+        self.read_calls = Counter(
+            "read_cache_miss_calls_total",
+            "Cache-miss reads by query; coalesced ones waited on an identical in-flight query",
+            ("query", "outcome"))
+        self.startup = Gauge(
+            "startup_phase_seconds", "Seconds this worker spent in each cold start phase; total runs from import to ready",
+            ("phase",))
+
+    def collectors(self) -> Iterable[_Metric]:
+        return (self.requests, self.request_duration, self.in_flight, self.mongo_duration, self.mongo_failures,
+                self.read_calls, self.startup)
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.collectors() for line in metric.render()) + "\n"
+
+
+def route_template(routes: Sequence[BaseRoute], scope: Scope) -> str:
+    """The path template a request will be routed to, e.g. /api/articles/{article_id}
+
+    Labels use templates rather than raw paths so ids do not create new series.
+    """
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and tracks how many are in flight, per route"""
+
+    def __init__(self, app: ASGIApp, metrics: Metrics, routes: Sequence[BaseRoute]):
+        self.app = app
+        self.metrics = metrics
+        self.routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.routes, scope)
+        status = "500"
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        self.metrics.in_flight.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.in_flight.dec(method, route)
+            self.metrics.requests.inc(method, route, status)
+            self.metrics.request_duration.observe(elapsed, method, route, status)
+
+
+def _collection(event: monitoring.CommandStartedEvent) -> str:
+    value = event.command.get(event.command_name)
+    if event.command_name == "getMore":
+        value = event.command.get("collection")
+    return value if isinstance(value, str) else ""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Command listener recording MongoDB round trip times per collection"""
+
+    def __init__(self, metrics: Metrics):
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        # Succeeded/failed events do not carry the command, so remember its collection
+        self._pending: Dict[Tuple[object, int], str] = {}
+
+    def _key(self, event) -> Tuple[object, int]:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        with self._lock:
+            self._pending[self._key(event)] = _collection(event)
+
+    def _finish(self, event) -> Optional[str]:
+        with self._lock:
+            return self._pending.pop(self._key(event), None)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._finish(event)
+        if collection is not None:
+            self._metrics.mongo_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._finish(event)
+        if collection is not None:
+            self._metrics.mongo_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+            self._metrics.mongo_failures.inc(collection, event.command_name)
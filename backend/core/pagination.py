@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Articles are listed newest first; id breaks ties between equal publish dates
+ARTICLE_SORT = [("publishDate", -1), ("id", -1)]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_cursor(publish_date: datetime, item_id: str) -> str:
+    """Build an opaque cursor pointing at the last item of a page"""
+    payload = json.dumps({"d": publish_date.isoformat(), "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Turn a cursor back into its (publishDate, id) position"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["d"]), str(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def encode_score_cursor(score: float, item_id: str) -> str:
+    """Build an opaque cursor for relevance-ranked results"""
+    payload = json.dumps({"s": score, "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_score_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(payload["s"]), str(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def encode_batch_cursor(batch: int) -> str:
+    """Build an opaque cursor for the last export batch a client has read"""
+    payload = json.dumps({"b": batch}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_batch_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(payload["b"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def _keyset(field: str, value: Any, item_id: str, op: str, id_op: str) -> Dict[str, Any]:
+    return {"$or": [{field: {op: value}}, {field: value, "id": {id_op: item_id}}]}
+
+
+def position_filter(value: Any, item_id: str, field: str = "publishDate", descending: bool = True) -> Dict[str, Any]:
+    """Mongo filter selecting documents that sort after a decoded (value, id) position"""
+    op = "$lt" if descending else "$gt"
+    return _keyset(field, value, item_id, op, op)
+
+
+def and_filters(*filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine filters, skipping empty ones"""
+    filters = [f for f in filters if f]
+    if not filters:
+        return {}
+    if len(filters) == 1:
+        return filters[0]
+    return {"$and": filters}
+
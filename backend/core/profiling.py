@@ -0,0 +1,285 @@
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bson import json_util
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.indexes import explain_summary
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+
+
+class RequestProfiler:
+    """Keeps cProfile captures of sampled or explicitly requested requests.
+
+    cProfile follows the event loop thread, not a single task, so a capture
+    also contains whatever other requests ran while this one was awaiting.
+    Only one request is profiled at a time.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, token: Optional[str] = None, keep: int = 20):
+        self.sample_rate = sample_rate
+        self.token = token
+        self.keep = keep
+        # id -> (request info, raw cProfile stats)
+        self._profiles: "OrderedDict[str, Tuple[Dict[str, Any], Dict]]" = OrderedDict()
+        self._active = False
+
+    def wants(self, scope: Scope) -> bool:
+        if self._active:
+            return False
+        if self.token and Headers(scope=scope).get(PROFILE_HEADER) == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> cProfile.Profile:
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile: cProfile.Profile, info: Dict[str, Any]) -> None:
+        profile.disable()
+        self._active = False
+        profile.create_stats()
+        self._profiles[info["id"]] = (info, profile.stats)
+        while len(self._profiles) > self.keep:
+            self._profiles.popitem(last=False)
+
+    def recent(self) -> List[Dict[str, Any]]:
+        return [info for info, _ in reversed(self._profiles.values())]
+
+    def get(self, profile_id: str) -> Optional[Tuple[Dict[str, Any], Dict]]:
+        return self._profiles.get(profile_id)
+
+    @staticmethod
+    def dump(stats: Dict) -> bytes:
+        """The capture in the .prof format read by pstats and snakeviz"""
+        return marshal.dumps(stats)
+
+    @staticmethod
+    def report(stats: Dict, sort: str = "cumulative", limit: int = 50) -> str:
+        stream = io.StringIO()
+        pstats.Stats(_Captured(stats), stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+class _Captured:
+    """Stands in for a Profile when loading pstats, which takes the stats it is given"""
+
+    def __init__(self, stats: Dict):
+        self.stats = dict(stats)
+
+    def create_stats(self) -> None:
+        pass
+
+
+class ProfilerMiddleware:
+    """Profiles the requests a RequestProfiler picks and tags them with X-Profile-Id"""
+
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.wants(scope):
+            await self.app(scope, receive, send)
+            return
+
+        info = {
+            "id": uuid.uuid4().hex[:16],
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "status": 500,
+            "started_at": datetime.utcnow(),
+        }
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                info["status"] = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = info["id"]
+            await send(message)
+
+        started = time.perf_counter()
+        profile = self.profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            info["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self.profiler.finish(profile, info)
+
+
+def create_profiler() -> Optional[RequestProfiler]:
+    """Build the request profiler when PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set"""
+    token = os.environ.get('PROFILE_TOKEN') or None
+    sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    if token is None and sample_rate <= 0:
+        return None
+    return RequestProfiler(sample_rate, token, keep=int(os.environ.get('PROFILE_KEEP', 20)))
+
+
+# Commands whose plan explain can describe
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+
+# Driver and session fields explain does not accept inside the explained command
+_SESSION_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "readConcern",
+                   "writeConcern", "autocommit", "startTransaction", "apiVersion", "apiStrict",
+                   "apiDeprecationErrors"}
+
+_IGNORED = {"hello", "isMaster", "ismaster", "ping", "endSessions", "explain", "saslStart",
+            "saslContinue", "killCursors"}
+
+# Most explains running at once, so a burst of slow queries cannot pile more load on the server
+MAX_PENDING_EXPLAINS = 4
+
+
+def _plain(value: Any) -> Any:
+    """BSON values (datetimes, ObjectIds) as JSON-safe relaxed extended JSON"""
+    return json.loads(json_util.dumps(value, json_options=json_util.RELAXED_JSON_OPTIONS))
+
+
+def _redact(value: Any) -> Any:
+    """Keep a filter's fields and operators but replace every value with its type, e.g. "<str>".
+
+    Filters carry user data such as subscriber emails, which must not end up
+    in logs or admin responses; the shape is what explains a slow query.
+    """
+    if isinstance(value, dict):
+        return {key: _redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in lists collapse to the distinct element shapes; $and / $or / pipelines keep every clause
+        shapes = [_redact(item) for item in value]
+        if all(not isinstance(shape, (dict, list)) for shape in shapes):
+            return list(dict.fromkeys(shapes))
+        return shapes
+    if value is None:
+        return None
+    return f"<{type(value).__name__}>"
+
+
+def _query_shape(name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    if name == "find":
+        shape = {"filter": command.get("filter"), "sort": command.get("sort")}
+    elif name == "aggregate":
+        shape = {"pipeline": command.get("pipeline")}
+    elif name == "findAndModify":
+        shape = {"filter": command.get("query"), "sort": command.get("sort")}
+    elif name in ("count", "distinct"):
+        shape = {"filter": command.get("query")}
+    elif name == "update" and command.get("updates"):
+        shape = {"filter": command["updates"][0].get("q")}
+    elif name == "delete" and command.get("deletes"):
+        shape = {"filter": command["deletes"][0].get("q")}
+    else:
+        return {}
+    # Sort directions are not user data and say which index could serve the query
+    return {key: value if key == "sort" else _redact(value) for key, value in shape.items()}
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Command listener logging MongoDB commands slower than a threshold.
+
+    Each entry carries the filter shape (values replaced by their types) and
+    sort; an explain of the same command is
+    run in the background and attached as a plan summary once it returns.
+    """
+
+    def __init__(self, threshold_ms: float, keep: int = 100):
+        self.threshold_ms = threshold_ms
+        self.entries: deque = deque(maxlen=keep)
+        self._pending: Dict[Tuple[object, int], Tuple[str, Dict[str, Any]]] = {}
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._explains: Set[asyncio.Task] = set()
+
+    def attach(self, client: AsyncIOMotorClient) -> None:
+        """Run explains on this client from the current event loop"""
+        self._client = client
+        self._loop = asyncio.get_running_loop()
+
+    def _key(self, event) -> Tuple[object, int]:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in _IGNORED:
+            # dict operations are atomic under the GIL; events arrive on driver threads
+            self._pending[self._key(event)] = (event.database_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        pending = self._pending.pop(self._key(event), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        database, command = pending
+        name = event.command_name
+        collection = command.get("collection") if name == "getMore" else command.get(name)
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "database": database,
+            "collection": collection if isinstance(collection, str) else None,
+            "command": name,
+            "duration_ms": round(duration_ms, 3),
+            "failed": failed,
+            **_plain(_query_shape(name, command)),
+            "explain": None,
+        }
+        self.entries.append(entry)
+        logger.warning("Slow MongoDB %s on %s took %.1f ms: %s", name, entry["collection"], duration_ms,
+                       {key: entry[key] for key in ("filter", "sort", "pipeline") if key in entry})
+
+        if name in EXPLAINABLE and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._start_explain, entry, database, command)
+
+    def _start_explain(self, entry: Dict[str, Any], database: str, command: Dict[str, Any]) -> None:
+        if len(self._explains) >= MAX_PENDING_EXPLAINS:
+            entry["explain"] = {"skipped": "too many explains in progress"}
+            return
+        task = asyncio.ensure_future(self._explain(entry, database, command))
+        self._explains.add(task)
+        task.add_done_callback(self._explains.discard)
+
+    async def _explain(self, entry: Dict[str, Any], database: str, command: Dict[str, Any]) -> None:
+        explained = {key: value for key, value in command.items() if key not in _SESSION_FIELDS}
+        try:
+            result = await self._client[database].command({"explain": explained, "verbosity": "queryPlanner"})
+            entry["explain"] = explain_summary(result)
+        except Exception as e:
+            entry["explain"] = {"error": str(e)}
+
+    def recent(self) -> List[Dict[str, Any]]:
+        return list(reversed(self.entries))
+
+
+def create_slow_query_log() -> Optional[SlowQueryLog]:
+    """Build the slow query log when SLOW_QUERY_MS is set"""
+    threshold = os.environ.get('SLOW_QUERY_MS')
+    if not threshold:
+        return None
+    return SlowQueryLog(float(threshold), keep=int(os.environ.get('SLOW_QUERY_KEEP', 100)))
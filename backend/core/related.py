@@ -0,0 +1,450 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from fastapi import Request
+
+from core.storage import ArticleStore
+
+logger = logging.getLogger(__name__)
+
+# Term weights per field before IDF; a shared title word says more than a shared body word
+RELATED_WEIGHTS = {"title": 3.0, "category": 3.0, "excerpt": 2.0, "content": 1.0}
+
+# Rows per matrix product when recomputing neighbours; each side of a product is
+# expanded to a dense block of at most BATCH_ROWS x max_terms only while it is multiplied
+BATCH_ROWS = 512
+
+# Stored similarities are rounded to this many places
+SCORE_PLACES = 6
+
+# Articles read from the store per page while loading
+LOAD_BATCH = 1000
+
+_TOKEN = re.compile(r"[a-z][a-z0-9]+")
+
+_STOP_WORDS = frozenset("""
+a about after all also an and any are as at be because been but by can could do does for from
+had has have how if in into is it its just more most no not of on or our out over so some such
+than that the their them then there these they this those through to up us was we were what
+when which while who why will with you your
+""".split())
+
+# Neighbour lists: ((article id, cosine similarity), ...) best first
+Neighbours = Tuple[Tuple[str, float], ...]
+
+# Sparse vectors: (term indices, weights)
+Vector = Tuple[np.ndarray, np.ndarray]
+
+_EMPTY: Vector = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+
+
+def _terms(article: Dict[str, Any]) -> Counter:
+    """Weighted term counts over the RELATED_WEIGHTS fields"""
+    counts: Counter = Counter()
+    for field, weight in RELATED_WEIGHTS.items():
+        for term, count in Counter(_TOKEN.findall(str(article.get(field) or "").lower())).items():
+            if term not in _STOP_WORDS:
+                counts[term] += weight * count
+    return counts
+
+
+class RelatedArticles:
+    """Precomputed "you might also like" table over TF-IDF article vectors.
+
+    Vectors are L2-normalised and stored sparse, as the indices and weights
+    of the terms an article uses; an article uses a few hundred of the
+    max_terms at most. Cosine similarity is a matrix product over blocks of
+    BATCH_ROWS rows expanded to dense float32 one block at a time. Every
+    article's top_k neighbours are kept in a dict, making a lookup O(1). A
+    write recomputes the changed article's row and the rows whose neighbour
+    lists it enters or leaves, not the table.
+
+    A full build costs O(articles^2 x max_terms) multiply-adds: well under a
+    second for a few thousand articles, about 8 s for 10,000 at 2048 terms.
+
+    The vocabulary and IDF weights are fixed at the last full build; terms
+    first seen in later writes are ignored until a background rebuild
+    refreshes them. That happens after rebuild_after writes, or after as many
+    writes as the table holds if that is more, so the quadratic rebuild
+    costs each write no more than an incremental update does.
+    """
+
+    def __init__(self, fields: Sequence[str], top_k: int = 6, max_terms: int = 2048,
+                 rebuild_after: int = 500):
+        self.fields = tuple(fields)
+        self.top_k = top_k
+        self.max_terms = max_terms
+        self.rebuild_after = rebuild_after
+        self._lock = threading.Lock()
+        self._vocabulary: Dict[str, int] = {}
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._vectors: List[Vector] = []
+        # The vectors concatenated row after row, rebuilt after a write changes one
+        self._packed: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._floor = np.zeros(0, dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        # Stored summaries of every article, so lookups need no database read
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._neighbours: Dict[str, Neighbours] = {}
+        # article id -> ids whose neighbour lists contain it
+        self._listed_by: Dict[str, Set[str]] = {}
+        self.ready = False
+        self.builds = 0
+        self.updates = 0
+        self.last_build_seconds = 0.0
+        self._since_build = 0
+        self._build_task: Optional[asyncio.Task] = None
+        # Ids written by bulk imports, waiting for a background refresh
+        self._stale: Set[str] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Writes made while a build reads the store, applied again to the new table
+        self._replay: Optional[List[Tuple[str, Any]]] = None
+
+    # -- lookups ---------------------------------------------------------
+
+    def __contains__(self, article_id: str) -> bool:
+        return article_id in self._rows
+
+    def related(self, article_id: str, limit: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """(summary, similarity) of the article's nearest neighbours, best first.
+
+        Runs on the event loop while builds and refreshes write the table from
+        a worker thread, so it reads without waiting for their lock: single
+        dict lookups and immutable neighbour tuples, skipping a neighbour
+        removed in between rather than failing on it.
+        """
+        summaries = self._summaries
+        found = []
+        for other, score in self._neighbours.get(article_id, ()):
+            summary = summaries.get(other)
+            if summary is not None:
+                found.append((summary, score))
+                if len(found) == limit:
+                    break
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "articles": len(self._ids),
+            "terms": len(self._vocabulary),
+            "top_k": self.top_k,
+            "builds": self.builds,
+            "updates": self.updates,
+            "updates_since_build": self._since_build,
+            "last_build_ms": round(self.last_build_seconds * 1000, 3),
+            "pending_refresh": len(self._stale),
+            "vector_bytes": sum(indices.nbytes + weights.nbytes for indices, weights in self._vectors),
+        }
+
+    # -- building --------------------------------------------------------
+
+    async def load(self, articles: ArticleStore) -> None:
+        """Read every article from the store and build the table off the event loop"""
+        started = time.perf_counter()
+        entries: List[Tuple[str, Dict[str, Any], Counter]] = []
+        fields = tuple(dict.fromkeys(("id", "publishDate", *self.fields, *RELATED_WEIGHTS)))
+        position = None
+        self._replay = []
+        try:
+            while True:
+                page = await articles.page(None, position, LOAD_BATCH, fields)
+                # Only term counts and summaries are kept; each page's content is dropped once counted
+                entries += await asyncio.to_thread(self._entries, page)
+                if len(page) < LOAD_BATCH:
+                    break
+                position = (page[-1]["publishDate"], page[-1]["id"])
+            await asyncio.to_thread(self._fit, entries)
+            # Repeating a write is harmless, so anything logged up to here is replayed
+            replay, self._replay = self._replay, None
+            for operation, argument in replay:
+                await asyncio.to_thread(getattr(self, operation), argument)
+        finally:
+            self._replay = None
+        self.last_build_seconds = time.perf_counter() - started
+        logger.info("Related articles table built for %d articles in %.1f ms",
+                    len(entries), self.last_build_seconds * 1000)
+
+    def schedule_rebuild(self, articles: ArticleStore) -> None:
+        """Rebuild in the background unless a rebuild is already running"""
+        if self._build_task is None or self._build_task.done():
+            self._build_task = asyncio.ensure_future(self._rebuild(articles))
+
+    async def _rebuild(self, articles: ArticleStore) -> None:
+        try:
+            await self.load(articles)
+        except Exception:
+            logger.exception("Related articles rebuild failed")
+
+    def schedule_refresh(self, article_ids: Iterable[str], articles: ArticleStore) -> None:
+        """Re-read written articles in the background and update their neighbours.
+
+        As many articles as the table holds, or rebuild_after, start a rebuild
+        instead: refreshing them costs about as much, and the vocabulary fitted
+        to the old articles may not cover the new ones. While a rebuild runs
+        the refresh goes ahead, as it may have read past them already.
+        """
+        self._stale.update(article_ids)
+        building = self._build_task is not None and not self._build_task.done()
+        if self._stale and not building and len(self._stale) >= min(len(self._ids), self.rebuild_after):
+            self._stale.clear()
+            self.schedule_rebuild(articles)
+        elif self._stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.ensure_future(self._refresh_stale(articles))
+
+    async def _refresh_stale(self, articles: ArticleStore) -> None:
+        try:
+            while self._stale:
+                article_ids = list(self._stale)
+                self._stale.clear()
+                await self.refresh(article_ids, articles)
+        except Exception:
+            logger.exception("Related articles refresh failed")
+
+    async def close(self) -> None:
+        for task in (self._build_task, self._refresh_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    def _entries(self, documents: Iterable[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], Counter]]:
+        return [(document["id"], self._summary(document), _terms(document)) for document in documents]
+
+    def _fit(self, entries: List[Tuple[str, Dict[str, Any], Counter]]) -> None:
+        """Fit the vocabulary and IDF to the entries and compute every neighbour list"""
+        counts = [terms for _, _, terms in entries]
+        frequency: Counter = Counter()
+        for terms in counts:
+            frequency.update(terms.keys())
+        vocabulary = {term: index for index, (term, _) in enumerate(frequency.most_common(self.max_terms))}
+        total = len(entries)
+        # Smoothed IDF, as in scikit-learn: never zero, finite for unseen terms
+        idf = np.array([math.log((1 + total) / (1 + frequency[term])) + 1 for term in vocabulary], dtype=np.float32)
+        vectors = [self._vector(terms, vocabulary, idf) for terms in counts]
+
+        with self._lock:
+            self._vocabulary = vocabulary
+            self._idf = idf
+            self._vectors = vectors
+            self._packed = None
+            self._floor = np.zeros(max(total, 1), dtype=np.float32)
+            self._ids = [article_id for article_id, _, _ in entries]
+            self._rows = {article_id: row for row, article_id in enumerate(self._ids)}
+            self._summaries = {article_id: summary for article_id, summary, _ in entries}
+            self._neighbours = {}
+            self._listed_by = {}
+            self._recompute(range(total))
+            self._since_build = 0
+            self.builds += 1
+            self.ready = True
+
+    @staticmethod
+    def _vector(terms: Counter, vocabulary: Dict[str, int], idf: np.ndarray) -> Vector:
+        pairs = sorted((vocabulary[term], count) for term, count in terms.items() if term in vocabulary)
+        if not pairs:
+            return _EMPTY
+        indices = np.array([index for index, _ in pairs], dtype=np.int32)
+        # Sublinear term frequency so one repeated word cannot dominate
+        weights = np.array([1 + math.log(count) for _, count in pairs], dtype=np.float32) * idf[indices]
+        return indices, weights / np.linalg.norm(weights)
+
+    def _summary(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: document[name] for name in self.fields if name in document}
+
+    def _dense(self, rows: Sequence[int]) -> np.ndarray:
+        """The given rows as a dense len(rows) x terms block"""
+        block = np.zeros((len(rows), len(self._vocabulary)), dtype=np.float32)
+        for i, row in enumerate(rows):
+            indices, weights = self._vectors[row]
+            block[i, indices] = weights
+        return block
+
+    def _pack(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(row, term index, weight) of every stored weight, in row order"""
+        if self._packed is None:
+            lengths = np.fromiter((len(indices) for indices, _ in self._vectors), dtype=np.int64,
+                                  count=len(self._vectors))
+            rows = np.repeat(np.arange(len(self._vectors), dtype=np.int32), lengths)
+            indices = np.concatenate([indices for indices, _ in self._vectors] or [_EMPTY[0]])
+            weights = np.concatenate([weights for _, weights in self._vectors] or [_EMPTY[1]])
+            self._packed = (rows, indices, weights)
+        return self._packed
+
+    def _scores(self, block: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each row of a dense block to every article"""
+        total = len(self._ids)
+        rows, indices, weights = self._pack()
+        columns = np.flatnonzero(block.any(axis=0))
+        if len(columns) * 2 < len(self._vocabulary):
+            # Only terms the block uses add to a score, so the other side is expanded to
+            # those columns alone: a few hundred for one article rather than max_terms
+            position = np.full(len(self._vocabulary), -1, dtype=np.int32)
+            position[columns] = np.arange(len(columns), dtype=np.int32)
+            indices = position[indices]
+            used = np.flatnonzero(indices >= 0)
+            rows, indices, weights = rows.take(used), indices.take(used), weights.take(used)
+            block = block[:, columns]
+        bounds = np.searchsorted(rows, np.arange(0, total + BATCH_ROWS, BATCH_ROWS))
+
+        scores = np.empty((block.shape[0], total), dtype=np.float32)
+        for chunk, start in enumerate(range(0, total, BATCH_ROWS)):
+            stop = min(start + BATCH_ROWS, total)
+            lo, hi = bounds[chunk], bounds[chunk + 1]
+            right = np.zeros((stop - start, block.shape[1]), dtype=np.float32)
+            right[rows[lo:hi] - start, indices[lo:hi]] = weights[lo:hi]
+            scores[:, start:stop] = block @ right.T
+        return scores
+
+    def _recompute(self, rows: Iterable[int]) -> None:
+        """Neighbour lists for the given rows, BATCH_ROWS matrix products at a time"""
+        rows = np.fromiter(rows, dtype=np.int64)
+        total = len(self._ids)
+        k = min(self.top_k, total - 1)
+        for start in range(0, len(rows), BATCH_ROWS):
+            batch = rows[start:start + BATCH_ROWS]
+            if k <= 0:
+                for row in batch:
+                    self._set_neighbours(int(row), ())
+                continue
+            scores = self._scores(self._dense(batch))
+            scores[np.arange(len(batch)), batch] = -1.0
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for i, row in enumerate(batch):
+                picked = sorted(((float(scores[i, j]), self._ids[j]) for j in best[i]), reverse=True)
+                neighbours = tuple((other, round(score, SCORE_PLACES)) for score, other in picked if score > 0)
+                self._set_neighbours(int(row), neighbours)
+
+    def _set_neighbours(self, row: int, neighbours: Neighbours) -> None:
+        article_id = self._ids[row]
+        for other, _ in self._neighbours.get(article_id, ()):
+            listed = self._listed_by.get(other)
+            if listed is not None:
+                listed.discard(article_id)
+        for other, _ in neighbours:
+            self._listed_by.setdefault(other, set()).add(article_id)
+        self._neighbours[article_id] = neighbours
+        # A full list only takes a newcomer scoring above its weakest entry
+        self._floor[row] = neighbours[-1][1] if len(neighbours) == self.top_k else 0.0
+
+    # -- incremental updates -----------------------------------------------
+
+    async def upsert(self, article: Dict[str, Any], articles: Optional[ArticleStore] = None) -> None:
+        """Recompute neighbours after an article was created or edited"""
+        await self.upsert_many([article], articles)
+
+    async def upsert_many(self, batch: List[Dict[str, Any]], articles: Optional[ArticleStore] = None) -> None:
+        """Recompute neighbours after several articles were written, recomputing each affected row once"""
+        if batch:
+            await asyncio.to_thread(self._upsert_many, batch)
+            self._after_update(articles, len(batch))
+
+    async def remove(self, article_id: str, articles: Optional[ArticleStore] = None) -> None:
+        await asyncio.to_thread(self._remove, article_id)
+        self._after_update(articles)
+
+    async def refresh(self, article_ids: Iterable[str], articles: ArticleStore) -> None:
+        """Re-read articles another process or a bulk import wrote and update their neighbours"""
+        article_ids = list(dict.fromkeys(article_ids))
+        if not article_ids:
+            return
+        found = await articles.get_many(article_ids)
+        await self.upsert_many(found, articles)
+        for article_id in set(article_ids) - {article["id"] for article in found}:
+            await self.remove(article_id, articles)
+
+    def _after_update(self, articles: Optional[ArticleStore], count: int = 1) -> None:
+        self.updates += count
+        self._since_build += count
+        if articles is not None and self._since_build >= max(self.rebuild_after, len(self._ids)):
+            self.schedule_rebuild(articles)
+
+    def _upsert_many(self, batch: List[Dict[str, Any]]) -> None:
+        if self._replay is not None:
+            self._replay.append(("_upsert_many", batch))
+        with self._lock:
+            changed = []
+            for article in batch:
+                article_id = article["id"]
+                vector = self._vector(_terms(article), self._vocabulary, self._idf)
+                row = self._rows.get(article_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._grow(row + 1)
+                    self._ids.append(article_id)
+                    self._vectors.append(vector)
+                    self._rows[article_id] = row
+                else:
+                    self._vectors[row] = vector
+                self._summaries[article_id] = self._summary(article)
+                changed.append(row)
+            self._packed = None
+
+            # Rows a written article now outranks an entry of, or was already listed in; a
+            # score within rounding of the weakest entry is a tie, which leaves the list as it is
+            scores = self._scores(self._dense(changed))
+            scores[np.arange(len(changed)), changed] = -1.0
+            floor = self._floor[:len(self._ids)] + 10.0 ** -SCORE_PLACES
+            affected = set(np.flatnonzero((scores > floor).any(axis=0)).tolist())
+            for article in batch:
+                affected.update(self._rows[other] for other in self._listed_by.get(article["id"], ()))
+            affected.update(changed)
+            self._recompute(sorted(affected))
+
+    def _remove(self, article_id: str) -> None:
+        if self._replay is not None:
+            self._replay.append(("_remove", article_id))
+        with self._lock:
+            row = self._rows.pop(article_id, None)
+            if row is None:
+                return
+            self._set_neighbours(row, ())
+            del self._neighbours[article_id]
+            self._summaries.pop(article_id, None)
+            listed_by = self._listed_by.pop(article_id, set())
+
+            # Keep rows contiguous: the last row moves into the freed slot
+            last = len(self._ids) - 1
+            if row != last:
+                moved = self._ids[last]
+                self._vectors[row] = self._vectors[last]
+                self._floor[row] = self._floor[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+            self._ids.pop()
+            self._vectors.pop()
+            self._packed = None
+            self._recompute(sorted(self._rows[other] for other in listed_by if other in self._rows))
+
+    def _grow(self, rows: int) -> None:
+        if rows <= self._floor.shape[0]:
+            return
+        floor = np.zeros(max(rows, self._floor.shape[0] * 2, 64), dtype=np.float32)
+        floor[:self._floor.shape[0]] = self._floor
+        self._floor = floor
+
+
+def create_related_index(fields: Sequence[str]) -> Optional[RelatedArticles]:
+    """Build the related-articles table when RELATED_TOP_K is set above 0"""
+    top_k = int(os.environ.get('RELATED_TOP_K', 0))
+    if top_k <= 0:
+        return None
+    return RelatedArticles(
+        fields,
+        top_k=top_k,
+        max_terms=int(os.environ.get('RELATED_MAX_TERMS', 2048)),
+        rebuild_after=int(os.environ.get('RELATED_REBUILD_AFTER', 500)),
+    )
+
+
+def get_related_index(request: Request) -> Optional[RelatedArticles]:
+    """Dependency returning the related-articles table, or None when disabled"""
+    return getattr(request.app.state, "related", None)
@@ -0,0 +1,55 @@
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode plain Python / Mongo values straight to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+
+@lru_cache(maxsize=None)
+def _field_names(model: Type[BaseModel]) -> Tuple[str, ...]:
+    return tuple(model.model_fields)
+
+
+def trusted(model: Type[BaseModel], document: Mapping[str, Any],
+            fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Shape a stored document like model(**document).model_dump() without re-validating it.
+
+    Only for documents the write routes already validated: values are passed
+    through as stored, and missing fields get the model's defaults.
+    """
+    names = _field_names(model)
+    if fields is not None:
+        return {name: document[name] for name in names if name in fields and name in document}
+    try:
+        return {name: document[name] for name in names}
+    except KeyError:
+        return {
+            name: document[name] if name in document
+            else model.model_fields[name].get_default(call_default_factory=True)
+            for name in names
+        }
+
+
+class RawJSONResponse(Response):
+    """Response for bodies that are already encoded JSON bytes"""
+    media_type = "application/json"
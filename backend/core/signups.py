@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+
+from core.storage import SubscriberStore
+
+
+class SignupBuffer:
+    """Write-behind queue that turns bursts of signups into batched upserts.
+
+    Callers await their own signup, but the store sees one subscribe_many per
+    batch, flushed when max_batch emails are queued or max_delay has passed.
+    """
+
+    def __init__(self, subscribers: SubscriberStore, max_batch: int = 500, max_delay: float = 0.05):
+        self._subscribers = subscribers
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Set[asyncio.Task] = set()
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.last_flush_seconds = 0.0
+
+    async def submit(self, email: str) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((email, future))
+        if len(self._pending) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._start_flush)
+        return await future
+
+    async def submit_many(self, emails: List[str]) -> Dict[str, Dict[str, Any]]:
+        unique = list(dict.fromkeys(emails))
+        results = await asyncio.gather(*(self.submit(email) for email in unique))
+        return dict(zip(unique, results))
+
+    async def close(self) -> None:
+        """Flush whatever is queued and wait for in-flight batches"""
+        self._start_flush()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._pending),
+            "flushes_in_flight": len(self._flushing),
+            "flushes": self.flushes,
+            "flushed": self.flushed,
+            "failures": self.failures,
+            "flush_avg_ms": round(self.flush_seconds_total / self.flushes * 1000, 3) if self.flushes else 0.0,
+            "flush_max_ms": round(self.flush_seconds_max * 1000, 3),
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+        }
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._flush(batch))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        started = time.perf_counter()
+        try:
+            subscribers = await self._subscribers.subscribe_many([email for email, _ in batch])
+        except Exception as e:
+            self.failures += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for email, future in batch:
+                if not future.done():
+                    future.set_result(subscribers[email])
+        finally:
+            elapsed = time.perf_counter() - started
+            self.flushes += 1
+            self.flushed += len(batch)
+            self.flush_seconds_total += elapsed
+            self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+            self.last_flush_seconds = elapsed
+
+
+def create_signup_buffer(subscribers: SubscriberStore) -> Optional[SignupBuffer]:
+    """Build the write-behind buffer when NEWSLETTER_WRITE_BEHIND is enabled"""
+    if os.environ.get('NEWSLETTER_WRITE_BEHIND', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    return SignupBuffer(
+        subscribers,
+        max_batch=int(os.environ.get('NEWSLETTER_BATCH_SIZE', 500)),
+        max_delay=float(os.environ.get('NEWSLETTER_FLUSH_MS', 50)) / 1000,
+    )
+
+
+def get_signup_buffer(request: Request) -> Optional[SignupBuffer]:
+    """Dependency returning the write-behind buffer, or None when it is disabled"""
+    return getattr(request.app.state, "signup_buffer", None)
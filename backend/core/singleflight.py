@@ -0,0 +1,76 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from fastapi import Request
+
+from core.metrics import Metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Concurrent callers asking for the same key share one in-flight call.
+
+    Used on cache misses: when a hot entry expires, the first request runs
+    the query and every identical request arriving before it returns awaits
+    that result instead of sending its own. The call runs in its own task,
+    so a caller that goes away does not cancel it for the others.
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None):
+        self._metrics = metrics
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.leaders: Dict[str, int] = defaultdict(int)
+        self.coalesced: Dict[str, int] = defaultdict(int)
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Await call(), or the identical call already running for key.
+
+        Keys are tuples whose first item names the query, e.g. ("article", id);
+        that name labels the counters.
+        """
+        name = str(key[0]) if isinstance(key, tuple) and key else str(key)
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self.leaders[name] += 1
+            outcome = "leader"
+        else:
+            self.coalesced[name] += 1
+            outcome = "coalesced"
+        if self._metrics is not None:
+            self._metrics.read_calls.inc(name, outcome)
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Marks a failure as seen even if every caller left before it came back
+            task.exception()
+
+    def forget(self, *_: Any) -> None:
+        """Let later callers start fresh calls, e.g. after a write made running ones stale.
+
+        Calls already running still answer the callers waiting on them, but
+        cache nothing: they took their TTLCache generation before the write.
+        Signature fits a TTLCache listener.
+        """
+        self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "queries": {
+                name: {"leaders": self.leaders[name], "coalesced": self.coalesced[name]}
+                for name in sorted(set(self.leaders) | set(self.coalesced))
+            },
+        }
+
+
+def get_single_flight(request: Request) -> SingleFlight:
+    """Dependency returning the app's shared SingleFlight"""
+    return request.app.state.flights
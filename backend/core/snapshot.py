@@ -0,0 +1,471 @@
+"""Static snapshots of the public read routes.
+
+    python -m core.snapshot build DIR
+    python -m core.snapshot publish DIR --article ID [--article ID ...]
+
+A snapshot is DIR/manifest.json plus content-addressed files under DIR/files:
+<hash>.json and its precompressed .json.gz / .json.br twins. The manifest maps
+each request (path plus canonical query string) to the hash of its body and
+the ETag / Last-Modified the live route sends, and tags each entry with the
+same tags the read cache uses, so a write re-renders only what it touched.
+With SNAPSHOT_DIR set the app answers those requests from the files without
+querying the database; anything not in the manifest goes to the routes.
+"""
+import argparse
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import anyio
+import httpx
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.compression import Compressor
+from core.conditional import Validators
+from core.pagination import DEFAULT_PAGE_SIZE
+from core.serialization import RawJSONResponse
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+FILES = "files"
+
+# Requests carrying this header skip the snapshot, so builds render from the routes
+BUILD_HEADER = "x-snapshot-build"
+
+# Files are written once, offline, so they get the slowest and smallest settings
+ENCODINGS = {"gzip": ".gz", "br": ".br"}
+_OFFLINE = Compressor(min_size=0, gzip_level=9, brotli_quality=11)
+
+# Seconds between checks for a manifest republished by another process
+RELOAD_INTERVAL = 1.0
+
+# Same tags as the read cache in routes/blog_routes.py
+FEATURED_TAG = "articles:featured"
+CATEGORIES_TAG = "categories"
+LIST_TAG_PREFIX = "articles:list:"
+ARTICLE_TAG_PREFIX = "article:"
+
+# Query parameters a client may send with their default values
+_DEFAULTS = {("limit", str(DEFAULT_PAGE_SIZE)), ("category", "all")}
+
+
+def request_key(path: str, query_string: str = "") -> Optional[str]:
+    """Canonical form of a read request: path plus sorted non-default query parameters.
+
+    None when a parameter is repeated, since such requests are never snapshotted.
+    """
+    params = parse_qsl(query_string)
+    if len({name for name, _ in params}) != len(params):
+        return None
+    params = sorted(param for param in params if param not in _DEFAULTS)
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+class Snapshot:
+    """A snapshot directory: its manifest entries and the files they point to"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.built_at: Optional[str] = None
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST
+
+    @classmethod
+    def load(cls, directory: Path) -> "Snapshot":
+        snapshot = cls(directory)
+        try:
+            manifest = json.loads(snapshot.manifest_path.read_bytes())
+        except FileNotFoundError:
+            return snapshot
+        snapshot.entries = manifest["entries"]
+        snapshot.built_at = manifest.get("built_at")
+        return snapshot
+
+    def file_path(self, digest: str, encoding: Optional[str] = None) -> Path:
+        return self.directory / FILES / f"{digest}.json{ENCODINGS.get(encoding, '')}"
+
+    def write_body(self, body: bytes) -> str:
+        """Store a body and its compressed variants under its content hash"""
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if not self.file_path(digest).exists():
+            _write_atomic(self.file_path(digest, "gzip"), gzip.compress(body, compresslevel=9, mtime=0))
+            if "br" in _OFFLINE.encodings:
+                _write_atomic(self.file_path(digest, "br"), _OFFLINE.compress(body, "br"))
+            # The plain file goes last: its presence means the set is complete
+            _write_atomic(self.file_path(digest), body)
+        return digest
+
+    def save(self) -> None:
+        self.built_at = datetime.utcnow().isoformat()
+        manifest = {"version": 1, "built_at": self.built_at, "entries": dict(sorted(self.entries.items()))}
+        _write_atomic(self.manifest_path, json.dumps(manifest, indent=1).encode())
+
+    def collect_garbage(self) -> int:
+        """Delete files no entry refers to any more"""
+        referenced = {entry["hash"] for entry in self.entries.values()}
+        removed = 0
+        for path in (self.directory / FILES).glob("*.json*"):
+            if path.name.split(".", 1)[0] not in referenced:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write via a temporary file and rename, so readers never see a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+@asynccontextmanager
+async def _locked(directory: Path) -> AsyncIterator[None]:
+    """Serialize publishes from several workers or the CLI on one directory"""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "w") as lock:
+        await anyio.to_thread.run_sync(fcntl.flock, lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class _Renderer:
+    """Renders snapshot entries by requesting them from the app"""
+
+    def __init__(self, client: httpx.AsyncClient, snapshot: Snapshot):
+        self.client = client
+        self.snapshot = snapshot
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    async def fetch(self, path: str, params: Optional[Dict[str, str]] = None,
+                    tags: Iterable[str] = (), **extra: Any) -> Optional[Any]:
+        """Render one request into an entry; returns the decoded body, or None on 404"""
+        response = await self.client.get(
+            path, params=params, headers={BUILD_HEADER: "1", "Accept-Encoding": "identity"}
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        body = response.content
+        entry = {
+            "hash": self.snapshot.write_body(body),
+            "size": len(body),
+            "etag": response.headers["etag"],
+            "tags": sorted(tags),
+            **extra,
+        }
+        if "last-modified" in response.headers:
+            entry["last_modified"] = response.headers["last-modified"]
+        key = request_key(path, urlencode(sorted((params or {}).items())))
+        self.entries[key] = entry
+        return json.loads(body)
+
+    async def categories(self) -> List[Dict[str, Any]]:
+        return await self.fetch("/api/categories", tags=[CATEGORIES_TAG]) or []
+
+    async def featured(self) -> None:
+        await self.fetch("/api/articles/featured", tags=[FEATURED_TAG])
+
+    async def article_list(self, category: Optional[Dict[str, Any]]) -> List[str]:
+        """Every page of one list, following next_cursor; returns the article ids"""
+        params = {"category": category["id"]} if category else {}
+        tag = LIST_TAG_PREFIX + (category["name"] if category else "all")
+        ids = []
+        while True:
+            page = await self.fetch("/api/articles", dict(params), tags=[tag])
+            ids += [item["id"] for item in page["items"]]
+            if not page["next_cursor"]:
+                return ids
+            params["after"] = page["next_cursor"]
+
+    async def article(self, article_id: str) -> None:
+        found = await self.fetch(f"/api/articles/{article_id}", tags=[ARTICLE_TAG_PREFIX + article_id])
+        if found is not None:
+            # Remembered so a later move re-renders the category list it left
+            self.entries[f"/api/articles/{article_id}"]["category"] = found["category"]
+
+
+async def build(client: httpx.AsyncClient, directory: Path) -> Dict[str, Any]:
+    """Render every read route into a fresh manifest"""
+    started = time.perf_counter()
+    async with _locked(Path(directory)):
+        snapshot = Snapshot(directory)
+        renderer = _Renderer(client, snapshot)
+        categories = await renderer.categories()
+        await renderer.featured()
+        ids = []
+        for category in categories:
+            found = await renderer.article_list(None if category["id"] == "all" else category)
+            if category["id"] == "all":
+                ids = found
+        for article_id in ids:
+            await renderer.article(article_id)
+        snapshot.entries = renderer.entries
+        snapshot.save()
+        removed = snapshot.collect_garbage()
+    return {"entries": len(snapshot.entries), "rendered": len(renderer.entries), "removed_files": removed,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+async def publish(client: httpx.AsyncClient, directory: Path, tags: Iterable[str]) -> Dict[str, Any]:
+    """Re-render only the entries carrying any of the given cache tags"""
+    started = time.perf_counter()
+    tags = set(tags)
+    async with _locked(Path(directory)):
+        snapshot = Snapshot.load(directory)
+        renderer = _Renderer(client, snapshot)
+        if CATEGORIES_TAG in tags or any(tag.startswith(LIST_TAG_PREFIX) for tag in tags):
+            # Also needed to map list tags (category names) back to slugs
+            categories = {category["name"]: category for category in await renderer.categories()}
+            if CATEGORIES_TAG not in tags:
+                renderer.entries.clear()
+        if FEATURED_TAG in tags:
+            await renderer.featured()
+        for tag in sorted(tags):
+            if tag.startswith(LIST_TAG_PREFIX):
+                name = tag[len(LIST_TAG_PREFIX):]
+                if name == "all":
+                    await renderer.article_list(None)
+                elif name in categories:
+                    await renderer.article_list(categories[name])
+            elif tag.startswith(ARTICLE_TAG_PREFIX):
+                await renderer.article(tag[len(ARTICLE_TAG_PREFIX):])
+
+        # Stale entries go first: pages past the new end of a list, deleted articles
+        snapshot.entries = {
+            key: entry for key, entry in snapshot.entries.items() if not tags.intersection(entry["tags"])
+        }
+        snapshot.entries.update(renderer.entries)
+        snapshot.save()
+        removed = snapshot.collect_garbage()
+    return {"entries": len(snapshot.entries), "rendered": len(renderer.entries), "removed_files": removed,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def article_tags(snapshot: Snapshot, article: Optional[Dict[str, Any]], article_id: str) -> Set[str]:
+    """Everything an edit to one article can change, given its current and snapshotted state"""
+    tags = {ARTICLE_TAG_PREFIX + article_id, LIST_TAG_PREFIX + "all", CATEGORIES_TAG, FEATURED_TAG}
+    previous = snapshot.entries.get(f"/api/articles/{article_id}", {})
+    for category in (previous.get("category"), (article or {}).get("category")):
+        if category:
+            tags.add(LIST_TAG_PREFIX + category)
+    return tags
+
+
+class SnapshotServer:
+    """Looks requests up in a snapshot directory, picking up republished manifests"""
+
+    def __init__(self, directory: Path, compressor: Compressor):
+        self.directory = Path(directory)
+        self.compressor = compressor
+        self.snapshot = Snapshot.load(self.directory)
+        self._mtime = self._manifest_mtime()
+        self._checked = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+
+    def _manifest_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.snapshot.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def reload(self) -> None:
+        self.snapshot = Snapshot.load(self.directory)
+        self._mtime = self._manifest_mtime()
+        self._checked = time.monotonic()
+
+    def drop(self, tags: Optional[Iterable[str]]) -> None:
+        """Stop serving entries carrying any of the given tags (all of them for None).
+
+        They come back with the next manifest published to the directory.
+        """
+        if tags is None:
+            self.snapshot.entries = {}
+            return
+        tags = set(tags)
+        self.snapshot.entries = {
+            key: entry for key, entry in self.snapshot.entries.items() if not tags.intersection(entry["tags"])
+        }
+
+    def lookup(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        if now - self._checked >= RELOAD_INTERVAL:
+            self._checked = now
+            if self._manifest_mtime() != self._mtime:
+                self.reload()
+        entry = self.snapshot.entries.get(key) if key is not None else None
+        if entry is None:
+            self.misses += 1
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": str(self.directory),
+            "built_at": self.snapshot.built_at,
+            "entries": len(self.snapshot.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SnapshotMiddleware:
+    """Answers GET requests found in the snapshot from its files, without touching the routes"""
+
+    def __init__(self, app: ASGIApp, server: SnapshotServer):
+        self.app = app
+        self.server = server
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or BUILD_HEADER in Headers(scope=scope):
+            await self.app(scope, receive, send)
+            return
+        key = request_key(scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        entry = self.server.lookup(key)
+        if entry is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        compressor = self.server.compressor
+        encoding = compressor.choose(request.headers.get("accept-encoding"))
+        if entry["size"] < compressor.min_size:
+            encoding = None
+        last_modified = entry.get("last_modified")
+        validators = Validators(entry["etag"], parsedate_to_datetime(last_modified) if last_modified else None)
+        if validators.matches(request):
+            response = validators.not_modified(encoding)
+        else:
+            try:
+                body = await anyio.to_thread.run_sync(self.server.snapshot.file_path(entry["hash"], encoding).read_bytes)
+            except FileNotFoundError:
+                # Collected by a publish this process has not reloaded yet
+                self.server.reload()
+                await self.app(scope, receive, send)
+                return
+            headers = {**validators.headers(encoding), "Vary": "Accept-Encoding"}
+            if encoding is not None:
+                headers["Content-Encoding"] = encoding
+            response = RawJSONResponse(body, headers=headers)
+        self.server.hits += 1
+        await response(scope, receive, send)
+
+
+class SnapshotPublisher:
+    """Re-renders snapshot entries after writes, using the read cache's invalidations.
+
+    Tags are collected for a short delay so a burst of writes costs one publish.
+    """
+
+    def __init__(self, app: ASGIApp, server: SnapshotServer, delay: float = 0.5):
+        self.app = app
+        self.server = server
+        self.delay = delay
+        self.publishes = 0
+        self.last_result: Optional[Dict[str, Any]] = None
+        # None means everything changed (the cache was cleared)
+        self._pending: Optional[Set[str]] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def invalidated(self, tags: Optional[Tuple[str, ...]]) -> None:
+        """Cache listener: tags dropped from the read cache, or None when it was cleared"""
+        if tags is None or self._pending is None:
+            self._pending = None
+        else:
+            self._pending.update(tags)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        await asyncio.sleep(self.delay)
+        while self._pending is None or self._pending:
+            tags, self._pending = self._pending, set()
+            transport = httpx.ASGITransport(app=self.app)
+            try:
+                async with httpx.AsyncClient(transport=transport, base_url="http://snapshot") as client:
+                    if tags is None:
+                        self.last_result = await build(client, self.server.directory)
+                    else:
+                        self.last_result = await publish(client, self.server.directory, tags)
+                self.publishes += 1
+                self.server.reload()
+            except Exception:
+                logger.exception("Snapshot publish failed")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            await self._task
+
+    def stats(self) -> Dict[str, Any]:
+        return {"publishes": self.publishes, "last": self.last_result}
+
+
+def create_snapshot_server(compressor: Compressor) -> Optional[SnapshotServer]:
+    """Serve from the snapshot in SNAPSHOT_DIR when it is set"""
+    directory = os.environ.get('SNAPSHOT_DIR')
+    if not directory:
+        return None
+    return SnapshotServer(Path(directory), compressor)
+
+
+def create_snapshot_publisher(app: ASGIApp, server: Optional[SnapshotServer]) -> Optional[SnapshotPublisher]:
+    """Republish after writes unless SNAPSHOT_PUBLISH=false (e.g. when CI builds snapshots)"""
+    if server is None or os.environ.get('SNAPSHOT_PUBLISH', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    return SnapshotPublisher(app, server, delay=float(os.environ.get('SNAPSHOT_PUBLISH_DELAY', 0.5)))
+
+
+async def _main(args: argparse.Namespace) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # Imported late so the app reads the environment only when the CLI runs
+    from server import app
+
+    directory = Path(args.directory)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://snapshot") as client:
+            if args.command == "build":
+                result = await build(client, directory)
+            else:
+                snapshot = Snapshot.load(directory)
+                tags = set(args.tag)
+                for article_id in args.article:
+                    response = await client.get(f"/api/articles/{article_id}", headers={BUILD_HEADER: "1"})
+                    current = response.json() if response.status_code == 200 else None
+                    tags |= article_tags(snapshot, current, article_id)
+                if not tags:
+                    logger.error("Nothing to publish; pass --article or --tag")
+                    return 2
+                result = await publish(client, directory, tags)
+    logger.info("%s: %s", args.command, json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or incrementally republish a static snapshot of the read routes")
+    parser.add_argument("command", choices=["build", "publish"])
+    parser.add_argument("directory")
+    parser.add_argument("--article", action="append", default=[], help="Article id whose pages to re-render")
+    parser.add_argument("--tag", action="append", default=[], help="Cache tag to re-render, e.g. articles:featured")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args)))
@@ -0,0 +1,4 @@
+"""Imported first by server.py, so cold start timings include every import after it"""
+import time
+
+IMPORT_STARTED = time.perf_counter()
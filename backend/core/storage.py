@@ -0,0 +1,402 @@
+import asyncio
+import os
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from core import category_stats
+from core.pagination import ARTICLE_SORT, and_filters, position_filter
+
+DUPLICATE_KEY = 11000
+
+# Largest number of emails written by a single bulk_write
+SIGNUP_CHUNK_SIZE = 1000
+
+# Documents pulled from a cursor per network round trip when streaming
+STREAM_BATCH_SIZE = 1000
+
+# Subscribers are listed by signup time; id breaks ties within a batch signup
+SUBSCRIBER_SORT = [("subscribedAt", 1), ("id", 1)]
+
+# Exports walk batch by batch, each batch in signup order
+EXPORT_SORT = [("exportBatch", 1), *SUBSCRIBER_SORT]
+
+# Document in the counters collection numbering export batches
+EXPORT_COUNTER_ID = "subscriber_export"
+
+# How long one export may hold the right to number a batch before another may
+# take it over, in case the holder died; and how often a waiting export retries
+EXPORT_LEASE = timedelta(seconds=60)
+EXPORT_RETRY_SECONDS = 0.05
+
+# Every route goes through these two interfaces, so the application can run on
+# MongoDB or entirely in memory (STORAGE_BACKEND=memory) without code changes.
+# Positions are decoded keyset cursors: (publishDate, id) for articles,
+# (score, id) for search hits and (subscribedAt, id) for subscribers.
+# Exports page by export batch number instead; see close_export_batch.
+Position = Tuple[Any, str]
+
+# Per-record outcome of ArticleStore.upsert_many: (status, error)
+UpsertResult = Tuple[str, Optional[str]]
+
+
+class ArticleStore(ABC):
+    """Article reads and writes used by the routes"""
+
+    @abstractmethod
+    async def page(self, category: Optional[str], after: Optional[Position], limit: int,
+                   fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """Up to limit articles newest first, optionally in one category, after a position"""
+
+    @abstractmethod
+    async def featured(self, fields: Sequence[str], limit: int) -> List[Dict[str, Any]]:
+        """Featured articles newest first"""
+
+    @abstractmethod
+    async def search(self, text: str, category: Optional[str], after: Optional[Position], limit: int,
+                     fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """Articles matching text, best first, each with its relevance "score" """
+
+    @abstractmethod
+    async def get(self, article_id: str) -> Optional[Dict[str, Any]]:
+        """The whole article with this id, or None"""
+
+    @abstractmethod
+    async def get_many(self, article_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """The articles with any of the given ids, in no particular order; unknown ids are left out"""
+
+    @abstractmethod
+    async def insert(self, article: Dict[str, Any]) -> None:
+        """Store a new article; its id must not be taken"""
+
+    @abstractmethod
+    async def update(self, article_id: str, changes: Dict[str, Any]) -> Optional[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]]:
+        """Apply changes; returns (previous, updated) or None when the article does not exist.
+
+        previous may be None when neither category nor featured changed.
+        """
+
+    @abstractmethod
+    async def delete(self, article_id: str) -> Optional[Dict[str, Any]]:
+        """Remove an article; returns at least its id, category and featured flag"""
+
+    @abstractmethod
+    async def upsert_many(self, items: List[Tuple[str, Dict[str, Any]]], now: datetime) -> List[UpsertResult]:
+        """Insert or replace the fields of each (id, fields) pair; one result per item"""
+
+    async def refresh_stats(self) -> None:
+        """Bring derived data up to date after bulk writes"""
+
+    @abstractmethod
+    async def category_counts(self) -> List[Tuple[str, int]]:
+        """(category, article count) for every non-empty category, in name order"""
+
+
+class SubscriberStore(ABC):
+    """Newsletter subscriber reads and writes used by the routes"""
+
+    @abstractmethod
+    async def subscribe(self, email: str) -> Dict[str, Any]:
+        """Return the subscriber for email, creating it if needed"""
+
+    @abstractmethod
+    async def subscribe_many(self, emails: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Subscribe many emails; returns the stored subscriber per email"""
+
+    @abstractmethod
+    def iterate(self, after: Optional[Position] = None, descending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Stream subscribers by (subscribedAt, id), after a position when given"""
+
+    @abstractmethod
+    async def close_export_batch(self) -> int:
+        """Put every subscriber not yet in an export batch into a new one and return its number.
+
+        Batches are numbered one at a time, in increasing order, from the
+        subscribers that are stored at that moment. A signup stored later,
+        however old its subscribedAt, goes into a later batch, so an export
+        that has read batches up to n never needs to look behind n again.
+        """
+
+    @abstractmethod
+    def iterate_exported(self, after: int, through: int) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the subscribers in export batches after one number and up to another"""
+
+
+@dataclass
+class Storage:
+    articles: ArticleStore
+    subscribers: SubscriberStore
+
+
+def _projection(fields: Sequence[str]) -> Dict[str, int]:
+    return {"_id": 0, **{name: 1 for name in fields}}
+
+
+def _category_query(category: Optional[str]) -> Dict[str, Any]:
+    return {"category": category} if category else {}
+
+
+# The MongoDB queries below are shared with the index audit (core/indexes.py),
+# so the shapes it explains are the ones the stores actually send
+
+FEATURED_QUERY = {"featured": True}
+
+# Subscribers waiting for the next export batch; a missing field matches too
+UNEXPORTED_QUERY = {"exportBatch": None}
+
+
+def page_query(category: Optional[str], after: Optional[Position]) -> Dict[str, Any]:
+    """Filter for a page of articles, newest first, in a category and after a position when given"""
+    query = _category_query(category)
+    if after is not None:
+        query = and_filters(query, position_filter(*after))
+    return query
+
+
+def search_pipeline(text: str, category: Optional[str], after: Optional[Position], limit: int,
+                    fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """Aggregation ranking text matches by textScore, then id, from after a (score, id) position.
+
+    textScore only exists once the $text match has run, so the keyset filter
+    on it needs a second $match after the score is added as a field.
+    """
+    pipeline = [
+        {"$match": {"$text": {"$search": text}, **_category_query(category)}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if after is not None:
+        score, article_id = after
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "id": {"$lt": article_id}},
+        ]}})
+    pipeline += [
+        {"$sort": {"score": -1, "id": -1}},
+        {"$limit": limit},
+        {"$project": {**_projection(fields), "score": 1}},
+    ]
+    return pipeline
+
+
+def subscriber_sort(descending: bool = False) -> List[Tuple[str, int]]:
+    direction = -1 if descending else 1
+    return [(field, direction) for field, _ in SUBSCRIBER_SORT]
+
+
+def subscriber_query(after: Optional[Position], descending: bool = False) -> Dict[str, Any]:
+    if after is None:
+        return {}
+    return position_filter(*after, field="subscribedAt", descending=descending)
+
+
+def export_query(after: int, through: int) -> Dict[str, Any]:
+    """Filter for the subscribers in export batches after one number and up to another"""
+    return {"exportBatch": {"$gt": after, "$lte": through}}
+
+
+class MongoArticleStore(ArticleStore):
+    """Articles in MongoDB, with category counts kept in the category_stats rollup"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self._db = db
+
+    async def page(self, category, after, limit, fields):
+        cursor = self._db.articles.find(page_query(category, after), _projection(fields)).sort(ARTICLE_SORT).limit(limit)
+        return await cursor.to_list(limit)
+
+    async def featured(self, fields, limit):
+        # Same order as the featured_1_publishDate_-1_id_-1 index, so ties come back as on the memory backend
+        cursor = self._db.articles.find(FEATURED_QUERY, _projection(fields)).sort(ARTICLE_SORT)
+        return await cursor.to_list(limit)
+
+    async def search(self, text, category, after, limit, fields):
+        pipeline = search_pipeline(text, category, after, limit, fields)
+        return await self._db.articles.aggregate(pipeline).to_list(limit)
+
+    async def get(self, article_id):
+        return await self._db.articles.find_one({"id": article_id}, {"_id": 0})
+
+    async def get_many(self, article_ids):
+        # One $in on the unique id index, returned in a single batch rather than 101 documents at a time
+        cursor = self._db.articles.find({"id": {"$in": list(article_ids)}}, {"_id": 0})
+        cursor = cursor.batch_size(len(article_ids))
+        return await cursor.to_list(len(article_ids))
+
+    async def insert(self, article):
+        await self._db.articles.insert_one(dict(article))
+        await category_stats.record_insert(self._db, article)
+
+    async def update(self, article_id, changes):
+        # Only moves between categories or featured flips touch category counts
+        # and other cached lists; those need the pre-update image, which the
+        # same round trip can return instead of the post-update one
+        if "category" in changes or "featured" in changes:
+            previous = await self._db.articles.find_one_and_update(
+                {"id": article_id},
+                {"$set": changes},
+                projection={"_id": 0},
+                return_document=ReturnDocument.BEFORE
+            )
+            if previous is None:
+                return None
+            updated = {**previous, **changes}
+            await category_stats.record_update(self._db, previous, updated)
+            return previous, updated
+
+        updated = await self._db.articles.find_one_and_update(
+            {"id": article_id},
+            {"$set": changes},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        return None if updated is None else (None, updated)
+
+    async def delete(self, article_id):
+        deleted = await self._db.articles.find_one_and_delete(
+            {"id": article_id}, projection={"_id": 0, "id": 1, "category": 1, "featured": 1}
+        )
+        if deleted is not None:
+            await category_stats.record_delete(self._db, deleted)
+        return deleted
+
+    async def upsert_many(self, items, now):
+        operations = [
+            UpdateOne(
+                {"id": article_id},
+                {"$set": {**fields, "updatedAt": now}, "$setOnInsert": {"id": article_id, "createdAt": now}},
+                upsert=True,
+            )
+            for article_id, fields in items
+        ]
+        if not operations:
+            return []
+        upserted: Dict[int, Any] = {}
+        failed: Dict[int, str] = {}
+        try:
+            result = await self._db.articles.bulk_write(operations, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+            failed = {item["index"]: item.get("errmsg", "Write failed") for item in e.details.get("writeErrors", [])}
+        return [
+            ("failed", failed[index]) if index in failed else ("inserted" if index in upserted else "updated", None)
+            for index in range(len(operations))
+        ]
+
+    async def refresh_stats(self):
+        # Imports can touch any category, so recount rather than track each record
+        await category_stats.rebuild(self._db)
+
+    async def category_counts(self):
+        return [(row["_id"], row["count"]) for row in await category_stats.list_stats(self._db)]
+
+
+class MongoSubscriberStore(SubscriberStore):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self._db = db
+
+    async def subscribe(self, email):
+        # A single upsert either finds the existing subscriber or creates one,
+        # so concurrent signups for the same email cannot create duplicates
+        try:
+            return await self._db.newsletter_subscribers.find_one_and_update(
+                {"email": email},
+                {"$setOnInsert": {"id": str(uuid.uuid4()), "subscribedAt": datetime.utcnow()}},
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lost an upsert race on the unique email index; the winner's document exists now
+            return await self._db.newsletter_subscribers.find_one({"email": email}, {"_id": 0})
+
+    async def subscribe_many(self, emails):
+        """Unordered bulk upserts in chunks, then one $in read per chunk"""
+        unique = list(dict.fromkeys(emails))
+        subscribers: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(unique), SIGNUP_CHUNK_SIZE):
+            chunk = unique[start:start + SIGNUP_CHUNK_SIZE]
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {"email": email},
+                    {"$setOnInsert": {"id": str(uuid.uuid4()), "subscribedAt": now}},
+                    upsert=True,
+                )
+                for email in chunk
+            ]
+            try:
+                await self._db.newsletter_subscribers.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Racing upserts on the unique email index are fine: the email is subscribed
+                if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                    raise
+            cursor = self._db.newsletter_subscribers.find({"email": {"$in": chunk}}, {"_id": 0})
+            async for subscriber in cursor:
+                subscribers[subscriber["email"]] = subscriber
+        return subscribers
+
+    async def iterate(self, after=None, descending=False):
+        cursor = self._db.newsletter_subscribers.find(subscriber_query(after, descending), {"_id": 0}).sort(
+            subscriber_sort(descending)
+        ).batch_size(STREAM_BATCH_SIZE)
+        async for subscriber in cursor:
+            yield subscriber
+
+    async def close_export_batch(self):
+        counters = self._db.counters
+        # Take the next number and the right to hand it out in one update; the
+        # filter only matches while no other export holds that right
+        while True:
+            now = datetime.utcnow()
+            try:
+                counter = await counters.find_one_and_update(
+                    {"_id": EXPORT_COUNTER_ID, "$or": [{"lockedUntil": None}, {"lockedUntil": {"$lt": now}}]},
+                    {"$inc": {"batch": 1}, "$set": {"lockedUntil": now + EXPORT_LEASE}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+                break
+            except DuplicateKeyError:
+                # Another export is numbering its batch, whose rows must get the smaller number
+                await asyncio.sleep(EXPORT_RETRY_SECONDS)
+        batch = counter["batch"]
+        try:
+            await self._db.newsletter_subscribers.update_many(UNEXPORTED_QUERY, {"$set": {"exportBatch": batch}})
+        finally:
+            await counters.update_one({"_id": EXPORT_COUNTER_ID, "batch": batch}, {"$set": {"lockedUntil": None}})
+        return batch
+
+    async def iterate_exported(self, after, through):
+        cursor = self._db.newsletter_subscribers.find(export_query(after, through), {"_id": 0}).sort(EXPORT_SORT).batch_size(STREAM_BATCH_SIZE)
+        async for subscriber in cursor:
+            yield subscriber
+
+
+def mongo_storage(db: AsyncIOMotorDatabase) -> Storage:
+    return Storage(articles=MongoArticleStore(db), subscribers=MongoSubscriberStore(db))
+
+
+def storage_backend() -> str:
+    """mongo (default) or memory, from STORAGE_BACKEND"""
+    backend = os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+    if backend not in ('mongo', 'memory'):
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; use mongo or memory")
+    return backend
+
+
+def get_article_store(request: Request) -> ArticleStore:
+    """Dependency returning the article store opened by the app lifespan"""
+    return request.app.state.storage.articles
+
+
+def get_subscriber_store(request: Request) -> SubscriberStore:
+    """Dependency returning the subscriber store opened by the app lifespan"""
+    return request.app.state.storage.subscribers
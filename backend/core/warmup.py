@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import httpx
+from fastapi import FastAPI
+
+from core.metrics import Metrics
+from core.snapshot import BUILD_HEADER
+
+logger = logging.getLogger(__name__)
+
+# The reads every visitor's first page load makes: home page and blog index
+PREFETCH_PATHS = ("/api/articles/featured", "/api/categories", "/api/articles")
+
+# What browsers send, so the compressed variant they will ask for is cached too
+PREFETCH_ENCODING = "gzip, deflate, br"
+
+
+class Warmup:
+    """Times a worker's cold start and tells a load balancer when it is ready.
+
+    Phases run in order: import (the server module and its dependencies),
+    connect (the first pooled MongoDB connection), indexes (index and
+    rollup checks), then prefetch, which requests the hot read routes
+    through the app itself so the read cache, compressed bodies and every
+    lazily initialised code path are primed before real traffic arrives.
+    Prefetch runs after the server starts listening; /api/ready answers 503
+    until it finishes, so a probe keeps traffic away until then.
+    """
+
+    def __init__(self, import_seconds: float, metrics: Optional[Metrics] = None):
+        self._metrics = metrics
+        self._started = time.perf_counter() - import_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self.startup_seconds: Optional[float] = None
+        self.prefetched: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self._record("import", import_seconds)
+
+    def _record(self, name: str, seconds: float) -> None:
+        self.phases[name] = round(seconds, 4)
+        if self._metrics is not None:
+            self._metrics.startup.set(seconds, name)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - started)
+
+    def start(self, app: FastAPI, paths: Sequence[str] = PREFETCH_PATHS) -> None:
+        """Prefetch paths in the background, then mark the worker ready; no paths means ready now"""
+        if paths:
+            self._task = asyncio.ensure_future(self._prefetch(app, paths))
+        else:
+            self._finish()
+
+    async def _prefetch(self, app: FastAPI, paths: Sequence[str]) -> None:
+        try:
+            with self.phase("prefetch"):
+                transport = httpx.ASGITransport(app=app)
+                # The snapshot build header makes routes answer themselves even where files are served
+                headers = {BUILD_HEADER: "1", "Accept-Encoding": PREFETCH_ENCODING}
+                async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+                    responses = await asyncio.gather(*(client.get(path, headers=headers) for path in paths))
+            self.prefetched = {path: response.status_code for path, response in zip(paths, responses)}
+            failed = [path for path, status in self.prefetched.items() if status >= 400]
+            if failed:
+                self.error = f"Prefetch failed for {', '.join(failed)}"
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("Warm-up prefetch failed")
+        # Warm-up only saves latency; a worker that could not prefetch still serves, just cold
+        self._finish()
+
+    def _finish(self) -> None:
+        self.startup_seconds = round(time.perf_counter() - self._started, 4)
+        if self._metrics is not None:
+            self._metrics.startup.set(self.startup_seconds, "total")
+        self.ready = True
+        logger.info("Ready %.3fs after cold start (%s)", self.startup_seconds,
+                    ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items()))
+        if self.error:
+            logger.warning("Serving with a cold cache: %s", self.error)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "startup_seconds": self.startup_seconds,
+            "phases": self.phases,
+            "prefetched": self.prefetched,
+            "error": self.error,
+        }
+
+
+def warmup_paths() -> Sequence[str]:
+    """PREFETCH_PATHS, or none when WARMUP=false"""
+    if os.environ.get('WARMUP', 'true').lower() in ('0', 'false', 'no', 'off'):
+        return ()
+    return PREFETCH_PATHS
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import uuid
 
@@ -32,6 +32,43 @@ class Article(BaseModel):
             }
         }
 
+class ArticleSummary(BaseModel):
+    """Card-sized view of an article used by list endpoints (no content body)"""
+    id: str
+    title: str
+    excerpt: str
+    category: str
+    author: str
+    publishDate: datetime
+    readTime: str
+    image: str
+    featured: bool = False
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+
+class ArticlePage(BaseModel):
+    items: List[ArticleSummary]
+    next_cursor: Optional[str] = None
+
+# Most ids one batch read resolves
+MAX_BATCH_IDS = 1000
+
+class ArticleBatch(BaseModel):
+    items: List[Article]  # in the order the ids were asked for
+    missing: List[str] = []  # requested ids with no article
+
+class ArticleBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class ArticleSearchHit(ArticleSummary):
+    score: float
+
+class RelatedArticle(ArticleSummary):
+    score: float  # cosine similarity of the two articles' TF-IDF vectors
+
+class ArticleSearchPage(BaseModel):
+    items: List[ArticleSearchHit]
+    next_cursor: Optional[str] = None
+
 class ArticleCreate(BaseModel):
     title: str
     excerpt: str
@@ -43,6 +80,29 @@ class ArticleCreate(BaseModel):
     image: str
     featured: bool = False
 
+class ArticleImport(ArticleCreate):
+    """Bulk import record; an existing id updates that article in place"""
+    id: Optional[str] = None
+
+class BulkRecordResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str  # inserted, updated, invalid or failed
+    error: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    invalid: int = 0
+    failed: int = 0
+    results: List[BulkRecordResult] = []
+
+    def add(self, results: List[dict]):
+        for result in results:
+            status = result["status"]
+            setattr(self, status, getattr(self, status) + 1)
+            self.results.append(BulkRecordResult(**result))
+
 class ArticleUpdate(BaseModel):
     title: Optional[str] = None
     excerpt: Optional[str] = None
@@ -65,4 +125,7 @@ class NewsletterSubscriber(BaseModel):
     subscribedAt: datetime = Field(default_factory=datetime.utcnow)
 
 class NewsletterSubscribe(BaseModel):
-    email: EmailStr
\ No newline at end of file
+    email: EmailStr
+
+class NewsletterBatchSubscribe(BaseModel):
+    emails: List[EmailStr] = Field(..., min_length=1, max_length=10000)
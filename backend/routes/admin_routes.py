@@ -0,0 +1,112 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response
+
+from core.profiling import RequestProfiler
+
+def require_admin(request: Request, authorization: Optional[str] = Header(None)):
+    """Dependency admitting only requests carrying "Authorization: Bearer <ADMIN_TOKEN>".
+
+    Without ADMIN_TOKEN the admin routes do not exist: they expose profiles
+    and query shapes, and sit under the same /api prefix as the public routes.
+    """
+    token = getattr(request.app.state, "admin_token", None)
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.strip().encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+@router.get("/pool")
+async def get_pool_stats(request: Request):
+    """Get MongoDB connection pool statistics"""
+    return request.app.state.pool_stats.snapshot()
+
+@router.get("/cache")
+async def get_cache_stats(request: Request):
+    """Get read cache hit/miss/eviction counters"""
+    return request.app.state.cache.stats()
+
+@router.get("/compression")
+async def get_compression_stats(request: Request):
+    """Get response compression ratios and precompressed-body reuse"""
+    return request.app.state.compressor.stats()
+
+@router.get("/signups")
+async def get_signup_buffer_stats(request: Request):
+    """Get newsletter write-behind queue depth and flush latency"""
+    buffer = request.app.state.signup_buffer
+    if buffer is None:
+        return {"enabled": False}
+    return {"enabled": True, **buffer.stats()}
+
+@router.get("/profiles")
+async def list_profiles(request: Request):
+    """List captured request profiles, newest first"""
+    profiler = request.app.state.profiler
+    if profiler is None:
+        return {"enabled": False}
+    return {"enabled": True, "profiles": profiler.recent()}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    request: Request,
+    profile_id: str,
+    format: str = Query("text", pattern="^(text|prof)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$")
+):
+    """Get a captured profile as a pstats report or a .prof file for snakeviz"""
+    profiler = request.app.state.profiler
+    captured = profiler.get(profile_id) if profiler is not None else None
+    if captured is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    _, stats = captured
+    if format == "prof":
+        return Response(
+            RequestProfiler.dump(stats),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+        )
+    return PlainTextResponse(RequestProfiler.report(stats, sort))
+
+@router.get("/slow-queries")
+async def list_slow_queries(request: Request):
+    """List MongoDB commands slower than SLOW_QUERY_MS, newest first"""
+    slow_queries = getattr(request.app.state, "slow_queries", None)
+    if slow_queries is None:
+        return {"enabled": False}
+    return {"enabled": True, "threshold_ms": slow_queries.threshold_ms, "entries": slow_queries.recent()}
+
+@router.get("/snapshot")
+async def get_snapshot_stats(request: Request):
+    """Get the static snapshot being served (SNAPSHOT_DIR) and its republishing"""
+    snapshots = request.app.state.snapshots
+    if snapshots is None:
+        return {"enabled": False}
+    publisher = getattr(request.app.state, "snapshot_publisher", None)
+    return {"enabled": True, **snapshots.stats(), "publisher": publisher.stats() if publisher else None}
+
+@router.get("/related")
+async def get_related_stats(request: Request):
+    """Get the size and rebuild history of the related-articles table"""
+    related = getattr(request.app.state, "related", None)
+    if related is None:
+        return {"enabled": False}
+    return {"enabled": True, **related.stats()}
+
+@router.get("/cache/sync")
+async def get_cache_sync_stats(request: Request):
+    """Get how this worker follows other workers' cache invalidations"""
+    coherence = getattr(request.app.state, "coherence", None)
+    if coherence is None:
+        return {"enabled": False}
+    return {"enabled": True, **coherence.stats()}
+
+@router.get("/coalescing")
+async def get_coalescing_stats(request: Request):
+    """Get how many cache-miss reads shared an identical in-flight query"""
+    return request.app.state.flights.stats()
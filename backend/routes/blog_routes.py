@@ -1,91 +1,386 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Sequence, Tuple, Union
 from datetime import datetime
-import os
-from dotenv import load_dotenv
-from pathlib import Path
 
 from models.blog_models import (
-    Article, ArticleCreate, ArticleUpdate,
-    Category, NewsletterSubscriber, NewsletterSubscribe
+    Article, ArticleSummary, ArticlePage, ArticleSearchHit, ArticleSearchPage, RelatedArticle,
+    ArticleBatch, ArticleBatchRequest, MAX_BATCH_IDS,
+    ArticleCreate, ArticleImport, ArticleUpdate, BulkImportResult,
+    Category, NewsletterSubscriber, NewsletterSubscribe, NewsletterBatchSubscribe
 )
-
-ROOT_DIR = Path(__file__).parent.parent
-load_dotenv(ROOT_DIR / '.env')
+from core.bulk import BULK_CHUNK_SIZE, iter_json_records, upsert_chunk
+from core.cache import TTLCache, get_cache
+from core.compression import EncodedBody
+from core.conditional import article_validators, collection_validators, make_etag, Validators
+from core.export import MEDIA_TYPES, stream_documents
+from core.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor,
+    decode_batch_cursor, decode_cursor, decode_score_cursor,
+    encode_batch_cursor, encode_cursor, encode_score_cursor
+)
+from core.related import RelatedArticles, get_related_index
+from core.serialization import RawJSONResponse, dumps, trusted
+from core.signups import SignupBuffer, get_signup_buffer
+from core.singleflight import SingleFlight, get_single_flight
+from core.storage import ArticleStore, SubscriberStore, get_article_store, get_subscriber_store
 
 router = APIRouter()
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Cache tags: each cached response is tagged with the data it was built from
+FEATURED_TAG = "articles:featured"
+CATEGORIES_TAG = "categories"
+
+def _list_tag(category_name: Optional[str]) -> str:
+    return f"articles:list:{category_name or 'all'}"
+
+def _article_tag(article_id: str) -> str:
+    return f"article:{article_id}"
+
+def _invalidate_article(cache: TTLCache, article: dict, previous: Optional[dict] = None):
+    """Drop cached responses that include the given article"""
+    tags = {_article_tag(article["id"]), _list_tag(None), _list_tag(article["category"])}
+    if article.get("featured") or (previous and previous.get("featured")):
+        tags.add(FEATURED_TAG)
+    if previous is None or previous.get("category", article["category"]) != article["category"]:
+        tags.add(CATEGORIES_TAG)
+        if previous:
+            tags.add(_list_tag(previous["category"]))
+    cache.invalidate(*tags)
+
+def _category_name(category: Optional[str]) -> Optional[str]:
+    if category and category != 'all':
+        # Convert slug to category name
+        return category.replace('-', ' ').title()
+    return None
+
+# List endpoints leave out the content body unless a client asks for it
+SUMMARY_FIELDS = tuple(ArticleSummary.model_fields)
+
+def _parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Validate a sparse fieldset (?fields=title,image); id is always returned"""
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(Article.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(sorted(requested | {"id"}))
+
+def _projection(fields: Optional[Tuple[str, ...]]) -> Tuple[str, ...]:
+    if fields is None:
+        return SUMMARY_FIELDS
+    # publishDate and updatedAt back the cursor and ETag even when not returned
+    return tuple(dict.fromkeys(("publishDate", "updatedAt") + fields))
+
+def _summaries(articles: List[dict], fields: Optional[Tuple[str, ...]]) -> List[dict]:
+    if fields is None:
+        return [trusted(ArticleSummary, article) for article in articles]
+    return [trusted(Article, article, fields) for article in articles]
+
+def _cached_body(value) -> EncodedBody:
+    return EncodedBody(dumps(value))
+
+def _cache_article(cache: TTLCache, article: dict, generation):
+    """Encode a stored article for responses and cache it under its id unless a write overtook the read"""
+    article = trusted(Article, article)
+    cached = (_cached_body(article), article_validators(article))
+    cache.set(("article", article["id"]), cached, tags=[_article_tag(article["id"])], generation=generation)
+    return cached
+
+def _parse_ids(ids: str) -> List[str]:
+    """Validate a comma-separated ?ids= list"""
+    requested = [article_id.strip() for article_id in ids.split(",") if article_id.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="ids must name at least one article")
+    if len(requested) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    return requested
+
+async def _article_batch(request: Request, ids: Sequence[str], articles: ArticleStore, cache: TTLCache):
+    """Answer a batch read from per-article cache entries plus one store query for the rest.
+
+    Repeated ids are returned once, at their first position.
+    """
+    entries = {article_id: cache.get(("article", article_id)) for article_id in ids}
+    uncached = [article_id for article_id, cached in entries.items() if cached is None]
+    if uncached:
+        generations = {article_id: cache.generation([_article_tag(article_id)]) for article_id in uncached}
+        for article in await articles.get_many(uncached):
+            entries[article["id"]] = _cache_article(cache, article, generations[article["id"]])
+    
+    found = [cached for cached in entries.values() if cached is not None]
+    missing = [article_id for article_id, cached in entries.items() if cached is None]
+    # Each article body is already encoded, so the batch is spliced together from them
+    body = b'{"items":[' + b",".join(body.raw for body, _ in found) + b'],"missing":' + dumps(missing) + b"}"
+    validators = Validators(make_etag(*(validators.etag for _, validators in found), *missing))
+    return _respond(request, (EncodedBody(body), validators))
+
+def _respond(request: Request, cached):
+    """Answer from a cached (EncodedBody, validators) pair, honouring conditional headers.
+
+    Bodies are encoded once from stored documents and compressed at most once
+    per content-coding; returning a Response skips FastAPI's second validation
+    pass while response_model still documents the shape.
+    """
+    body, validators = cached
+    compressor = request.app.state.compressor
+    encoding = body.negotiate(compressor, compressor.choose(request.headers.get("accept-encoding")))
+    if validators.matches(request):
+        return validators.not_modified(encoding)
+    headers = {**validators.headers(encoding), "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return RawJSONResponse(body.variant(compressor, encoding), headers=headers)
 
 # Articles Routes
-@router.get("/articles", response_model=List[Article])
-async def get_articles(category: Optional[str] = Query(None)):
-    """Get all articles with optional category filter"""
+@router.get("/articles", response_model=Union[ArticlePage, ArticleBatch])
+async def get_articles(
+    request: Request,
+    category: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated article fields to return"),
+    ids: Optional[str] = Query(None, description="Comma-separated article ids to return in full, in this order"),
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache),
+    flights: SingleFlight = Depends(get_single_flight)
+):
+    """Get a page of article summaries with optional category filter, or the articles listed in ids"""
+    try:
+        if ids is not None:
+            return await _article_batch(request, _parse_ids(ids), articles, cache)
+        
+        category_name = _category_name(category)
+        selected = _parse_fields(fields)
+        
+        cache_key = ("articles", category_name, limit, after, selected)
+        
+        async def load():
+            # Taken before the query: a write landing while it runs keeps this result out of the cache
+            generation = cache.generation([_list_tag(category_name)])
+            position = decode_cursor(after) if after else None
+            # Fetch one extra document to know whether another page exists
+            found = await articles.page(category_name, position, limit + 1, _projection(selected))
+            docs = found[:limit]
+            
+            next_cursor = None
+            if len(found) > limit:
+                next_cursor = encode_cursor(docs[-1]["publishDate"], docs[-1]["id"])
+            
+            page = {"items": _summaries(docs, selected), "next_cursor": next_cursor}
+            cached = (_cached_body(page), collection_validators(docs, next_cursor, selected))
+            cache.set(cache_key, cached, tags=[_list_tag(category_name)], generation=generation)
+            return cached
+        
+        cached = cache.get(cache_key)
+        if cached is None:
+            cached = await flights.run(cache_key, load)
+        
+        return _respond(request, cached)
+    except HTTPException:
+        raise
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/articles/featured", response_model=List[ArticleSummary])
+async def get_featured_articles(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated article fields to return"),
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache),
+    flights: SingleFlight = Depends(get_single_flight)
+):
+    """Get featured article summaries only"""
     try:
-        query = {}
-        if category and category != 'all':
-            # Convert slug to category name
-            category_name = category.replace('-', ' ').title()
-            query = {"category": category_name}
-        
-        articles = await db.articles.find(query).sort("publishDate", -1).to_list(1000)
-        return [Article(**article) for article in articles]
+        selected = _parse_fields(fields)
+        
+        async def load():
+            generation = cache.generation([FEATURED_TAG])
+            featured = await articles.featured(_projection(selected), 100)
+            cached = (_cached_body(_summaries(featured, selected)), collection_validators(featured, selected))
+            cache.set(("featured", selected), cached, tags=[FEATURED_TAG], generation=generation)
+            return cached
+        
+        cached = cache.get(("featured", selected))
+        if cached is None:
+            cached = await flights.run(("featured", selected), load)
+        
+        return _respond(request, cached)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/articles/featured", response_model=List[Article])
-async def get_featured_articles():
-    """Get featured articles only"""
+@router.get("/articles/search", response_model=ArticleSearchPage)
+async def search_articles(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None),
+    articles: ArticleStore = Depends(get_article_store)
+):
+    """Full-text search over title, excerpt, content, author and category, best matches first"""
     try:
-        articles = await db.articles.find({"featured": True}).sort("publishDate", -1).to_list(100)
-        return [Article(**article) for article in articles]
+        position = decode_score_cursor(after) if after else None
+        hits = await articles.search(q, _category_name(category), position, limit + 1, SUMMARY_FIELDS)
+        items = [trusted(ArticleSearchHit, hit) for hit in hits[:limit]]
+        
+        next_cursor = None
+        if len(hits) > limit:
+            next_cursor = encode_score_cursor(items[-1]["score"], items[-1]["id"])
+        
+        return RawJSONResponse(dumps({"items": items, "next_cursor": next_cursor}))
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/articles/{article_id}", response_model=Article)
-async def get_article(article_id: str):
+async def get_article(
+    article_id: str,
+    request: Request,
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache),
+    flights: SingleFlight = Depends(get_single_flight)
+):
     """Get single article by ID"""
     try:
-        article = await db.articles.find_one({"id": article_id})
-        if not article:
-            raise HTTPException(status_code=404, detail="Article not found")
-        return Article(**article)
+        async def load():
+            generation = cache.generation([_article_tag(article_id)])
+            article = await articles.get(article_id)
+            if not article:
+                raise HTTPException(status_code=404, detail="Article not found")
+            return _cache_article(cache, article, generation)
+        
+        cached = cache.get(("article", article_id))
+        if cached is None:
+            cached = await flights.run(("article", article_id), load)
+        
+        return _respond(request, cached)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/articles/{article_id}/related", response_model=List[RelatedArticle])
+async def get_related_articles(
+    article_id: str,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=50),
+    articles: ArticleStore = Depends(get_article_store),
+    related: Optional[RelatedArticles] = Depends(get_related_index)
+):
+    """Get the articles most similar to this one, from the precomputed similarity table"""
+    try:
+        if related is None:
+            raise HTTPException(status_code=404, detail="Related articles are disabled")
+        if not related.ready:
+            raise HTTPException(status_code=503, detail="Related articles are still being computed")
+        if article_id not in related:
+            # Written through another worker since this worker's table was built
+            article = await articles.get(article_id)
+            if not article:
+                raise HTTPException(status_code=404, detail="Article not found")
+            await related.upsert(article, articles)
+        
+        items = [{**trusted(ArticleSummary, summary), "score": score} for summary, score in related.related(article_id, limit)]
+        validators = Validators(make_etag(*(f"{item['id']}@{item['updatedAt']}={item['score']}" for item in items)))
+        return _respond(request, (_cached_body(items), validators))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/articles", response_model=Article)
-async def create_article(article: ArticleCreate):
+async def create_article(
+    article: ArticleCreate,
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache),
+    related: Optional[RelatedArticles] = Depends(get_related_index)
+):
     """Create new article"""
     try:
         article_dict = article.model_dump()
         new_article = Article(**article_dict)
-        await db.articles.insert_one(new_article.model_dump())
+        document = new_article.model_dump()
+        await articles.insert(document)
+        _invalidate_article(cache, document)
+        if related is not None:
+            await related.upsert(document, articles)
         return new_article
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/articles/batch", response_model=ArticleBatch)
+async def get_article_batch(
+    batch: ArticleBatchRequest,
+    request: Request,
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache)
+):
+    """Get many articles by id in the order given, for lists too long for ?ids="""
+    try:
+        return await _article_batch(request, batch.ids, articles, cache)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/articles/bulk", response_model=BulkImportResult)
+async def bulk_import_articles(
+    request: Request,
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache),
+    related: Optional[RelatedArticles] = Depends(get_related_index)
+):
+    """Upsert articles keyed on id from a streamed NDJSON or JSON array body"""
+    summary = BulkImportResult()
+    chunk = []
+    try:
+        # The body is parsed as it arrives and written every BULK_CHUNK_SIZE records
+        async for record, error in iter_json_records(request.stream()):
+            chunk.append((len(summary.results) + len(chunk), record, error))
+            if len(chunk) == BULK_CHUNK_SIZE:
+                summary.add(await upsert_chunk(articles, ArticleImport, chunk))
+                chunk = []
+        summary.add(await upsert_chunk(articles, ArticleImport, chunk))
+        return summary
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if summary.inserted or summary.updated:
+            # Imports can touch any category, so refresh counts and drop all cached reads
+            await articles.refresh_stats()
+            cache.clear()
+            if related is not None:
+                related.schedule_refresh(
+                    [result.id for result in summary.results if result.status in ("inserted", "updated")], articles
+                )
+
 @router.put("/articles/{article_id}", response_model=Article)
-async def update_article(article_id: str, article: ArticleUpdate):
+async def update_article(
+    article_id: str,
+    article: ArticleUpdate,
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache),
+    related: Optional[RelatedArticles] = Depends(get_related_index)
+):
     """Update existing article"""
     try:
         update_data = {k: v for k, v in article.model_dump().items() if v is not None}
         update_data["updatedAt"] = datetime.utcnow()
         
-        result = await db.articles.update_one(
-            {"id": article_id},
-            {"$set": update_data}
-        )
-        
-        if result.modified_count == 0:
+        result = await articles.update(article_id, update_data)
+        if result is None:
             raise HTTPException(status_code=404, detail="Article not found")
         
-        updated_article = await db.articles.find_one({"id": article_id})
+        previous, updated_article = result
+        _invalidate_article(cache, updated_article, previous or updated_article)
+        if related is not None:
+            await related.upsert(updated_article, articles)
         return Article(**updated_article)
     except HTTPException:
         raise
@@ -93,12 +388,20 @@ async def update_article(article_id: str, article: ArticleUpdate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/articles/{article_id}")
-async def delete_article(article_id: str):
+async def delete_article(
+    article_id: str,
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache),
+    related: Optional[RelatedArticles] = Depends(get_related_index)
+):
     """Delete article"""
     try:
-        result = await db.articles.delete_one({"id": article_id})
-        if result.deleted_count == 0:
+        deleted = await articles.delete(article_id)
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Article not found")
+        _invalidate_article(cache, deleted)
+        if related is not None:
+            await related.remove(article_id, articles)
         return {"message": "Article deleted successfully"}
     except HTTPException:
         raise
@@ -107,56 +410,116 @@ async def delete_article(article_id: str):
 
 # Categories Routes
 @router.get("/categories", response_model=List[Category])
-async def get_categories():
+async def get_categories(
+    request: Request,
+    articles: ArticleStore = Depends(get_article_store),
+    cache: TTLCache = Depends(get_cache),
+    flights: SingleFlight = Depends(get_single_flight)
+):
     """Get all categories with article counts"""
     try:
-        # Get total count
-        total_count = await db.articles.count_documents({})
-        
-        # Get counts by category
-        pipeline = [
-            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-            {"$sort": {"_id": 1}}
-        ]
-        category_counts = await db.articles.aggregate(pipeline).to_list(100)
-        
-        # Build categories list
-        categories = [
-            Category(id="all", name="All Articles", count=total_count)
-        ]
-        
-        for cat in category_counts:
-            slug = cat["_id"].lower().replace(" ", "-")
-            categories.append(
-                Category(id=slug, name=cat["_id"], count=cat["count"])
-            )
-        
-        return categories
+        async def load():
+            generation = cache.generation([CATEGORIES_TAG])
+            # Counts are maintained as articles are written
+            category_counts = await articles.category_counts()
+            total_count = sum(count for _, count in category_counts)
+            
+            # Build categories list
+            categories = [
+                Category(id="all", name="All Articles", count=total_count)
+            ]
+            
+            for name, count in category_counts:
+                slug = name.lower().replace(" ", "-")
+                categories.append(
+                    Category(id=slug, name=name, count=count)
+                )
+            
+            validators = Validators(make_etag(*(f"{c.id}={c.count}" for c in categories)))
+            cached = (_cached_body([c.model_dump() for c in categories]), validators)
+            cache.set(("categories",), cached, tags=[CATEGORIES_TAG], generation=generation)
+            return cached
+        
+        cached = cache.get(("categories",))
+        if cached is None:
+            cached = await flights.run(("categories",), load)
+        
+        return _respond(request, cached)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Newsletter Routes
 @router.post("/newsletter/subscribe", response_model=NewsletterSubscriber)
-async def subscribe_newsletter(subscriber: NewsletterSubscribe):
+async def subscribe_newsletter(
+    subscriber: NewsletterSubscribe,
+    subscribers: SubscriberStore = Depends(get_subscriber_store),
+    buffer: Optional[SignupBuffer] = Depends(get_signup_buffer)
+):
     """Subscribe to newsletter"""
     try:
-        # Check if email already exists
-        existing = await db.newsletter_subscribers.find_one({"email": subscriber.email})
-        if existing:
-            return NewsletterSubscriber(**existing)
-        
-        # Create new subscriber
-        new_subscriber = NewsletterSubscriber(email=subscriber.email)
-        await db.newsletter_subscribers.insert_one(new_subscriber.model_dump())
-        return new_subscriber
+        if buffer is not None:
+            # Write-behind mode: this signup is written with others in one batch
+            return NewsletterSubscriber(**await buffer.submit(subscriber.email))
+        
+        return NewsletterSubscriber(**await subscribers.subscribe(subscriber.email))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/newsletter/subscribe/batch", response_model=List[NewsletterSubscriber])
+async def subscribe_newsletter_batch(
+    batch: NewsletterBatchSubscribe,
+    subscribers: SubscriberStore = Depends(get_subscriber_store),
+    buffer: Optional[SignupBuffer] = Depends(get_signup_buffer)
+):
+    """Subscribe many emails at once, e.g. for partner imports"""
+    try:
+        if buffer is not None:
+            stored = await buffer.submit_many(batch.emails)
+        else:
+            stored = await subscribers.subscribe_many(batch.emails)
+        return [NewsletterSubscriber(**stored[email]) for email in dict.fromkeys(batch.emails)]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+SUBSCRIBER_FIELDS = tuple(NewsletterSubscriber.model_fields)
+
 @router.get("/newsletter/subscribers", response_model=List[NewsletterSubscriber])
-async def get_subscribers():
+async def get_subscribers(subscribers: SubscriberStore = Depends(get_subscriber_store)):
     """Get all newsletter subscribers"""
     try:
-        subscribers = await db.newsletter_subscribers.find().sort("subscribedAt", -1).to_list(10000)
-        return [NewsletterSubscriber(**sub) for sub in subscribers]
+        # Streamed straight from the store so memory stays flat however many there are
+        return StreamingResponse(
+            stream_documents(subscribers.iterate(descending=True), SUBSCRIBER_FIELDS, "json"),
+            media_type=MEDIA_TYPES["json"],
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/newsletter/subscribers/export")
+async def export_subscribers(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    after: Optional[str] = Query(None, description="X-Next-Cursor from the previous export"),
+    subscribers: SubscriberStore = Depends(get_subscriber_store)
+):
+    """Stream subscribers as NDJSON or CSV for incremental syncs.
+
+    Every signup stored since the last export joins a new export batch;
+    the X-Next-Cursor response header names it. Pass it as `after` next
+    time to receive only the signups stored since, each exactly once.
+    """
+    try:
+        position = decode_batch_cursor(after) if after else 0
+        
+        # Closing the batch up front fixes the end of the export, so the cursor can be
+        # sent as a header and signups arriving mid-stream are left for the next sync
+        batch = await subscribers.close_export_batch()
+        
+        return StreamingResponse(
+            stream_documents(subscribers.iterate_exported(position, batch), SUBSCRIBER_FIELDS, format),
+            media_type=MEDIA_TYPES[format],
+            headers={"X-Next-Cursor": encode_batch_cursor(batch)},
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,9 @@
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
-import os
-from dotenv import load_dotenv
-from pathlib import Path
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+from core.database import create_client, load_settings
+from core.indexes import ensure_indexes
+from core import category_stats
 
 # Sample articles data
 articles = [
@@ -126,9 +123,9 @@ articles = [
 
 async def seed_database():
     # Connect to MongoDB
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[os.environ['DB_NAME']]
+    settings = load_settings()
+    client = create_client(settings)
+    db = client[settings.db_name]
     
     try:
         # Clear existing data
@@ -139,11 +136,12 @@ async def seed_database():
         await db.articles.insert_many(articles)
         print(f"Successfully seeded {len(articles)} articles")
         
+        # Recompute category counts for the new articles
+        await category_stats.rebuild(db)
+        print("Rebuilt category stats")
+        
         # Create indexes
-        await db.articles.create_index("id", unique=True)
-        await db.articles.create_index("category")
-        await db.articles.create_index("featured")
-        await db.newsletter_subscribers.create_index("email", unique=True)
+        await ensure_indexes(db)
         print("Created database indexes")
         
         print("Database seeding completed!")
@@ -1,23 +1,133 @@
-from fastapi import FastAPI, APIRouter
-from dotenv import load_dotenv
+# First, so the import phase of the startup timings covers everything below, dependencies included
+from core.startup_clock import IMPORT_STARTED
+from fastapi import FastAPI, APIRouter, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from contextlib import asynccontextmanager
 import logging
-from pathlib import Path
+import os
+import time
+
+from routes.blog_routes import SUMMARY_FIELDS, router as blog_router
+from routes.admin_routes import router as admin_router
+from core.cache import create_cache
+from core.category_stats import ensure_stats
+from core.coherence import create_cache_coherence
+from core.compression import CompressionMiddleware, Compressor
+from core.database import PoolStats, create_client, load_settings
+from core.indexes import ensure_indexes
+from core.memory_storage import memory_storage
+from core.metrics import CONTENT_TYPE, CommandMetrics, Metrics, MetricsMiddleware
+from core.profiling import ProfilerMiddleware, create_profiler, create_slow_query_log
+from core.related import create_related_index
+from core.signups import create_signup_buffer
+from core.singleflight import SingleFlight
+from core.snapshot import SnapshotMiddleware, create_snapshot_publisher, create_snapshot_server
+from core.storage import mongo_storage, storage_backend
+from core.warmup import Warmup, warmup_paths
+
+async def _open_mongo(app: FastAPI):
+    """One MongoDB client (and pool) per process, shared by every route"""
+    settings = load_settings()
+    slow_queries = create_slow_query_log()
+    listeners = [app.state.pool_stats, CommandMetrics(app.state.metrics)]
+    if slow_queries is not None:
+        listeners.append(slow_queries)
+    client = create_client(settings, listeners=listeners)
+    if slow_queries is not None:
+        slow_queries.attach(client)
+    app.state.slow_queries = slow_queries
+    app.state.mongo_client = client
+    app.state.db = client[settings.db_name]
 
-from routes.blog_routes import router as blog_router
+    # The client connects lazily; open the pool now rather than on the first request
+    with app.state.warmup.phase("connect"):
+        await app.state.db.command("ping")
+    with app.state.warmup.phase("indexes"):
+        await ensure_indexes(app.state.db)
+        await ensure_stats(app.state.db)
+    return client
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+async def _seed_memory(storage):
+    """Load the sample articles from seed_data.py into an in-memory store"""
+    from seed_data import articles
+    for article in articles:
+        await storage.articles.insert(article)
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+def _forget_flights(flights):
+    """Other workers' writes make reads in flight here stale too"""
+    async def forget(tags):
+        flights.forget()
+    return forget
 
-# Create the main app without a prefix
-app = FastAPI()
+def _follow_snapshots(snapshots, publisher):
+    """Stop serving snapshot entries other workers' writes made stale, and re-render them here"""
+    async def follow(tags):
+        snapshots.drop(tags)
+        if publisher is not None:
+            publisher.invalidated(tags)
+    return follow
+
+def _follow_related(related, articles):
+    """Apply article writes made by other workers to this worker's related-articles table"""
+    async def follow(tags):
+        if tags is None:
+            related.schedule_rebuild(articles)
+            return
+        await related.refresh([tag.split(":", 1)[1] for tag in tags if tag.startswith("article:")], articles)
+    return follow
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    client = None
+    app.state.pool_stats = PoolStats()
+    app.state.slow_queries = None
+    if storage_backend() == "memory":
+        # Everything in this process, so local runs, tests and benchmarks need no MongoDB
+        app.state.storage = memory_storage()
+        if os.environ.get('STORAGE_SEED', '').lower() in ('1', 'true', 'yes'):
+            await _seed_memory(app.state.storage)
+    else:
+        client = await _open_mongo(app)
+        app.state.storage = mongo_storage(app.state.db)
+    app.state.cache = create_cache()
+    # Reads already in flight when a write lands must not be shared with later requests
+    app.state.cache.add_listener(app.state.flights.forget)
+    # Other workers and replicas learn of this worker's writes through MongoDB
+    app.state.coherence = create_cache_coherence(app.state.db, app.state.cache) if client is not None else None
+    if app.state.coherence is not None:
+        app.state.coherence.add_listener(_forget_flights(app.state.flights))
+        await app.state.coherence.start()
+    app.state.signup_buffer = create_signup_buffer(app.state.storage.subscribers)
+    # Built in the background; the related route answers 503 until it is ready
+    app.state.related = create_related_index(SUMMARY_FIELDS)
+    if app.state.related is not None:
+        app.state.related.schedule_rebuild(app.state.storage.articles)
+        if app.state.coherence is not None:
+            app.state.coherence.add_listener(_follow_related(app.state.related, app.state.storage.articles))
+    # Writes that invalidate cached reads also re-render the matching snapshot files
+    app.state.snapshot_publisher = create_snapshot_publisher(app, app.state.snapshots)
+    if app.state.snapshot_publisher is not None:
+        app.state.cache.add_listener(app.state.snapshot_publisher.invalidated)
+    if app.state.snapshots is not None and app.state.coherence is not None:
+        app.state.coherence.add_listener(_follow_snapshots(app.state.snapshots, app.state.snapshot_publisher))
+    # Fills the read cache with the hot pages; /api/ready answers 503 until it is done
+    app.state.warmup.start(app, warmup_paths())
+    try:
+        yield
+    finally:
+        await app.state.warmup.close()
+        if app.state.related is not None:
+            await app.state.related.close()
+        if app.state.snapshot_publisher is not None:
+            await app.state.snapshot_publisher.close()
+        if app.state.coherence is not None:
+            await app.state.coherence.close()
+        # Drain queued newsletter signups before the pool goes away
+        if app.state.signup_buffer is not None:
+            await app.state.signup_buffer.close()
+        if client is not None:
+            client.close()
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -27,19 +137,66 @@ api_router = APIRouter(prefix="/api")
 async def root():
     return {"message": "FitLife Blog API is running"}
 
+# Readiness probe: unlike the health check above, fails until startup warm-up has finished
+@api_router.get("/ready")
+async def ready(request: Request):
+    warmup = request.app.state.warmup
+    return JSONResponse(warmup.stats(), status_code=200 if warmup.ready else 503)
+
 # Include blog routes
 api_router.include_router(blog_router, tags=["blog"])
+api_router.include_router(admin_router, tags=["admin"])
 
-# Include the router in the main app
-app.include_router(api_router)
+# Prometheus scrape target, outside /api so it is not exposed through the frontend proxy
+async def get_metrics(request: Request):
+    return PlainTextResponse(request.app.state.metrics.render(), media_type=CONTENT_TYPE)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app() -> FastAPI:
+    """Build an app with its own metrics, caches and middleware, configured from the environment.
+
+    Uvicorn serves the module-level app below; tests build more than one to
+    run several workers in one process.
+    """
+    app = FastAPI(lifespan=lifespan)
+
+    # Shared by the middleware and the cached read paths, which precompress bodies
+    compressor = Compressor.from_env()
+    app.state.compressor = compressor
+    metrics = Metrics()
+    app.state.metrics = metrics
+    # Identical cache misses running at the same time share one store query
+    app.state.flights = SingleFlight(metrics)
+    # /api/admin/* answers only to this bearer token, and does not exist without one
+    app.state.admin_token = os.environ.get('ADMIN_TOKEN') or None
+    # None unless PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set; then no middleware is installed
+    profiler = create_profiler()
+    app.state.profiler = profiler
+    # None unless SNAPSHOT_DIR is set; then snapshotted reads are served from files
+    snapshots = create_snapshot_server(compressor)
+    app.state.snapshots = snapshots
+
+    app.include_router(api_router)
+    app.add_api_route("/metrics", get_metrics, methods=["GET"], include_in_schema=False)
+
+    app.add_middleware(CompressionMiddleware, compressor=compressor)
+    if snapshots is not None:
+        # Outside compression: snapshot files are already compressed
+        app.add_middleware(SnapshotMiddleware, server=snapshots)
+    if profiler is not None:
+        app.add_middleware(ProfilerMiddleware, profiler=profiler)
+    # Added after compression so the latency it records includes compressing
+    app.add_middleware(MetricsMiddleware, metrics=metrics, routes=app.routes)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Startup phases and readiness; the import phase ends when the app is built
+    app.state.warmup = Warmup(time.perf_counter() - IMPORT_STARTED, metrics)
+    return app
 
 # Configure logging
 logging.basicConfig(
@@ -48,6 +205,4 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+app = create_app()
@@ -2,6 +2,7 @@
 """
 FitLife Blog Backend API Test Suite
 Tests all backend API endpoints comprehensively
+For throughput and latency use backend/benchmarks/load_test.py
 """
 
 import requests
@@ -55,11 +56,11 @@ class FitLifeAPITester:
         return False
     
     def test_get_all_articles(self):
-        """Test GET /api/articles - Should return all articles"""
+        """Test GET /api/articles - Should return the first page of articles"""
         try:
             response = requests.get(f"{self.base_url}/articles", timeout=10)
             if response.status_code == 200:
-                articles = response.json()
+                articles = response.json().get('items')
                 if isinstance(articles, list):
                     print(f"   Found {len(articles)} articles")
                     if len(articles) >= 8:  # Should have 8 seeded articles
@@ -84,7 +85,7 @@ class FitLifeAPITester:
         try:
             response = requests.get(f"{self.base_url}/articles?category=strength-training", timeout=10)
             if response.status_code == 200:
-                articles = response.json()
+                articles = response.json().get('items')
                 if isinstance(articles, list):
                     # Check if filtered correctly
                     if articles:
@@ -108,6 +109,44 @@ class FitLifeAPITester:
             self.log_result("Get Articles by Category", False, f"Error: {str(e)}")
         return False
     
+    def test_articles_pagination(self):
+        """Test GET /api/articles?limit=&after= - Pages should not overlap"""
+        try:
+            seen = []
+            cursor = None
+            while True:
+                params = {'limit': 3}
+                if cursor:
+                    params['after'] = cursor
+                response = requests.get(f"{self.base_url}/articles", params=params, timeout=10)
+                if response.status_code != 200:
+                    self.log_result("Articles Pagination", False, f"Status code: {response.status_code}")
+                    return False
+                page = response.json()
+                if len(page['items']) > 3:
+                    self.log_result("Articles Pagination", False, f"Page larger than limit: {len(page['items'])}")
+                    return False
+                seen.extend(a['id'] for a in page['items'])
+                cursor = page.get('next_cursor')
+                if not cursor:
+                    break
+            
+            if len(seen) != len(set(seen)):
+                self.log_result("Articles Pagination", False, "Duplicate articles across pages")
+                return False
+            print(f"   Walked {len(seen)} articles across pages")
+            
+            response = requests.get(f"{self.base_url}/articles?after=not-a-cursor", timeout=10)
+            if response.status_code != 400:
+                self.log_result("Articles Pagination", False, f"Expected 400 for bad cursor, got {response.status_code}")
+                return False
+            
+            self.log_result("Articles Pagination", True)
+            return True
+        except Exception as e:
+            self.log_result("Articles Pagination", False, f"Error: {str(e)}")
+        return False
+    
     def test_get_featured_articles(self):
         """Test GET /api/articles/featured"""
         try:
@@ -305,6 +344,7 @@ class FitLifeAPITester:
         print("\n📚 Testing Articles Endpoints:")
         articles = self.test_get_all_articles()
         self.test_get_articles_by_category()
+        self.test_articles_pagination()
         featured_articles = self.test_get_featured_articles()
         self.test_get_article_by_id(articles)
         self.test_get_invalid_article_id()
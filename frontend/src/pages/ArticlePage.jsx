@@ -6,6 +6,20 @@ import Footer from '../components/Footer';
 import { articlesApi } from '../services/api';
 import './ArticlePage.css';
 
+const RELATED_COUNT = 3;
+
+// Most similar articles when the server keeps a related-articles table,
+// otherwise the newest others in the same category
+const fetchRelated = async (article) => {
+  try {
+    return await articlesApi.getRelated(article.id, RELATED_COUNT);
+  } catch (error) {
+    const slug = article.category.toLowerCase().replace(/\s+/g, '-');
+    const page = await articlesApi.getAll(slug);
+    return page.items.filter(post => post.id !== article.id).slice(0, RELATED_COUNT);
+  }
+};
+
 const ArticlePage = () => {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -22,12 +36,7 @@ const ArticlePage = () => {
         const articleData = await articlesApi.getById(id);
         setArticle(articleData);
         
-        // Fetch related articles from same category
-        const allArticles = await articlesApi.getAll();
-        const related = allArticles
-          .filter(post => post.id !== articleData.id && post.category === articleData.category)
-          .slice(0, 3);
-        setRelatedPosts(related);
+        setRelatedPosts(await fetchRelated(articleData));
       } catch (error) {
         console.error('Error fetching article:', error);
         setArticle(null);
@@ -10,48 +10,86 @@ const BlogPage = () => {
   const [activeCategory, setActiveCategory] = useState('all');
   const [searchQuery, setSearchQuery] = useState('');
   const [articles, setArticles] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [searchResults, setSearchResults] = useState(null);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
 
+  const categoryFilter = activeCategory === 'all' ? null : activeCategory;
+
   useEffect(() => {
-    const fetchData = async () => {
+    const fetchCategories = async () => {
       try {
-        const [articlesData, categoriesData] = await Promise.all([
-          articlesApi.getAll(),
-          categoriesApi.getAll()
-        ]);
-        setArticles(articlesData);
-        setCategories(categoriesData);
+        setCategories(await categoriesApi.getAll());
       } catch (error) {
-        console.error('Error fetching data:', error);
-      } finally {
-        setLoading(false);
+        console.error('Error fetching categories:', error);
       }
     };
 
-    fetchData();
+    fetchCategories();
   }, []);
 
   useEffect(() => {
+    let cancelled = false;
     const fetchArticlesByCategory = async () => {
       try {
         setLoading(true);
-        const articlesData = await articlesApi.getAll(activeCategory === 'all' ? null : activeCategory);
-        setArticles(articlesData);
+        const page = await articlesApi.getAll(categoryFilter);
+        if (cancelled) return;
+        setArticles(page.items);
+        setNextCursor(page.next_cursor);
       } catch (error) {
         console.error('Error fetching articles:', error);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     fetchArticlesByCategory();
-  }, [activeCategory]);
+    // A slow response for the previous category must not replace this one's articles
+    return () => { cancelled = true; };
+  }, [categoryFilter]);
 
-  const filteredPosts = articles.filter(post =>
-    post.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-    post.excerpt.toLowerCase().includes(searchQuery.toLowerCase())
-  );
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await articlesApi.getAll(categoryFilter, nextCursor);
+      setArticles(current => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error fetching more articles:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return undefined;
+    }
+
+    // Wait for the user to stop typing before asking the server
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const results = await articlesApi.search(query, categoryFilter, null, { signal: controller.signal });
+        if (!controller.signal.aborted) setSearchResults(results.items);
+      } catch (error) {
+        if (!controller.signal.aborted) console.error('Error searching articles:', error);
+      }
+    }, 250);
+
+    // A newer query or category supersedes this search: a slow response must not overwrite its results
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [searchQuery, categoryFilter]);
+
+  const filteredPosts = searchResults ?? articles;
 
   return (
     <div className="blog-page">
@@ -123,6 +161,13 @@ const BlogPage = () => {
                 ))}
               </div>
             )}
+            {!loading && searchResults === null && nextCursor && (
+              <div className="load-more">
+                <button onClick={loadMore} disabled={loadingMore} className="btn-secondary">
+                  {loadingMore ? 'Loading...' : 'Load more articles'}
+                </button>
+              </div>
+            )}
           </main>
         </div>
       </div>
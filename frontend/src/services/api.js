@@ -5,9 +5,26 @@ const API = `${BACKEND_URL}/api`;
 
 // Articles API
 export const articlesApi = {
-  getAll: async (category = null) => {
-    const url = category ? `${API}/articles?category=${category}` : `${API}/articles`;
-    const response = await axios.get(url);
+  // One page of summaries: { items, next_cursor }; pass next_cursor back as `after` for the next page
+  getAll: async (category = null, after = null) => {
+    return articlesApi.getPage(category, after);
+  },
+
+  getPage: async (category = null, after = null, limit = null) => {
+    const params = {};
+    if (category) params.category = category;
+    if (after) params.after = after;
+    if (limit) params.limit = limit;
+    const response = await axios.get(`${API}/articles`, { params });
+    return response.data;
+  },
+
+  // Pass an AbortController's signal to cancel a search that has been superseded
+  search: async (query, category = null, after = null, { signal } = {}) => {
+    const params = { q: query };
+    if (category) params.category = category;
+    if (after) params.after = after;
+    const response = await axios.get(`${API}/articles/search`, { params, signal });
     return response.data;
   },
 
@@ -21,6 +38,21 @@ export const articlesApi = {
     return response.data;
   },
 
+  // Saved articles in one request; returns { items, missing }
+  getByIds: async (ids) => {
+    const response = ids.length > 50
+      ? await axios.post(`${API}/articles/batch`, { ids })
+      : await axios.get(`${API}/articles`, { params: { ids: ids.join(',') } });
+    return response.data;
+  },
+
+  getRelated: async (id, limit = null) => {
+    const params = {};
+    if (limit) params.limit = limit;
+    const response = await axios.get(`${API}/articles/${id}/related`, { params });
+    return response.data;
+  },
+
   create: async (articleData) => {
     const response = await axios.post(`${API}/articles`, articleData);
     return response.data;
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# The backend runs from its own directory, so its modules import as core.*, models.*
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from core.category_stats import ensure_stats  # noqa: E402
+from core.indexes import ensure_indexes  # noqa: E402
+from core.memory_storage import memory_storage  # noqa: E402
+from core.storage import mongo_storage  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def mongo_url():
+    """TEST_MONGO_URL (default localhost); tests using it skip when no server answers"""
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    url = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+    client = MongoClient(url, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB server at {url}")
+    finally:
+        client.close()
+    return url
+
+
+@pytest.fixture
+def mongo_db_name(mongo_url):
+    """A fresh database name, dropped again after the test"""
+    from pymongo import MongoClient
+
+    name = f"test_{uuid.uuid4().hex}"
+    yield name
+    client = MongoClient(mongo_url)
+    client.drop_database(name)
+    client.close()
+
+
+async def open_mongo(url: str, name: str):
+    """Motor client and database with the app's indexes, opened on the running loop"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(url)
+    db = client[name]
+    await ensure_indexes(db)
+    await ensure_stats(db)
+    return client, db
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def run_with_storage(request):
+    """Run an async test body against a fresh Storage on each backend.
+
+    Motor clients belong to the event loop they were opened on, so each
+    run opens its own inside asyncio.run.
+    """
+    if request.param == "memory":
+        return lambda test: asyncio.run(test(memory_storage()))
+
+    url = request.getfixturevalue("mongo_url")
+    name = request.getfixturevalue("mongo_db_name")
+
+    def run(test):
+        async def main():
+            client, db = await open_mongo(url, name)
+            try:
+                return await test(mongo_storage(db))
+            finally:
+                client.close()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A fresh app on the in-memory backend, started and stopped around the test"""
+    from fastapi.testclient import TestClient
+
+    import server
+
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    with TestClient(server.create_app()) as client:
+        yield client
+
+
+@pytest.fixture
+def create_article(client):
+    """Post an article through the API; keyword arguments override the sample fields"""
+    def create(**fields):
+        article = {
+            "title": "Morning run", "excerpt": "Start the day", "content": "Easy miles before breakfast",
+            "category": "Cardio", "author": "Sam", "publishDate": "2025-03-01T09:30:00",
+            "readTime": "5 min", "image": "https://example.com/run.jpg", "featured": False,
+            **fields,
+        }
+        response = client.post("/api/articles", json=article)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
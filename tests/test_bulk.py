@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from core.bulk import iter_json_records
+
+
+async def _stream(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def _records(body: bytes, size: int = 64):
+    async def collect():
+        return [record async for record in iter_json_records(_stream(body, size))]
+    return asyncio.run(collect())
+
+
+def _article(number: int) -> str:
+    return json.dumps({"title": f"Article {number}", "note": "brackets ] } and commas , in a string"})
+
+
+def test_array_of_objects():
+    records = _records(("[" + ",".join(_article(i) for i in range(3)) + "]").encode())
+    assert [record["title"] for record, error in records] == ["Article 0", "Article 1", "Article 2"]
+    assert all(error is None for _, error in records)
+
+
+def test_malformed_element_mid_array_is_reported_and_skipped():
+    body = "[" + _article(0) + ", {oops}, " + ",".join(_article(i) for i in range(1, 5001)) + "]"
+    for size in (7, 64, 65536):
+        records = _records(body.encode(), size)
+        assert len(records) == 5002
+        assert records[0] == ({"title": "Article 0", "note": "brackets ] } and commas , in a string"}, None)
+        assert records[1][0] is None and records[1][1].startswith("Invalid JSON")
+        assert [record["title"] for record, _ in records[2:]] == [f"Article {i}" for i in range(1, 5001)]
+
+
+def test_malformed_scalar_and_last_element():
+    records = _records(b'[{"a": 1}, nope, {"b": 2}, {"c": ]')
+    assert [record for record, _ in records] == [{"a": 1}, None, {"b": 2}, None]
+    assert records[1][1].startswith("Invalid JSON")
+    assert records[3][1].startswith("Invalid JSON")
+
+
+def test_non_object_element_and_unterminated_array():
+    records = _records(b'[{"a": 1}, 5, {"b": 2}')
+    assert records[0] == ({"a": 1}, None)
+    assert records[1] == (None, "Record must be a JSON object")
+    assert records[2] == ({"b": 2}, None)
+    assert records[3] == (None, "Invalid JSON array: missing closing bracket")
+
+
+def test_ndjson_lines():
+    records = _records(b'{"a": 1}\nnot json\n{"b": 2}\n', 5)
+    assert [record for record, _ in records] == [{"a": 1}, None, {"b": 2}]
@@ -0,0 +1,145 @@
+from core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses, cache.expirations) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_disabled_cache_stores_nothing():
+    for cache in (TTLCache(max_entries=0), TTLCache(ttl=0)):
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+def test_invalidate_drops_only_tagged_entries_and_notifies():
+    cache = TTLCache()
+    heard = []
+    cache.add_listener(heard.append)
+    cache.set("list", 1, tags=["articles:list:all"])
+    cache.set("cardio", 2, tags=["articles:list:Cardio", "categories"])
+    cache.set("article", 3, tags=["article:a"])
+
+    assert cache.invalidate("articles:list:Cardio", "article:a") == 2
+    assert (cache.get("list"), cache.get("cardio"), cache.get("article")) == (1, None, None)
+    assert heard == [("articles:list:Cardio", "article:a")]
+
+    # Invalidations relayed from other workers must not be echoed back to them
+    cache.invalidate("articles:list:all", notify=False)
+    assert cache.get("list") is None
+    assert len(heard) == 1
+    cache.clear()
+    assert heard[-1] is None
+
+
+def test_fill_started_before_an_invalidation_is_dropped():
+    cache = TTLCache()
+    generation = cache.generation(["article:a"])
+    cache.invalidate("article:a")
+    cache.set("article", "stale", tags=["article:a"], generation=generation)
+    assert cache.get("article") is None
+    assert cache.stale_fills == 1
+
+    # Other tags moving on does not matter, and a fresh token fills as usual
+    generation = cache.generation(["article:a"])
+    cache.invalidate("article:b")
+    cache.set("article", "fresh", tags=["article:a"], generation=generation)
+    assert cache.get("article") == "fresh"
+
+
+def test_clear_outdates_every_generation_token():
+    cache = TTLCache()
+    generation = cache.generation(["article:a"])
+    cache.clear()
+    cache.set("article", "stale", tags=["article:a"], generation=generation)
+    assert cache.get("article") is None
+    assert cache.stale_fills == 1
+
+
+def test_generation_record_is_bounded():
+    cache = TTLCache(max_entries=2)
+    generation = cache.generation(["article:a"])
+    for number in range(20):
+        cache.invalidate(f"article:{number}")
+    assert len(cache._generations) <= 8
+    # Starting the record over outdates older tokens rather than letting them match again
+    cache.set("article", "stale", tags=["article:a"], generation=generation)
+    assert cache.get("article") is None
+
+
+def test_write_invalidates_cached_list_category_and_article(client, create_article):
+    article = create_article(title="Morning run")
+    other = create_article(title="Heavy squats", category="Strength")
+    urls = ["/api/articles", "/api/articles?category=cardio", f"/api/articles/{article['id']}", "/api/categories"]
+    for url in urls:
+        assert client.get(url).status_code == 200
+    cache = client.app.state.cache
+    cached = len(cache)
+    assert cache.get(("article", other["id"])) is None
+    client.get(f"/api/articles/{other['id']}")
+
+    response = client.put(f"/api/articles/{article['id']}", json={"title": "Tempo run"})
+    assert response.status_code == 200
+    # Everything holding the article went; the other article's entry stayed
+    assert len(cache) == cached + 1 - 3
+    assert cache.get(("article", other["id"])) is not None
+
+    assert client.get(f"/api/articles/{article['id']}").json()["title"] == "Tempo run"
+    assert [item["title"] for item in client.get("/api/articles?category=cardio").json()["items"]] == ["Tempo run"]
+    assert "Tempo run" in [item["title"] for item in client.get("/api/articles").json()["items"]]
+
+    # Moving it between categories also refreshes the counts and both category lists
+    client.put(f"/api/articles/{article['id']}", json={"category": "Strength"})
+    counts = {row["name"]: row["count"] for row in client.get("/api/categories").json()}
+    assert counts["Strength"] == 2 and counts.get("Cardio", 0) == 0
+    assert client.get("/api/articles?category=cardio").json()["items"] == []
+    assert len(client.get("/api/articles?category=strength").json()["items"]) == 2
+
+
+def test_read_overtaken_by_a_write_is_not_cached(client, create_article):
+    article = create_article()
+    state = client.app.state
+    store = state.storage.articles
+    original_get = store.get
+
+    async def get_then_write(article_id):
+        # The read has its document when a write lands and invalidates it
+        document = await original_get(article_id)
+        await store.update(article_id, {"title": "Changed meanwhile"})
+        state.cache.invalidate(f"article:{article_id}")
+        return document
+
+    store.get = get_then_write
+    try:
+        assert client.get(f"/api/articles/{article['id']}").json()["title"] == "Morning run"
+    finally:
+        store.get = original_get
+    assert state.cache.get(("article", article["id"])) is None
+    assert state.cache.stale_fills == 1
+    assert client.get(f"/api/articles/{article['id']}").json()["title"] == "Changed meanwhile"
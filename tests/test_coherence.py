@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+ARTICLE = {
+    "title": "Before", "excerpt": "Start the day", "content": "Easy miles before breakfast",
+    "category": "Cardio", "author": "Sam", "publishDate": "2025-03-01T09:30:00",
+    "readTime": "5 min", "image": "https://example.com/run.jpg", "featured": False,
+}
+
+
+@pytest.fixture
+def workers(monkeypatch, tmp_path, mongo_url, mongo_db_name):
+    """Two apps, as two workers would run them, sharing one MongoDB database"""
+    monkeypatch.setenv("STORAGE_BACKEND", "mongo")
+    monkeypatch.setenv("MONGO_URL", mongo_url)
+    monkeypatch.setenv("DB_NAME", mongo_db_name)
+    monkeypatch.setenv("CACHE_SYNC", "poll")
+    monkeypatch.setenv("CACHE_SYNC_INTERVAL", "0.05")
+    # Long enough to see a stale entry dropped before it is re-rendered
+    monkeypatch.setenv("SNAPSHOT_PUBLISH_DELAY", "0.3")
+    apps = []
+    for name in ("a", "b"):
+        # Each worker keeps its snapshot on its own disk
+        monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / name))
+        apps.append(server.create_app())
+    with TestClient(apps[0]) as first, TestClient(apps[1]) as second:
+        yield first, second
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the other worker"
+        time.sleep(0.02)
+
+
+async def _rebuild_snapshot(publisher):
+    publisher.invalidated(None)
+    await publisher.close()
+
+
+def test_write_on_one_worker_drops_the_others_cache_flights_and_snapshot(workers):
+    writer, reader = workers
+    article = writer.post("/api/articles", json=ARTICLE).json()
+    key = ("article", article["id"])
+    url = f"/api/articles/{article['id']}"
+    state = reader.app.state
+
+    # The reader caches the article and serves it from a snapshot too
+    assert reader.get(url, headers={"x-snapshot-build": "1"}).json()["title"] == "Before"
+    assert state.cache.get(key) is not None
+    reader.portal.call(_rebuild_snapshot, state.snapshot_publisher)
+    assert state.snapshots.lookup(f"/api/articles/{article['id']}") is not None
+    hits = state.snapshots.hits
+    assert reader.get(url).json()["title"] == "Before"
+    assert state.snapshots.hits == hits + 1
+
+    # ...and has a read of it in flight that predates the write
+    release = asyncio.Event()
+
+    async def slow_load():
+        await release.wait()
+        return "stale"
+
+    in_flight = reader.portal.start_task_soon(state.flights.run, key, slow_load)
+    _wait_for(lambda: state.flights.stats()["in_flight"] == 1)
+
+    assert writer.put(url, json={"title": "After"}).status_code == 200
+
+    # Flights are forgotten after the cache drops its entries, and the snapshot right after
+    _wait_for(lambda: state.flights.stats()["in_flight"] == 0)
+    assert state.coherence.received >= 1
+    assert state.cache.get(key) is None
+    assert state.snapshots.lookup(f"/api/articles/{article['id']}") is None
+    assert reader.get(url).json()["title"] == "After"
+
+    # The reader re-renders its own snapshot from the fresh data
+    reader.portal.call(state.snapshot_publisher.close)
+    assert reader.get(url).json()["title"] == "After"
+    assert state.snapshots.lookup(f"/api/articles/{article['id']}") is not None
+
+    # The overtaken read still answers its own caller, but nobody else
+    reader.portal.call(release.set)
+    assert in_flight.result(timeout=5) == "stale"
+    assert reader.get(url, headers={"x-snapshot-build": "1"}).json()["title"] == "After"
@@ -0,0 +1,81 @@
+import pytest
+
+# Long enough to pass the compressor's minimum size
+CONTENT = "Squat deep, brace hard and drive through the floor. " * 60
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture
+def article(create_article):
+    return create_article(content=CONTENT)
+
+
+def test_matching_if_none_match_gets_an_empty_304(client, article):
+    url = f"/api/articles/{article['id']}"
+    first = client.get(url, headers=IDENTITY)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Vary"] == "Accept-Encoding"
+    assert "Last-Modified" in first.headers
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(url, headers={**IDENTITY, "If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        assert response.headers["Vary"] == "Accept-Encoding"
+
+    assert client.get(url, headers={**IDENTITY, "If-None-Match": '"other"'}).status_code == 200
+
+
+def test_list_responses_are_conditional_too(client, article):
+    first = client.get("/api/articles", headers=IDENTITY)
+    response = client.get("/api/articles", headers={**IDENTITY, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304 and response.content == b""
+
+
+def test_etag_changes_after_an_update(client, article):
+    url = f"/api/articles/{article['id']}"
+    before = client.get(url, headers=IDENTITY).headers["ETag"]
+    list_before = client.get("/api/articles", headers=IDENTITY).headers["ETag"]
+
+    assert client.put(url, json={"title": "Deeper squats"}).status_code == 200
+
+    response = client.get(url, headers={**IDENTITY, "If-None-Match": before})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Deeper squats"
+    assert response.headers["ETag"] != before
+    assert client.get("/api/articles", headers={**IDENTITY, "If-None-Match": list_before}).status_code == 200
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compressed_variants_carry_their_coding(client, article, encoding):
+    if encoding == "br":
+        pytest.importorskip("brotli")
+    url = f"/api/articles/{article['id']}"
+    plain = client.get(url, headers=IDENTITY)
+    assert "Content-Encoding" not in plain.headers
+
+    response = client.get(url, headers={"Accept-Encoding": encoding})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    # Each coding is its own representation, with its own ETag
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + f'-{encoding}"'
+    assert int(response.headers["Content-Length"]) < len(plain.content)
+    assert response.json() == plain.json()
+
+    # A client revalidating its compressed copy gets a 304 for that variant
+    revalidated = client.get(url, headers={"Accept-Encoding": encoding, "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == response.headers["ETag"]
+    assert revalidated.headers["Vary"] == "Accept-Encoding"
+
+
+def test_small_bodies_are_sent_uncompressed(client, create_article):
+    article = create_article(content="Short")
+    response = client.get(f"/api/articles/{article['id']}", headers={"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from core.memory_storage import MemorySubscriberStore
+from core.signups import SignupBuffer
+
+
+class RecordingStore(MemorySubscriberStore):
+    """Records each batch written, and fails any batch containing a poisoned email"""
+
+    def __init__(self, poisoned=()):
+        super().__init__()
+        self.batches = []
+        self.poisoned = set(poisoned)
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def subscribe_many(self, emails):
+        self.batches.append(list(emails))
+        await self.release.wait()
+        if self.poisoned.intersection(emails):
+            raise RuntimeError("write failed")
+        return await super().subscribe_many(emails)
+
+
+def _emails(count, prefix="user"):
+    return [f"{prefix}{number}@example.com" for number in range(count)]
+
+
+def test_flushes_when_the_batch_fills_without_waiting_for_the_timer():
+    async def test():
+        store = RecordingStore()
+        buffer = SignupBuffer(store, max_batch=3, max_delay=60)
+        results = await asyncio.wait_for(asyncio.gather(*(buffer.submit(email) for email in _emails(3))), 5)
+        assert [subscriber["email"] for subscriber in results] == _emails(3)
+        assert store.batches == [_emails(3)]
+        assert buffer.stats()["queue_depth"] == 0
+    asyncio.run(test())
+
+
+def test_full_batches_split_a_burst():
+    async def test():
+        store = RecordingStore()
+        buffer = SignupBuffer(store, max_batch=2, max_delay=0.01)
+        subscribers = await buffer.submit_many(_emails(5) + ["user0@example.com"])
+        assert list(subscribers) == _emails(5)
+        assert [len(batch) for batch in store.batches] == [2, 2, 1]
+        assert buffer.flushes == 3 and buffer.flushed == 5
+    asyncio.run(test())
+
+
+def test_flushes_a_partial_batch_after_the_interval():
+    async def test():
+        store = RecordingStore()
+        buffer = SignupBuffer(store, max_batch=100, max_delay=0.05)
+        pending = asyncio.ensure_future(buffer.submit("a@example.com"))
+        await asyncio.sleep(0.01)
+        assert store.batches == [] and buffer.stats()["queue_depth"] == 1
+        subscriber = await asyncio.wait_for(pending, 5)
+        assert subscriber["email"] == "a@example.com"
+        assert store.batches == [["a@example.com"]]
+    asyncio.run(test())
+
+
+def test_close_drains_the_queue_and_waits_for_running_flushes():
+    async def test():
+        store = RecordingStore()
+        buffer = SignupBuffer(store, max_batch=2, max_delay=60)
+        store.release.clear()
+        running = [asyncio.ensure_future(buffer.submit(email)) for email in _emails(2, "running")]
+        queued = asyncio.ensure_future(buffer.submit("queued@example.com"))
+        await asyncio.sleep(0)
+        assert buffer.stats()["flushes_in_flight"] == 1 and buffer.stats()["queue_depth"] == 1
+
+        closing = asyncio.ensure_future(buffer.close())
+        await asyncio.sleep(0)
+        assert not closing.done()
+        store.release.set()
+        await asyncio.wait_for(closing, 5)
+
+        assert all(future.done() for future in running) and queued.done()
+        assert (await queued)["email"] == "queued@example.com"
+        assert buffer.stats()["queue_depth"] == 0 and buffer.stats()["flushes_in_flight"] == 0
+        assert len([row async for row in store.iterate()]) == 3
+        # Nothing left to do
+        await buffer.close()
+        assert len(store.batches) == 2
+    asyncio.run(test())
+
+
+def test_failed_batch_fails_only_its_own_callers():
+    async def test():
+        store = RecordingStore(poisoned={"bad@example.com"})
+        buffer = SignupBuffer(store, max_batch=2, max_delay=60)
+        results = await asyncio.gather(
+            buffer.submit("good@example.com"), buffer.submit("bad@example.com"),
+            buffer.submit("next@example.com"), buffer.submit("other@example.com"),
+            return_exceptions=True,
+        )
+        assert [str(result) for result in results[:2]] == ["write failed", "write failed"]
+        assert [result["email"] for result in results[2:]] == ["next@example.com", "other@example.com"]
+        assert buffer.failures == 1 and buffer.flushes == 2
+
+        # The buffer keeps working after a failure
+        assert (await asyncio.wait_for(
+            asyncio.gather(buffer.submit("good@example.com"), buffer.submit("late@example.com")), 5
+        ))[0]["email"] == "good@example.com"
+        with pytest.raises(RuntimeError):
+            await asyncio.gather(buffer.submit("bad@example.com"), buffer.submit("x@example.com"))
+    asyncio.run(test())
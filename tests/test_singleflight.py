@@ -0,0 +1,160 @@
+import asyncio
+
+import httpx
+import pytest
+
+from core.singleflight import SingleFlight
+
+
+async def _settle():
+    """Let callers reach their shared call and the call start running"""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class CountingLoad:
+    """A store read that blocks until released and counts how often it ran"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, value="result"):
+        self.calls += 1
+        await self.release.wait()
+        return value
+
+
+def test_concurrent_identical_reads_share_one_call():
+    async def test():
+        flights = SingleFlight()
+        load = CountingLoad()
+        callers = [asyncio.ensure_future(flights.run(("article", "a"), load)) for _ in range(10)]
+        await _settle()
+        load.release.set()
+        assert await asyncio.gather(*callers) == ["result"] * 10
+        assert load.calls == 1
+        assert flights.stats() == {"in_flight": 0, "queries": {"article": {"leaders": 1, "coalesced": 9}}}
+    asyncio.run(test())
+
+
+def test_different_keys_run_separately():
+    async def test():
+        flights = SingleFlight()
+        load = CountingLoad()
+        load.release.set()
+        results = await asyncio.gather(
+            flights.run(("article", "a"), lambda: load("a")), flights.run(("article", "b"), lambda: load("b"))
+        )
+        assert results == ["a", "b"]
+        assert load.calls == 2
+    asyncio.run(test())
+
+
+def test_finished_call_is_not_reused():
+    async def test():
+        flights = SingleFlight()
+        load = CountingLoad()
+        load.release.set()
+        await flights.run(("featured",), load)
+        await flights.run(("featured",), load)
+        assert load.calls == 2
+    asyncio.run(test())
+
+
+def test_forget_keeps_later_callers_off_a_stale_call():
+    async def test():
+        flights = SingleFlight()
+        stale, fresh = CountingLoad(), CountingLoad()
+        early = asyncio.ensure_future(flights.run(("article", "a"), lambda: stale("stale")))
+        await _settle()
+
+        # A write lands while the first read is running
+        flights.forget()
+        late = asyncio.ensure_future(flights.run(("article", "a"), lambda: fresh("fresh")))
+        await _settle()
+        assert fresh.calls == 1
+
+        fresh.release.set()
+        stale.release.set()
+        assert await late == "fresh"
+        # The overtaken call still answers the caller that was waiting on it
+        assert await early == "stale"
+        assert flights.stats()["in_flight"] == 0
+    asyncio.run(test())
+
+
+def test_failure_reaches_every_waiter_and_is_not_kept():
+    async def test():
+        flights = SingleFlight()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise RuntimeError("store down")
+
+        results = await asyncio.gather(*(flights.run(("categories",), failing) for _ in range(3)),
+                                       return_exceptions=True)
+        assert [str(result) for result in results] == ["store down"] * 3
+        assert calls == 1
+        with pytest.raises(RuntimeError):
+            await flights.run(("categories",), failing)
+        assert calls == 2
+    asyncio.run(test())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def test():
+        flights = SingleFlight()
+        load = CountingLoad()
+        leaving = asyncio.ensure_future(flights.run(("article", "a"), load))
+        staying = asyncio.ensure_future(flights.run(("article", "a"), load))
+        await _settle()
+        leaving.cancel()
+        load.release.set()
+        assert await staying == "result"
+        assert leaving.cancelled()
+        assert load.calls == 1
+    asyncio.run(test())
+
+
+def test_route_reads_coalesce_and_writes_forget_them(client, create_article):
+    article = create_article()
+    state = client.app.state
+    store = state.storage.articles
+    original_get = store.get
+    load = CountingLoad()
+
+    async def slow_get(article_id):
+        await load()
+        return await original_get(article_id)
+
+    async def read_concurrently():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            url = f"/api/articles/{article['id']}"
+            first = [asyncio.ensure_future(http.get(url)) for _ in range(5)]
+            # All five are waiting on the first one's store call
+            while state.flights.coalesced["article"] < 4:
+                await asyncio.sleep(0.001)
+            assert load.calls == 1
+            # A write now: reads starting from here must not join the ones already running
+            await store.update(article["id"], {"title": "Changed"})
+            state.cache.invalidate(f"article:{article['id']}")
+            second = asyncio.ensure_future(http.get(url))
+            while load.calls < 2:
+                await asyncio.sleep(0.001)
+            load.release.set()
+            return [response.json()["title"] for response in await asyncio.gather(*first, second)]
+
+    store.get = slow_get
+    try:
+        titles = client.portal.call(read_concurrently)
+    finally:
+        store.get = original_get
+    # One store call for the five identical reads, one for the read after the write
+    assert load.calls == 2
+    assert titles[-1] == "Changed"
+    assert state.flights.coalesced["article"] == 4 and state.flights.leaders["article"] == 2
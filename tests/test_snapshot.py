@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from core.snapshot import BUILD_HEADER, Snapshot, article_tags, build, publish
+
+ARTICLE = {
+    "excerpt": "Start the day", "content": "Easy miles before breakfast", "author": "Sam",
+    "publishDate": "2025-03-01T09:30:00", "readTime": "5 min", "image": "https://example.com/run.jpg",
+}
+
+
+@pytest.fixture
+def snapshot_client(monkeypatch, tmp_path):
+    """The in-memory app serving from a snapshot in tmp_path, republished only by the test"""
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setenv("SNAPSHOT_PUBLISH", "false")
+    with TestClient(server.create_app()) as client:
+        yield client
+
+
+def _create(client, title, category="Cardio", **fields):
+    response = client.post("/api/articles", json={**ARTICLE, "title": title, "category": category, **fields})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _run(client, operation, *args):
+    """Run a build or publish against the app, as the CLI and the publisher do"""
+    async def run():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://snapshot") as http:
+            return await operation(http, *args)
+    result = client.portal.call(run)
+    client.app.state.snapshots.reload()
+    return result
+
+
+def _served(client, path):
+    """Body of a request answered from the snapshot, failing if the routes answered it"""
+    snapshots = client.app.state.snapshots
+    hits = snapshots.hits
+    response = client.get(path, headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert snapshots.hits == hits + 1, f"{path} was not served from the snapshot"
+    return response
+
+
+def _files(directory):
+    return {path.name for path in (directory / "files").iterdir()}
+
+
+def test_build_renders_every_read_route(snapshot_client, tmp_path):
+    run = _create(snapshot_client, "Morning run", featured=True)
+    squat = _create(snapshot_client, "Heavy squats", category="Strength")
+
+    result = _run(snapshot_client, build, tmp_path)
+
+    manifest = json.loads((tmp_path / "manifest.json").read_bytes())
+    assert set(manifest["entries"]) == {
+        "/api/categories", "/api/articles/featured", "/api/articles",
+        "/api/articles?category=cardio", "/api/articles?category=strength",
+        f"/api/articles/{run['id']}", f"/api/articles/{squat['id']}",
+    }
+    assert result["entries"] == len(manifest["entries"])
+    entry = manifest["entries"][f"/api/articles/{run['id']}"]
+    assert entry["tags"] == [f"article:{run['id']}"] and entry["category"] == "Cardio"
+    assert {f"{entry['hash']}.json", f"{entry['hash']}.json.gz"} <= _files(tmp_path)
+
+    # Files answer with the body and validators the route itself sends
+    live = snapshot_client.get(f"/api/articles/{run['id']}", headers={BUILD_HEADER: "1", "Accept-Encoding": "identity"})
+    served = _served(snapshot_client, f"/api/articles/{run['id']}")
+    assert served.content == live.content
+    assert served.headers["ETag"] == live.headers["ETag"]
+    assert _served(snapshot_client, "/api/articles?category=cardio&limit=20").json()["items"][0]["title"] == "Morning run"
+    # Anything not in the manifest still reaches the routes
+    assert snapshot_client.app.state.snapshots.lookup("/api/articles?q=run") is None
+
+
+def test_publish_rerenders_only_what_a_write_touched(snapshot_client, tmp_path):
+    run = _create(snapshot_client, "Morning run")
+    squat = _create(snapshot_client, "Heavy squats", category="Strength")
+    _run(snapshot_client, build, tmp_path)
+    before = json.loads((tmp_path / "manifest.json").read_bytes())["entries"]
+    old = _served(snapshot_client, f"/api/articles/{run['id']}")
+
+    assert snapshot_client.put(f"/api/articles/{run['id']}", json={"title": "Tempo run"}).status_code == 200
+    # Not republished yet: the snapshot still answers with what it was built from
+    assert _served(snapshot_client, f"/api/articles/{run['id']}").json()["title"] == "Morning run"
+
+    snapshot = Snapshot.load(tmp_path)
+    tags = article_tags(snapshot, {"category": "Cardio"}, run["id"])
+    result = _run(snapshot_client, publish, tmp_path, tags)
+
+    new = _served(snapshot_client, f"/api/articles/{run['id']}")
+    assert new.json()["title"] == "Tempo run"
+    assert new.headers["ETag"] != old.headers["ETag"]
+    titles = [item["title"] for item in _served(snapshot_client, "/api/articles").json()["items"]]
+    assert "Tempo run" in titles and "Morning run" not in titles
+
+    after = json.loads((tmp_path / "manifest.json").read_bytes())["entries"]
+    # Entries the write did not touch were neither re-rendered nor changed
+    assert result["rendered"] < result["entries"] == len(before)
+    assert after[f"/api/articles/{squat['id']}"] == before[f"/api/articles/{squat['id']}"]
+    assert after["/api/articles?category=strength"] == before["/api/articles?category=strength"]
+    # Files only the old version used are gone
+    old_hash = before[f"/api/articles/{run['id']}"]["hash"]
+    assert not any(name.startswith(old_hash) for name in _files(tmp_path))
+    assert result["removed_files"] > 0
+
+
+def test_publish_follows_moves_and_deletes(snapshot_client, tmp_path):
+    run = _create(snapshot_client, "Morning run")
+    gone = _create(snapshot_client, "Old post")
+    _run(snapshot_client, build, tmp_path)
+
+    snapshot_client.put(f"/api/articles/{run['id']}", json={"category": "Strength"})
+    snapshot_client.delete(f"/api/articles/{gone['id']}")
+    snapshot = Snapshot.load(tmp_path)
+    tags = article_tags(snapshot, {"category": "Strength"}, run["id"]) | article_tags(snapshot, None, gone["id"])
+    _run(snapshot_client, publish, tmp_path, tags)
+
+    entries = json.loads((tmp_path / "manifest.json").read_bytes())["entries"]
+    assert f"/api/articles/{gone['id']}" not in entries
+    assert "/api/articles?category=strength" in entries
+    # The emptied category's list is dropped, along with its stale first page
+    assert "/api/articles?category=cardio" not in entries
+    strength = _served(snapshot_client, "/api/articles?category=strength").json()["items"]
+    assert [item["id"] for item in strength] == [run["id"]]
+    counts = {row["name"]: row["count"] for row in _served(snapshot_client, "/api/categories").json()}
+    assert counts.get("Cardio", 0) == 0 and counts["Strength"] == 1
+    assert snapshot_client.get(f"/api/articles/{gone['id']}").status_code == 404
+
+
+def test_concurrent_publishes_are_serialized(snapshot_client, tmp_path):
+    articles = [_create(snapshot_client, f"Post {number}") for number in range(4)]
+    _run(snapshot_client, build, tmp_path)
+    for article in articles:
+        snapshot_client.put(f"/api/articles/{article['id']}", json={"title": article["title"] + " (edited)"})
+
+    async def publish_each(http):
+        return await asyncio.gather(*(
+            publish(http, tmp_path, {f"article:{article['id']}"}) for article in articles
+        ))
+    _run(snapshot_client, publish_each)
+
+    # Each publish read the manifest the previous one wrote, so no update was lost
+    for article in articles:
+        assert _served(snapshot_client, f"/api/articles/{article['id']}").json()["title"].endswith("(edited)")
+    assert not [path.name for path in tmp_path.rglob("*.tmp")]
@@ -0,0 +1,227 @@
+from datetime import datetime, timedelta
+
+from core.memory_storage import MemorySubscriberStore
+
+FIELDS = ["id", "title", "category", "featured", "publishDate"]
+DAY = datetime(2025, 3, 1, 9, 30)
+
+
+def _article(article_id, category="Cardio", publish_date=DAY, featured=False, title="Morning run", content="Easy miles"):
+    return {
+        "id": article_id, "title": title, "excerpt": "", "content": content, "author": "Sam",
+        "category": category, "featured": featured, "publishDate": publish_date,
+    }
+
+
+async def _insert(storage, *articles):
+    for article in articles:
+        await storage.articles.insert(article)
+
+
+async def _pages(store_page, limit):
+    """Every page of a keyset listing, following the (publishDate, id) of each last row"""
+    pages, after = [], None
+    while True:
+        page = await store_page(after, limit)
+        if not page:
+            return pages
+        pages.append([row["id"] for row in page])
+        after = (page[-1]["publishDate"], page[-1]["id"])
+
+
+def test_page_is_newest_first_with_id_breaking_ties(run_with_storage):
+    async def test(storage):
+        await _insert(
+            storage,
+            _article("a", publish_date=DAY), _article("c", publish_date=DAY), _article("b", publish_date=DAY),
+            _article("d", publish_date=DAY + timedelta(days=1), category="Strength"),
+            _article("e", publish_date=DAY - timedelta(days=1)),
+        )
+        pages = await _pages(lambda after, limit: storage.articles.page(None, after, limit, FIELDS), 2)
+        assert pages == [["d", "c"], ["b", "a"], ["e"]]
+        cardio = await _pages(lambda after, limit: storage.articles.page("Cardio", after, limit, FIELDS), 3)
+        assert cardio == [["c", "b", "a"], ["e"]]
+        assert await storage.articles.page("Yoga", None, 10, FIELDS) == []
+    run_with_storage(test)
+
+
+def test_featured_follows_article_order(run_with_storage):
+    async def test(storage):
+        await _insert(
+            storage,
+            _article("a", featured=True), _article("b", featured=True), _article("c"),
+            _article("d", featured=True, publish_date=DAY - timedelta(hours=1)),
+        )
+        featured = await storage.articles.featured(FIELDS, 100)
+        assert [row["id"] for row in featured] == ["b", "a", "d"]
+        assert [row["id"] for row in await storage.articles.featured(FIELDS, 2)] == ["b", "a"]
+    run_with_storage(test)
+
+
+def test_stored_datetimes_are_naive_utc_milliseconds(run_with_storage):
+    async def test(storage):
+        await _insert(storage, _article("a", publish_date=datetime(2025, 3, 1, 9, 30, 0, 123456)))
+        stored = await storage.articles.get("a")
+        assert stored["publishDate"] == datetime(2025, 3, 1, 9, 30, 0, 123000)
+        assert stored["publishDate"].tzinfo is None
+    run_with_storage(test)
+
+
+def test_search_ranks_by_relevance_and_pages_by_score_cursor(run_with_storage):
+    async def test(storage):
+        await _insert(
+            storage,
+            _article("body", title="Leg day", content="deadlift deadlift"),
+            _article("title", title="Deadlift form"),
+            _article("tie-1", title="Kettlebell swing", content="deadlift"),
+            _article("tie-2", title="Kettlebell swing", content="deadlift"),
+            _article("other", title="Yoga flow", category="Yoga", content="deadlift"),
+            _article("miss", title="Rowing"),
+        )
+        hits = await storage.articles.search("deadlift", None, None, 10, ["id"])
+        ids = [hit["id"] for hit in hits]
+        assert ids[0] == "title"
+        assert set(ids) == {"body", "title", "tie-1", "tie-2", "other"}
+        assert all(isinstance(hit["score"], float) for hit in hits)
+        assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True)
+        # Equal scores fall back to id, descending, so the cursor has a strict order to resume from
+        assert ids.index("tie-2") < ids.index("tie-1")
+
+        paged, after = [], None
+        while True:
+            page = await storage.articles.search("deadlift", None, after, 2, ["id"])
+            if not page:
+                break
+            paged += [hit["id"] for hit in page]
+            after = (page[-1]["score"], page[-1]["id"])
+        assert paged == ids
+
+        yoga = await storage.articles.search("deadlift", "Yoga", None, 10, ["id", "title"])
+        assert [(hit["id"], hit["title"]) for hit in yoga] == [("other", "Yoga flow")]
+        assert await storage.articles.search("pilates", None, None, 10, ["id"]) == []
+    run_with_storage(test)
+
+
+def test_update_returns_previous_only_when_lists_move(run_with_storage):
+    async def test(storage):
+        await _insert(storage, _article("a"), _article("b"))
+
+        previous, updated = await storage.articles.update("a", {"title": "Tempo run"})
+        assert previous is None
+        assert updated["id"] == "a" and updated["title"] == "Tempo run" and updated["category"] == "Cardio"
+
+        previous, updated = await storage.articles.update("a", {"category": "Strength", "featured": True})
+        assert (previous["category"], previous["featured"], previous["title"]) == ("Cardio", False, "Tempo run")
+        assert (updated["category"], updated["featured"]) == ("Strength", True)
+
+        assert await storage.articles.update("missing", {"title": "Nope"}) is None
+        assert (await storage.articles.get("a"))["category"] == "Strength"
+        assert await storage.articles.category_counts() == [("Cardio", 1), ("Strength", 1)]
+        assert [row["id"] for row in await storage.articles.featured(FIELDS, 10)] == ["a"]
+        assert [row["id"] for row in await storage.articles.page("Cardio", None, 10, FIELDS)] == ["b"]
+    run_with_storage(test)
+
+
+def test_delete_returns_what_invalidation_needs(run_with_storage):
+    async def test(storage):
+        await _insert(storage, _article("a", featured=True), _article("b", category="Strength"))
+
+        assert await storage.articles.delete("a") == {"id": "a", "category": "Cardio", "featured": True}
+        assert await storage.articles.delete("a") is None
+        assert await storage.articles.get("a") is None
+        assert await storage.articles.featured(FIELDS, 10) == []
+        assert [hit["id"] for hit in await storage.articles.search("morning", None, None, 10, ["id"])] == ["b"]
+        assert await storage.articles.category_counts() == [("Strength", 1)]
+    run_with_storage(test)
+
+
+def test_upsert_many_reports_each_item(run_with_storage):
+    async def test(storage):
+        await _insert(storage, _article("a"))
+        now = datetime(2025, 4, 1, 8, 0)
+        fields = {key: value for key, value in _article("x", category="Yoga").items() if key != "id"}
+
+        results = await storage.articles.upsert_many([("a", {"title": "Renamed"}), ("n", fields)], now)
+        assert results == [("updated", None), ("inserted", None)]
+        await storage.articles.refresh_stats()
+
+        updated, inserted = await storage.articles.get("a"), await storage.articles.get("n")
+        assert updated["title"] == "Renamed" and updated["updatedAt"] == now and "createdAt" not in updated
+        assert inserted["category"] == "Yoga" and inserted["createdAt"] == inserted["updatedAt"] == now
+        assert await storage.articles.upsert_many([], now) == []
+        assert await storage.articles.category_counts() == [("Cardio", 1), ("Yoga", 1)]
+        found = await storage.articles.get_many(["n", "a", "missing"])
+        assert sorted(article["id"] for article in found) == ["a", "n"]
+    run_with_storage(test)
+
+
+def test_category_counts_are_in_name_order_and_skip_empty(run_with_storage):
+    async def test(storage):
+        assert await storage.articles.category_counts() == []
+        await _insert(
+            storage, _article("a", category="Yoga"), _article("b", category="Cardio"),
+            _article("c", category="Yoga"), _article("d", category="Nutrition"),
+        )
+        assert await storage.articles.category_counts() == [("Cardio", 1), ("Nutrition", 1), ("Yoga", 2)]
+        await storage.articles.delete("d")
+        await storage.articles.update("b", {"category": "Yoga"})
+        assert await storage.articles.category_counts() == [("Yoga", 3)]
+    run_with_storage(test)
+
+
+async def _collect(iterator):
+    return [row async for row in iterator]
+
+
+def test_subscribers_iterate_from_either_end_after_a_position(run_with_storage):
+    async def test(storage):
+        subscribers = storage.subscribers
+        batch = await subscribers.subscribe_many(["b@x.com", "a@x.com", "b@x.com"])
+        assert sorted(batch) == ["a@x.com", "b@x.com"]
+        first = await subscribers.subscribe("c@x.com")
+        assert (await subscribers.subscribe("c@x.com"))["id"] == first["id"]
+
+        rows = await _collect(subscribers.iterate())
+        keys = [(row["subscribedAt"], row["id"]) for row in rows]
+        assert keys == sorted(keys) and len(keys) == 3
+        assert await _collect(subscribers.iterate(descending=True)) == rows[::-1]
+        # Positions are exclusive in both directions
+        assert await _collect(subscribers.iterate(after=keys[0])) == rows[1:]
+        assert await _collect(subscribers.iterate(after=keys[2], descending=True)) == rows[1::-1]
+        assert await _collect(subscribers.iterate(after=keys[2])) == []
+    run_with_storage(test)
+
+
+async def _subscribe_at(subscribers, email, when):
+    """A signup whose write commits only now, stamped with an earlier clock reading"""
+    if isinstance(subscribers, MemorySubscriberStore):
+        subscribers._add(email, when)
+        return
+    await subscribers._db.newsletter_subscribers.insert_one({"id": email, "email": email, "subscribedAt": when})
+
+
+def test_export_batches_include_late_commits_exactly_once(run_with_storage):
+    async def test(storage):
+        subscribers = storage.subscribers
+        await subscribers.subscribe_many(["a@x.com", "b@x.com"])
+        first = await subscribers.close_export_batch()
+        exported = await _collect(subscribers.iterate_exported(0, first))
+        assert sorted(row["email"] for row in exported) == ["a@x.com", "b@x.com"]
+
+        # Sorts before everything already exported, but was not stored when that batch closed
+        await _subscribe_at(subscribers, "late@x.com", datetime(2000, 1, 1))
+        await subscribers.subscribe("new@x.com")
+        second = await subscribers.close_export_batch()
+        assert second > first
+        assert [row["email"] for row in await _collect(subscribers.iterate_exported(first, second))] == [
+            "late@x.com", "new@x.com"
+        ]
+
+        everything = await _collect(subscribers.iterate_exported(0, second))
+        assert [row["email"] for row in everything] == [row["email"] for row in exported] + ["late@x.com", "new@x.com"]
+        assert [row["exportBatch"] for row in everything] == [first, first, second, second]
+
+        empty = await subscribers.close_export_batch()
+        assert empty > second
+        assert await _collect(subscribers.iterate_exported(second, empty)) == []
+    run_with_storage(test)